@@ -1,7 +1,84 @@
 from django.contrib import admin
-from .models import Event, TicketType, Reservation, Payment
 
-admin.site.register(Event)
-admin.site.register(TicketType)
-admin.site.register(Reservation)
-admin.site.register(Payment)
+from . import cities, page_cache
+from .models import CheckIn, City, Event, TicketType, Reservation, Payment, WebhookEvent
+from .reservations import set_stripe_count
+
+
+# __str__ pe aceste modele citește relații; le aducem în aceeași interogare cu lista
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_select_related = ('organizer',)
+
+
+@admin.register(TicketType)
+class TicketTypeAdmin(admin.ModelAdmin):
+    list_select_related = ('event',)
+
+    def save_model(self, request, obj, form, change):
+        # Benzile se creează și stocul se mută între ele doar prin set_stripe_count
+        stripe_count = obj.stripe_count
+        if 'stripe_count' in form.changed_data:
+            obj.stripe_count = form.initial.get('stripe_count', 1) if change else 1
+        super().save_model(request, obj, form, change)
+        if obj.stripe_count != stripe_count:
+            set_stripe_count(obj, stripe_count)
+        # Stocul sau prețul editat manual schimbă agregatele denormalizate ale evenimentului
+        event_ids = {obj.event_id}
+        if change and 'event' in form.changed_data:
+            event_ids.add(form.initial.get('event'))
+        self._refresh_events(event_ids)
+
+    def delete_model(self, request, obj):
+        event_id = obj.event_id
+        super().delete_model(request, obj)
+        self._refresh_events({event_id})
+
+    def delete_queryset(self, request, queryset):
+        event_ids = set(queryset.values_list('event_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self._refresh_events(event_ids)
+
+    @staticmethod
+    def _refresh_events(event_ids):
+        Event.objects.filter(pk__in=event_ids).refresh_availability()
+        # Prețul minim și sold-out apar și în grila de evenimente
+        for event_id in event_ids:
+            page_cache.invalidate_event(event_id)
+
+
+@admin.register(Reservation)
+class ReservationAdmin(admin.ModelAdmin):
+    list_select_related = ('user', 'ticket_type')
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_select_related = ('reservation__user',)
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'received_at', 'processed_at', 'attempts')
+    list_filter = ('provider', 'event_type')
+    search_fields = ('event_id',)
+
+
+@admin.register(CheckIn)
+class CheckInAdmin(admin.ModelAdmin):
+    list_display = ('reservation', 'seat', 'gate', 'checked_in_at')
+    list_select_related = ('reservation__user', 'reservation__ticket_type')
+    list_filter = ('gate',)
+
+
+# Numele afișat se poate corecta (ex. diacritice); forma normalizată rămâne cheia de potrivire
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'normalized')
+    readonly_fields = ('normalized',)
+    search_fields = ('name', 'normalized')
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.normalized = cities.normalize(obj.name)[:100]
+        super().save_model(request, obj, form, change)
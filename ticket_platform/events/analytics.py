@@ -0,0 +1,138 @@
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Reservation, SalesRollup
+
+# 📊 Rollup-urile de vânzări. Fiecare rezervare, eliberare sau plată adaugă o
+# diferență (delta) pe rândul (tip de bilet, zi); rapoartele doar însumează rânduri.
+
+LIVE_FIELDS = ['reservations', 'tickets_reserved', 'paid_reservations', 'tickets_sold', 'revenue']
+RELEASED_FIELDS = ['released_reservations', 'released_tickets']
+
+
+def _shard(ticket_type):
+    return random.randrange(ticket_type.stripe_count) if ticket_type.stripe_count > 1 else 0
+
+
+def apply_delta(event_id, ticket_type_id, day, shard=0, **deltas):
+    rows = SalesRollup.objects.filter(ticket_type_id=ticket_type_id, day=day, shard=shard)
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SalesRollup.objects.create(
+                event_id=event_id, ticket_type_id=ticket_type_id, day=day, shard=shard, **deltas
+            )
+    except IntegrityError:
+        # Altă cerere a creat rândul între timp
+        rows.update(**changes)
+
+
+def record_reservation(reservation):
+    ticket_type = reservation.ticket_type
+    apply_delta(
+        ticket_type.event_id, ticket_type.pk, timezone.localdate(reservation.created_at),
+        shard=_shard(ticket_type), reservations=1, tickets_reserved=reservation.quantity,
+    )
+
+
+def record_payment(payment):
+    reservation = payment.reservation
+    ticket_type = reservation.ticket_type
+    apply_delta(
+        ticket_type.event_id, ticket_type.pk, timezone.localdate(reservation.created_at),
+        shard=_shard(ticket_type), paid_reservations=1, tickets_sold=reservation.quantity,
+        revenue=payment.amount,
+    )
+
+
+def _grouped(reservations):
+    """Totalurile rezervărilor date, pe (eveniment, tip de bilet, zi)."""
+    paid = Q(payment__status='completed')
+    return (
+        reservations.order_by()
+        .values('ticket_type_id', event_id=F('ticket_type__event_id'), day=TruncDate('created_at'))
+        .annotate(
+            reservations=Count('id'),
+            tickets_reserved=Sum('quantity'),
+            paid_reservations=Count('id', filter=paid),
+            tickets_sold=Coalesce(Sum('quantity', filter=paid), 0),
+            revenue=Coalesce(Sum('payment__amount', filter=paid), Value(0), output_field=DecimalField()),
+        )
+    )
+
+
+def record_release(reservations):
+    """Scoate din rollup-uri rezervările care urmează să fie șterse (apelată înainte de delete)."""
+    for row in _grouped(reservations):
+        apply_delta(
+            row['event_id'], row['ticket_type_id'], row['day'],
+            released_reservations=row['reservations'],
+            released_tickets=row['tickets_reserved'],
+            **{field: -row[field] for field in LIVE_FIELDS},
+        )
+
+
+def rebuild(events=None):
+    """Recalculează rollup-urile din Reservation / Payment; totalurile eliberate se păstrează."""
+    rollups = SalesRollup.objects.all()
+    reservations = Reservation.objects.all()
+    if events is not None:
+        rollups = rollups.filter(event__in=events)
+        reservations = reservations.filter(ticket_type__event__in=events)
+
+    with transaction.atomic():
+        rollups.update(**{field: 0 for field in LIVE_FIELDS})
+        rows = [
+            SalesRollup(shard=0, **{key: row[key] for key in ['event_id', 'ticket_type_id', 'day', *LIVE_FIELDS]})
+            for row in _grouped(reservations)
+        ]
+        SalesRollup.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True,
+            unique_fields=['ticket_type', 'day', 'shard'], update_fields=LIVE_FIELDS,
+        )
+    return len(rows)
+
+
+def _with_conversion(row):
+    # Conversia: rezervări plătite din toate rezervările făcute vreodată (inclusiv cele eliberate)
+    created = row['reservations'] + row['released_reservations']
+    row['conversion'] = round(row['paid_reservations'] / created, 4) if created else 0.0
+    return row
+
+
+def _totals_query(rollups, *keys):
+    sums = {field: Sum(field) for field in LIVE_FIELDS + RELEASED_FIELDS}
+    return rollups.values(*keys).annotate(**sums).order_by(*keys)
+
+
+def _grouped_totals(rollups, *keys):
+    return [_with_conversion(row) for row in _totals_query(rollups, *keys)]
+
+
+def event_report(event):
+    rollups = SalesRollup.objects.filter(event=event)
+    days = _grouped_totals(rollups, 'day')
+    # Totalul evenimentului e suma zilelor, fără încă o interogare
+    totals = {field: sum((row[field] for row in days), 0) for field in LIVE_FIELDS + RELEASED_FIELDS}
+    return {
+        'totals': _with_conversion(totals),
+        'ticket_types': _grouped_totals(rollups, 'ticket_type_id', 'ticket_type__name'),
+        'days': days,
+    }
+
+
+def totals_by_event(events):
+    """{id eveniment: totaluri}, într-o singură interogare, pentru lista de evenimente."""
+    rows = _grouped_totals(SalesRollup.objects.filter(event__in=events), 'event_id')
+    return {row['event_id']: row for row in rows}
+
+
+async def atotals_by_event(events):
+    rows = _totals_query(SalesRollup.objects.filter(event__in=events), 'event_id')
+    return {row['event_id']: _with_conversion(row) async for row in rows}
@@ -0,0 +1,321 @@
+import base64
+import binascii
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .models import CheckIn, Reservation
+
+logger = logging.getLogger(__name__)
+
+# 🚪 Bilete semnate și validarea lor la intrare.
+#
+# Codul unui loc este `<eveniment>.<rezervare>.<loc>.<SEMNĂTURĂ>`: semnătura e Ed25519
+# (base32, fără '=') cu o cheie privată proprie evenimentului, derivată din
+# TICKET_CODE_SECRET (implicit SECRET_KEY) și care nu părăsește serverul. Scanerele primesc
+# în manifest doar cheia publică: pot verifica offline codurile, dar nu pot emite altele.
+# Codul folosește doar cifre, majuscule și '.', deci încape în modul alfanumeric QR.
+#
+# Poarta (Gate) ține în memorie, per proces, locurile valide și pe cele folosite:
+# id-urile rezervărilor confirmate sortate (array), offset-ul fiecăreia și un bitmap
+# cu un bit per loc. O scanare nu face nicio interogare; intrările se scriu în lot.
+# Între procese decide TICKET_GATE_CACHE, dacă e comun (Redis, Memcached, bază de date);
+# cu un cache local procesului (LocMem, implicit) fiecare intrare validă e scrisă pe loc
+# și constrângerea unică din baza de date decide, ca două procese să nu răspundă ambele `ok`.
+
+TOKEN_SALT = 'events.checkin'
+MAX_CODES_PER_REQUEST = 500
+# Cât timp cache-ul comun ține minte un loc validat (după aceea îl știe baza de date)
+CLAIM_TIMEOUT = 24 * 3600
+# Cache-uri pe care alte procese nu le văd
+LOCAL_CACHES = (LocMemCache, DummyCache)
+
+OK, USED, INVALID, WRONG_EVENT = 'ok', 'used', 'invalid', 'wrong_event'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def signing_key(event_id):
+    """Cheia privată a evenimentului; doar serverul o poate calcula."""
+    seed = salted_hmac(
+        'events.checkin.signing-key', str(event_id),
+        secret=_setting('TICKET_CODE_SECRET', None), algorithm='sha256',
+    ).digest()
+    return Ed25519PrivateKey.from_private_bytes(seed)
+
+
+def event_key(event_id):
+    """Cheia publică a evenimentului, cu care se verifică biletele (și offline)."""
+    return signing_key(event_id).public_key()
+
+
+def _encode(signature):
+    return base64.b32encode(signature).decode().rstrip('=')
+
+
+def _verify(key, payload, signature):
+    try:
+        raw = base64.b32decode(signature + '=' * (-len(signature) % 8))
+    except (binascii.Error, ValueError):
+        return False
+    # Ultimul caracter are biți nefolosiți: acceptăm doar forma canonică a semnăturii
+    if _encode(raw) != signature:
+        return False
+    try:
+        key.verify(raw, payload.encode())
+    except InvalidSignature:
+        return False
+    return True
+
+
+def ticket_code(event_id, reservation_id, seat):
+    payload = f'{event_id}.{reservation_id}.{seat}'
+    return f'{payload}.{_encode(signing_key(event_id).sign(payload.encode()))}'
+
+
+def parse_code(code, key=None):
+    """(eveniment, rezervare, loc) dacă semnătura e validă, altfel None."""
+    parts = code.strip().upper().split('.')
+    if len(parts) != 4 or not all(part.isdigit() for part in parts[:3]):
+        return None
+    event_id, reservation_id, seat = map(int, parts[:3])
+    if not _verify(key or event_key(event_id), '.'.join(parts[:3]), parts[3]):
+        return None
+    return event_id, reservation_id, seat
+
+
+def make_gate_token(event_id):
+    return signing.dumps({'e': event_id}, salt=TOKEN_SALT)
+
+
+def read_gate_token(token, event_id):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=_setting('TICKET_GATE_TOKEN_MAX_AGE', 2 * 24 * 3600))
+    except signing.BadSignature:
+        return False
+    return data.get('e') == event_id
+
+
+class Gate:
+    """Validarea biletelor unui eveniment în procesul curent."""
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        self.key = event_key(event_id)
+        self.cache = caches[_setting('TICKET_GATE_CACHE', 'default')]
+        self.shared = not isinstance(self.cache, LOCAL_CACHES)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        self.load()
+
+    def load(self):
+        """Reîncarcă rezervările confirmate și intrările deja salvate (2 interogări)."""
+        rows = list(
+            Reservation.objects.filter(ticket_type__event_id=self.event_id, confirmed=True)
+            .order_by('pk').values_list('pk', 'quantity')
+        )
+        ids, offsets = array('q'), array('q', [0])
+        for reservation_id, quantity in rows:
+            ids.append(reservation_id)
+            offsets.append(offsets[-1] + quantity)
+        used = CheckIn.objects.filter(reservation__ticket_type__event_id=self.event_id).values_list('reservation', 'seat')
+
+        with self._lock:
+            self._ids, self._offsets = ids, offsets
+            self._used = bytearray((offsets[-1] + 7) // 8)
+            # Rezervări confirmate după încărcare: rezervare -> (cantitate, locuri folosite)
+            self._late = {}
+            for reservation_id, seat in [*used, *((c.reservation_id, c.seat) for c in self._pending)]:
+                self._mark(reservation_id, seat)
+            self.loaded_at = time.monotonic()
+
+    @property
+    def stale(self):
+        return time.monotonic() - self.loaded_at > _setting('TICKET_GATE_REFRESH', 60)
+
+    def _slot(self, reservation_id, seat):
+        """Poziția locului în bitmap; None dacă rezervarea nu e în instantaneu."""
+        i = bisect_left(self._ids, reservation_id)
+        if i == len(self._ids) or self._ids[i] != reservation_id:
+            return None
+        if not 1 <= seat <= self._offsets[i + 1] - self._offsets[i]:
+            return -1
+        return self._offsets[i] + seat - 1
+
+    def _mark(self, reservation_id, seat):
+        """Marchează locul ca folosit; întoarce False dacă era deja marcat."""
+        slot = self._slot(reservation_id, seat)
+        if slot is None:
+            quantity, seats = self._late.get(reservation_id, (0, set()))
+            if seat in seats:
+                return False
+            seats.add(seat)
+            self._late[reservation_id] = (quantity, seats)
+            return True
+        byte, bit = divmod(slot, 8)
+        if self._used[byte] & (1 << bit):
+            return False
+        self._used[byte] |= 1 << bit
+        return True
+
+    def _known(self, reservation_id, seat):
+        slot = self._slot(reservation_id, seat)
+        if slot is not None:
+            return slot >= 0
+        if reservation_id not in self._late or not self._late[reservation_id][0]:
+            return None
+        return 1 <= seat <= self._late[reservation_id][0]
+
+    def _lookup(self, reservation_id):
+        # Rezervare confirmată după încărcarea porții: o interogare, apoi rămâne în memorie
+        quantity = (
+            Reservation.objects.filter(pk=reservation_id, ticket_type__event_id=self.event_id, confirmed=True)
+            .values_list('quantity', flat=True).first()
+        )
+        if quantity:
+            with self._lock:
+                self._late[reservation_id] = (quantity, self._late.get(reservation_id, (0, set()))[1])
+        return quantity
+
+    def check(self, code, gate='', now=None):
+        parsed = parse_code(code, self.key)
+        if parsed is None:
+            # Codul poate fi semnat cu cheia altui eveniment
+            return WRONG_EVENT if parse_code(code) else INVALID
+        event_id, reservation_id, seat = parsed
+        if event_id != self.event_id:
+            return WRONG_EVENT
+
+        with self._lock:
+            known = self._known(reservation_id, seat)
+        if known is None:
+            quantity = self._lookup(reservation_id)
+            known = bool(quantity) and 1 <= seat <= quantity
+        if not known:
+            return INVALID
+
+        with self._lock:
+            if not self._mark(reservation_id, seat):
+                return USED
+        check_in = CheckIn(reservation_id=reservation_id, seat=seat, checked_in_at=now or timezone.now(), gate=gate)
+        if not self.shared:
+            return OK if self._claim(check_in) else USED
+        # Între procese (mai multe porți, mai multe servere) decide cache-ul comun
+        if not self.cache.add(f'checkin:{reservation_id}:{seat}', 1, timeout=CLAIM_TIMEOUT):
+            return USED
+        self._queue(check_in)
+        return OK
+
+    def _claim(self, check_in):
+        """Salvează intrarea imediat; False dacă alt proces a salvat deja locul."""
+        try:
+            with transaction.atomic():
+                check_in.save(force_insert=True)
+        except IntegrityError:
+            return False
+        return True
+
+    def check_many(self, codes, gate=''):
+        now = timezone.now()
+        return [{'code': code, 'status': self.check(code, gate, now)} for code in codes]
+
+    def _queue(self, check_in):
+        with self._lock:
+            self._pending.append(check_in)
+            full = len(self._pending) >= _setting('TICKET_CHECKIN_BATCH_SIZE', 100)
+            interval = _setting('TICKET_CHECKIN_FLUSH_SECONDS', 1.0)
+            if not full and interval and self._timer is None:
+                self._timer = threading.Timer(interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Scrie intrările acumulate (un INSERT pe lot). Întoarce câte au fost trimise."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        try:
+            # Un loc salvat deja de alt proces e ignorat de constrângerea unică
+            CheckIn.objects.bulk_create(pending, ignore_conflicts=True)
+        except DatabaseError:
+            with self._lock:
+                self._pending[:0] = pending
+            raise
+        return len(pending)
+
+    def _flush_in_background(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except DatabaseError:
+            logger.exception("Intrările de la evenimentul %s nu au putut fi salvate; se reîncearcă.", self.event_id)
+        finally:
+            connection.close()
+
+    def manifest(self):
+        """Ce are nevoie un scaner ca să valideze offline."""
+        with self._lock:
+            valid = [[r, self._offsets[i + 1] - self._offsets[i]] for i, r in enumerate(self._ids)]
+            valid += [[r, quantity] for r, (quantity, _) in self._late.items() if quantity]
+            used = [
+                [r, slot - self._offsets[i] + 1]
+                for i, r in enumerate(self._ids)
+                for slot in range(self._offsets[i], self._offsets[i + 1])
+                if self._used[slot // 8] & (1 << slot % 8)
+            ]
+            used += [[r, seat] for r, (_, seats) in self._late.items() for seat in sorted(seats)]
+        return {
+            'event': self.event_id,
+            'algorithm': 'Ed25519',
+            'key': base64.b64encode(self.key.public_bytes_raw()).decode(),
+            'code_format': '<event>.<reservation>.<seat>.<base32(Ed25519 signature of "<event>.<reservation>.<seat>"), no padding>',
+            'valid': valid,
+            'used': used,
+        }
+
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+
+def get_gate(event_id):
+    with _gates_lock:
+        gate = _gates.get(event_id)
+        if gate is None:
+            gate = _gates[event_id] = Gate(event_id)
+            return gate
+    if gate.stale:
+        gate.load()
+    return gate
+
+
+def reset_gates():
+    """Scrie ce a rămas și uită porțile încărcate (teste, schimbarea evenimentului)."""
+    with _gates_lock:
+        gates = list(_gates.values())
+        _gates.clear()
+    for gate in gates:
+        gate.flush()
@@ -0,0 +1,154 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from heapq import nsmallest
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from . import page_cache
+from .models import City
+
+# 🏙️ Orașele evenimentelor și indexul în memorie pentru autocompletare.
+#
+# Orașul se deduce din `Event.location`: ultima parte după virgulă ("Sala Palatului,
+# București" -> "București"), normalizată fără diacritice, majuscule și punctuație.
+# Indexul e o listă sortată de cuvinte (numele întreg și fiecare sufix de la început de
+# cuvânt: "cluj napoca", "napoca") căutată cu bisect; pentru prefixele de 1-2 litere,
+# care potrivesc multe orașe, primele rezultate sunt calculate la încărcare.
+# Orice modificare crește o versiune în cache; procesele reîncarcă indexul la nevoie.
+
+INDEX_VERSION_KEY = 'events:cities:version'
+SHORT_PREFIX = 2
+_NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize(text):
+    """'Cluj-Napoca' / 'CLUJ NAPOCA' / 'Cluj Napoca ' -> 'cluj napoca'; 'Brașov' / 'Braşov' -> 'brasov'."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD_RE.sub(' ', stripped.casefold()).strip()
+
+
+def city_name(location):
+    return (location or '').rsplit(',', 1)[-1].strip()[:100]
+
+
+def city_ids(locations):
+    """{locație: id oraș (sau None)}; orașele noi sunt create în lot."""
+    names = {}
+    for location in locations:
+        name = city_name(location)
+        if normalize(name):
+            names.setdefault(normalize(name)[:100], name)
+    ids = dict(City.objects.filter(normalized__in=names).values_list('normalized', 'pk'))
+    missing = [City(name=name, normalized=key) for key, name in names.items() if key not in ids]
+    if missing:
+        # Alt proces poate crea același oraș în paralel: constrângerea unică decide
+        City.objects.bulk_create(missing, ignore_conflicts=True)
+        ids.update(City.objects.filter(normalized__in=[c.normalized for c in missing]).values_list('normalized', 'pk'))
+        invalidate_index()
+    return {location: ids.get(normalize(city_name(location))[:100]) for location in locations}
+
+
+def index_check_interval():
+    return getattr(settings, 'CITY_INDEX_CHECK_SECONDS', 1.0)
+
+
+class CityIndex:
+    def __init__(self, rows, version):
+        """`rows`: (id, nume, formă normalizată, număr de evenimente)."""
+        self.version = version
+        self.cities = {pk: (name, events) for pk, name, _, events in rows}
+        rank = {pk: (-events, normalized) for pk, _, normalized, events in rows}
+        tokens = []
+        for pk, _, normalized, _ in rows:
+            words = normalized.split()
+            tokens.extend((' '.join(words[i:]), pk) for i in range(len(words)))
+        tokens.sort()
+        self._tokens = [token for token, _ in tokens]
+        self._ids = [pk for _, pk in tokens]
+
+        short = {}
+        for token, pk in tokens:
+            for length in range(1, min(SHORT_PREFIX, len(token)) + 1):
+                short.setdefault(token[:length], set()).add(pk)
+        self._short = {prefix: sorted(ids, key=rank.__getitem__) for prefix, ids in short.items()}
+        self._rank = rank
+
+    def __len__(self):
+        return len(self.cities)
+
+    def name(self, pk):
+        return self.cities.get(pk, ('', 0))[0]
+
+    def search(self, query, limit=10):
+        """[(id, nume, număr de evenimente)] pentru orașele cu un cuvânt care începe cu `query`."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        if len(prefix) <= SHORT_PREFIX:
+            ids = self._short.get(prefix, [])[:limit]
+        else:
+            found = set()
+            i = bisect_left(self._tokens, prefix)
+            while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+                found.add(self._ids[i])
+                i += 1
+            ids = nsmallest(limit, found, key=self._rank.__getitem__)
+        return [(pk, *self.cities[pk]) for pk in ids]
+
+
+_index = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _current_version():
+    return page_cache.get_cache().get_or_set(INDEX_VERSION_KEY, 1, timeout=None)
+
+
+def load_index():
+    rows = City.objects.annotate(event_count=Count('events')).values_list('pk', 'name', 'normalized', 'event_count')
+    version = _current_version()
+    return CityIndex(list(rows), version)
+
+
+def get_index():
+    """Indexul procesului; versiunea din cache e verificată cel mult o dată pe secundă."""
+    global _index, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < index_check_interval():
+        return _index
+    with _lock:
+        if _index is None or _index.version != _current_version():
+            _index = load_index()
+        _checked_at = now
+        return _index
+
+
+def _bump():
+    global _checked_at
+    cache = page_cache.get_cache()
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, 2, timeout=None)
+    _checked_at = 0.0
+
+
+def invalidate_index():
+    _bump()
+    # Ca la page_cache: un alt proces poate reîncărca indexul înainte de commit
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_bump)
+
+
+def reset_index():
+    """Uită indexul încărcat (teste); următoarea căutare îl reîncarcă."""
+    global _index, _checked_at
+    with _lock:
+        _index, _checked_at = None, 0.0
@@ -0,0 +1,56 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# 📤 Exportul rezervărilor unui eveniment. Rândurile se citesc din baza de date
+# în bucăți (iterator) și se scriu imediat în răspuns, deci memoria folosită nu
+# depinde de numărul de rezervări.
+
+CHUNK_SIZE = 2000
+
+COLUMNS = [
+    ('reservation_id', 'id'),
+    ('created_at', 'created_at'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+    ('ticket_type', 'ticket_type__name'),
+    ('unit_price', 'ticket_type__price'),
+    ('quantity', 'quantity'),
+    ('confirmed', 'confirmed'),
+    ('payment_status', 'payment__status'),
+    ('payment_amount', 'payment__amount'),
+    ('payment_intent', 'payment__stripe_payment_intent'),
+]
+
+HEADER = [name for name, _ in COLUMNS]
+
+
+def reservation_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Tuplurile de exportat, în ordinea `COLUMNS`, citite câte `chunk_size` o dată."""
+    rows = queryset.order_by('id').values_list(*(field for _, field in COLUMNS))
+    return rows.iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    # csv.writer scrie într-un "fișier"; aici fiecare rând e doar întors, nu păstrat
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(HEADER)
+    for row in reservation_rows(queryset, chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(queryset, chunk_size=CHUNK_SIZE):
+    for row in reservation_rows(queryset, chunk_size):
+        yield json.dumps(dict(zip(HEADER, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
@@ -0,0 +1,212 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.utils import timezone
+
+from .models import City
+
+# 🧭 Fațetele listei de evenimente: oraș, perioadă, preț și disponibilitate.
+#
+# Toate numărătorile vin dintr-o singură interogare grupată pe (oraș, perioadă,
+# bandă de preț, disponibilitate); orașul e cel normalizat (City), deci "Cluj-Napoca" și
+# "cluj napoca" sunt aceeași opțiune. Pentru fiecare fațetă se adună în Python rândurile
+# care respectă selecțiile celorlalte fațete, deci opțiunile unei fațete nu dispar
+# când una dintre ele e aleasă. Rezultatul se ține scurt timp în cache (page_cache).
+
+WHEN_LABELS = {
+    'past': "Încheiate",
+    'today': "Azi",
+    'week': "Următoarele 7 zile",
+    'month': "Următoarele 30 de zile",
+    'later': "Mai târziu",
+}
+AVAILABLE_LABELS = {'1': "Cu bilete", '0': "Epuizate"}
+FACET_LABELS = {'city': "Oraș", 'when': "Perioadă", 'price': "Preț", 'available': "Disponibilitate"}
+
+
+def price_edges():
+    return [Decimal(edge) for edge in getattr(settings, 'EVENTS_PRICE_BANDS', (50, 100, 200))]
+
+
+def max_cities():
+    return getattr(settings, 'EVENTS_FACET_CITIES', 15)
+
+
+def _price_bands():
+    """[(cheie, etichetă, minim inclusiv, maxim exclusiv)]; cheia e de forma '50-100' sau '200-'."""
+    edges = price_edges()
+    bands = []
+    for low, high in zip([Decimal(0), *edges], [*edges, None]):
+        key = f'{low:g}-{high:g}' if high is not None else f'{low:g}-'
+        label = f'{low:g} - {high:g} RON' if high is not None else f'peste {low:g} RON'
+        bands.append((key, label if low or high is None else f'sub {high:g} RON', low, high))
+    return bands
+
+
+def _when_ranges(now):
+    """{cheie: (început, sfârșit)} pentru perioadele relative la `now` (None = deschis)."""
+    today = timezone.make_aware(datetime.combine(timezone.localdate(now), time.min))
+    return {
+        'past': (None, now),
+        'today': (now, today + timedelta(days=1)),
+        'week': (today + timedelta(days=1), today + timedelta(days=7)),
+        'month': (today + timedelta(days=7), today + timedelta(days=30)),
+        'later': (today + timedelta(days=30), None),
+    }
+
+
+def _range_q(field, low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lt': high})
+    return q
+
+
+def selection(params):
+    """Valorile alese din URL, doar cele cunoscute: {fațetă: set(valori)}."""
+    return {
+        'city': {value for value in params.getlist('city') if value.isdigit()},
+        'when': {value for value in params.getlist('when') if value in WHEN_LABELS},
+        'price': {value for value in params.getlist('price') if value in {band[0] for band in _price_bands()}},
+        'available': {value for value in params.getlist('available') if value in AVAILABLE_LABELS},
+    }
+
+
+def _facet_q(name, values, now):
+    if name == 'city':
+        return Q(city_id__in=values)
+    if name == 'available':
+        return Q(tickets_available__gt=0) if values == {'1'} else Q(tickets_available=0) if values == {'0'} else Q()
+    ranges = (
+        [_when_ranges(now)[value] for value in values] if name == 'when'
+        else [(low, high) for key, _, low, high in _price_bands() if key in values]
+    )
+    field = 'start_date' if name == 'when' else 'min_price'
+    q = Q()
+    for low, high in ranges:
+        q |= _range_q(field, low, high)
+    return q
+
+
+def apply(events, selected, now=None):
+    """Filtrează după fațete: SAU între valorile unei fațete, ȘI între fațete."""
+    now = now or timezone.now()
+    for name, values in selected.items():
+        if values:
+            events = events.filter(_facet_q(name, values, now))
+    return events
+
+
+def _grouped(events, now):
+    whens = [When(_range_q('start_date', low, high), then=Value(key)) for key, (low, high) in _when_ranges(now).items()]
+    prices = [When(_range_q('min_price', low, high), then=Value(key)) for key, _, low, high in _price_bands()]
+    return (
+        events.order_by()
+        .annotate(
+            facet_when=Case(*whens, output_field=CharField()),
+            facet_price=Case(*prices, output_field=CharField()),
+            facet_available=Case(When(tickets_available__gt=0, then=Value('1')), default=Value('0')),
+        )
+        .values('city_id', 'city__name', 'facet_when', 'facet_price', 'facet_available')
+        .annotate(count=Count('pk'))
+    )
+
+
+def _rows(grouped):
+    return [
+        {
+            'city': str(row['city_id']) if row['city_id'] else None, 'city_name': row['city__name'],
+            'when': row['facet_when'], 'price': row['facet_price'],
+            'available': row['facet_available'], 'count': row['count'],
+        }
+        for row in grouped
+    ]
+
+
+def counts(events, selected, now=None):
+    """{fațetă: {valoare: număr}} și numele orașelor, dintr-o singură interogare grupată."""
+    result = _tally(_rows(_grouped(events, now or timezone.now())), selected)
+    missing = _unnamed(result, selected)
+    if missing:
+        result['city_names'].update((str(pk), name) for pk, name in City.objects.filter(pk__in=missing).values_list('pk', 'name'))
+    return result
+
+
+async def acounts(events, selected, now=None):
+    result = _tally(_rows([row async for row in _grouped(events, now or timezone.now())]), selected)
+    missing = _unnamed(result, selected)
+    if missing:
+        result['city_names'].update([
+            (str(pk), name) async for pk, name in City.objects.filter(pk__in=missing).values_list('pk', 'name')
+        ])
+    return result
+
+
+def _unnamed(result, selected):
+    # Un oraș ales poate lipsi din rezultate (ex. căutarea nu găsește nimic acolo):
+    # numele lui se citește separat, tot o singură dată, și se ține în cache cu numărătorile
+    return [value for value in selected['city'] if value not in result['city_names']]
+
+
+def _tally(rows, selected):
+    result = {}
+    for name in FACET_LABELS:
+        others = {other: values for other, values in selected.items() if other != name and values}
+        tally = Counter()
+        for row in rows:
+            if row[name] is not None and all(row[other] in values for other, values in others.items()):
+                tally[row[name]] += row['count']
+        result[name] = dict(tally)
+    # Numele orașelor se țin în cache împreună cu numărătorile
+    result['city_names'] = {row['city']: row['city_name'] for row in rows if row['city']}
+    return result
+
+
+def groups(facet_counts, selected, params):
+    """Fațetele pentru șablon: opțiuni cu numărul de evenimente și link-ul care le comută."""
+    names = facet_counts.get('city_names', {})
+    options = {
+        'city': [
+            (value, names.get(value, value))
+            for value, _ in sorted(facet_counts['city'].items(), key=lambda item: (-item[1], names.get(item[0], '')))[:max_cities()]
+        ],
+        'when': list(WHEN_LABELS.items()),
+        'price': [(key, label) for key, label, _, _ in _price_bands()],
+        'available': list(AVAILABLE_LABELS.items()),
+    }
+    # Un oraș ales rămâne în listă chiar dacă nu mai intră în primele N
+    options['city'] += [
+        (value, names.get(value, value))
+        for value in sorted(selected['city']) if value not in dict(options['city'])
+    ]
+
+    result = []
+    for name, label in FACET_LABELS.items():
+        result.append({
+            'name': name,
+            'label': label,
+            'options': [
+                {
+                    'value': value,
+                    'label': option_label,
+                    'count': facet_counts[name].get(value, 0),
+                    'selected': value in selected[name],
+                    'url': _toggle_url(params, name, value),
+                }
+                for value, option_label in options[name]
+            ],
+        })
+    return result
+
+
+def _toggle_url(params, name, value):
+    params = params.copy()
+    params.pop('cursor', None)
+    values = params.getlist(name)
+    params.setlist(name, [v for v in values if v != value] if value in values else [*values, value])
+    return f'?{params.urlencode()}'
@@ -0,0 +1,146 @@
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import page_cache
+from .models import Event, ImageAsset
+
+logger = logging.getLogger(__name__)
+
+# 🖼️ Variantele imaginilor de eveniment: nume -> lățimea maximă în pixeli.
+# Cardurile din liste folosesc "card", pagina evenimentului "hero".
+DEFAULT_VARIANTS = {'thumbnail': 160, 'card': 480, 'hero': 1200}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def variant_widths():
+    return getattr(settings, 'EVENT_IMAGE_VARIANTS', DEFAULT_VARIANTS)
+
+
+def content_hash(uploaded_file):
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def set_event_image(event, uploaded_file):
+    """Atașează imaginea la eveniment; dacă aceeași poză există deja, refolosește fișierul."""
+    digest = content_hash(uploaded_file)
+    asset = ImageAsset.objects.filter(content_hash=digest).first()
+    if asset is None:
+        event.image.save(uploaded_file.name, uploaded_file, save=False)
+        try:
+            with transaction.atomic():
+                asset = ImageAsset.objects.create(content_hash=digest, original=event.image.name)
+        except IntegrityError:
+            # Aceeași poză încărcată simultan: păstrăm înregistrarea existentă
+            asset = ImageAsset.objects.get(content_hash=digest)
+    event.image.name = asset.original
+    event.image_asset = asset
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def render_variants(asset):
+    """Generează fișierele pentru fiecare variantă și întoarce descrierea lor."""
+    with default_storage.open(asset.original, 'rb') as original:
+        source = ImageOps.exif_transpose(Image.open(original)).convert('RGBA')
+    # JPEG nu are transparență: zonele transparente devin albe, nu negre
+    background = Image.new('RGB', source.size, 'white')
+    background.paste(source, mask=source.getchannel('A'))
+    source = background
+
+    variants = {}
+    for name, width in variant_widths().items():
+        image = source.copy()
+        # Doar micșorăm: o imagine mai mică decât varianta rămâne la mărimea ei
+        image.thumbnail((width, width * 4), Image.LANCZOS)
+        base = f'events/variants/{asset.content_hash[:2]}/{asset.content_hash}/{name}'
+        variants[name] = {
+            'width': image.width,
+            'height': image.height,
+            'jpeg': default_storage.save(
+                f'{base}.jpg', _encode(image, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            ),
+            'webp': default_storage.save(f'{base}.webp', _encode(image, 'WEBP', quality=WEBP_QUALITY, method=6)),
+        }
+    return variants
+
+
+def _render(asset):
+    try:
+        return render_variants(asset), None
+    except Exception as exc:
+        logger.exception("Imaginea %s nu a putut fi procesată", asset.original)
+        return None, exc
+
+
+def pending_assets(max_attempts=3):
+    return ImageAsset.objects.filter(processed_at__isnull=True, attempts__lt=max_attempts)
+
+
+def process_pending(workers=4, batch_size=100):
+    """Procesează imaginile în așteptare și întoarce câte au reușit.
+
+    Redimensionarea (Pillow eliberează GIL-ul) rulează în `workers` fire paralele;
+    citirile și scrierile în baza de date rămân în firul curent.
+    """
+    processed = 0
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Paginare după id: o imagine care a eșuat se reîncearcă abia la rularea următoare
+            assets = list(pending_assets().filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not assets:
+                return processed
+            last_id = assets[-1].pk
+
+            for asset, (variants, error) in zip(assets, pool.map(_render, assets)):
+                asset.attempts += 1
+                if error is not None:
+                    asset.last_error = repr(error)
+                    asset.save(update_fields=['attempts', 'last_error'])
+                    continue
+                asset.variants = variants
+                asset.processed_at = timezone.now()
+                asset.last_error = ''
+                asset.save(update_fields=['variants', 'processed_at', 'attempts', 'last_error'])
+                processed += 1
+
+                # Paginile cache-uite cu imaginea originală trebuie regenerate cu noile variante
+                for event_id in Event.objects.filter(image_asset=asset).values_list('pk', flat=True):
+                    page_cache.invalidate_event(event_id)
+
+
+def backfill_assets():
+    """Creează ImageAsset pentru evenimentele cu imagine încărcată înainte de pipeline."""
+    created = 0
+    events = Event.objects.filter(image_asset__isnull=True).exclude(image='').exclude(image__isnull=True)
+    for event in events.only('pk', 'image').iterator(chunk_size=500):
+        try:
+            with default_storage.open(event.image.name, 'rb') as original:
+                digest = content_hash(original)
+        except (FileNotFoundError, OSError):
+            logger.warning("Imaginea evenimentului %s lipsește din storage", event.pk)
+            continue
+        asset, was_created = ImageAsset.objects.get_or_create(
+            content_hash=digest, defaults={'original': event.image.name}
+        )
+        Event.objects.filter(pk=event.pk).update(image_asset=asset)
+        created += was_created
+    return created
@@ -0,0 +1,207 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cities, page_cache, search
+from .models import Event, TicketType
+
+# 📥 Import în masă de evenimente și tipuri de bilete (CSV sau JSON).
+#
+# CSV: un rând per tip de bilet; rândurile cu același `event_ref` formează un eveniment.
+#   event_ref,title,description,location,start_date,end_date,ticket_name,ticket_price,ticket_quantity
+# JSON: o listă de evenimente, fiecare cu lista lui de bilete:
+#   [{"title": ..., "start_date": ..., "tickets": [{"name": ..., "price": ..., "quantity": ...}]}]
+#
+# Tot fișierul e validat înainte de orice scriere; inserarea se face cu bulk_create.
+
+EVENT_FIELDS = ['title', 'description', 'location', 'start_date', 'end_date']
+CSV_COLUMNS = ['event_ref', *EVENT_FIELDS, 'ticket_name', 'ticket_price', 'ticket_quantity']
+BATCH_SIZE = 1000
+# TicketType.price are 8 cifre, dintre care 2 zecimale
+MAX_PRICE = Decimal('1000000')
+
+
+@dataclass
+class ImportResult:
+    events: int = 0
+    ticket_types: int = 0
+    errors: list = field(default_factory=list)
+    dry_run: bool = False
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+@dataclass
+class _EventRow:
+    line: int
+    data: dict
+    tickets: list = field(default_factory=list)
+
+
+def _read_text(source):
+    if isinstance(source, (bytes, bytearray)):
+        return source.decode('utf-8-sig')
+    if isinstance(source, str):
+        return source
+    content = source.read()
+    return content.decode('utf-8-sig') if isinstance(content, bytes) else content
+
+
+def parse_csv(text, errors):
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        errors.append((1, f"Lipsesc coloanele: {', '.join(missing)}"))
+        return []
+
+    events = {}
+    for line, row in enumerate(reader, start=2):
+        ref = (row['event_ref'] or '').strip()
+        if not ref:
+            errors.append((line, "event_ref lipsește."))
+            continue
+        data = {name: (row[name] or '').strip() for name in EVENT_FIELDS}
+        event = events.get(ref)
+        if event is None:
+            event = events[ref] = _EventRow(line, data)
+        elif any(data[name] and data[name] != event.data[name] for name in EVENT_FIELDS):
+            errors.append((line, f"Datele evenimentului {ref} diferă de rândul {event.line}."))
+            continue
+        event.tickets.append((line, {
+            'name': row['ticket_name'], 'price': row['ticket_price'], 'quantity': row['ticket_quantity'],
+        }))
+    return list(events.values())
+
+
+def parse_json(text, errors):
+    try:
+        items = json.loads(text)
+    except ValueError as exc:
+        errors.append((1, f"JSON invalid: {exc}"))
+        return []
+    if not isinstance(items, list):
+        errors.append((1, "Fișierul JSON trebuie să conțină o listă de evenimente."))
+        return []
+
+    events = []
+    for index, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            errors.append((index, "Fiecare eveniment trebuie să fie un obiect."))
+            continue
+        data = {name: str(item.get(name) or '').strip() for name in EVENT_FIELDS}
+        tickets = item.get('tickets') or []
+        if not isinstance(tickets, list) or not all(isinstance(ticket, dict) for ticket in tickets):
+            errors.append((index, "`tickets` trebuie să fie o listă de obiecte."))
+            continue
+        events.append(_EventRow(index, data, [(index, ticket) for ticket in tickets]))
+    return events
+
+
+def _parse_date(value):
+    parsed = parse_datetime(value) if value else None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _validate_event(row, errors):
+    missing = [name for name in EVENT_FIELDS if not row.data[name]]
+    if missing:
+        errors.append((row.line, f"Câmpuri lipsă: {', '.join(missing)}."))
+        return None
+    start, end = _parse_date(row.data['start_date']), _parse_date(row.data['end_date'])
+    if start is None or end is None:
+        errors.append((row.line, "Data de început sau de sfârșit nu este validă."))
+        return None
+    if end < start:
+        errors.append((row.line, "Evenimentul se termină înainte să înceapă."))
+        return None
+    return {**row.data, 'start_date': start, 'end_date': end}
+
+
+def validate_ticket(line, ticket, errors):
+    name = str(ticket.get('name') or '').strip()
+    try:
+        price = Decimal(str(ticket.get('price')).strip())
+        quantity = int(str(ticket.get('quantity')).strip())
+        if not price.is_finite():
+            raise ValueError(price)
+    except (InvalidOperation, ValueError):
+        errors.append((line, "Prețul sau cantitatea biletului nu sunt valide."))
+        return None
+    if not name or price < 0 or quantity < 0:
+        errors.append((line, "Biletul are nevoie de nume, preț ≥ 0 și cantitate ≥ 0."))
+        return None
+    if price >= MAX_PRICE:
+        errors.append((line, f"Prețul biletului trebuie să fie sub {MAX_PRICE}."))
+        return None
+    return {'name': name[:100], 'price': price.quantize(Decimal('0.01')), 'quantity': quantity}
+
+
+def validate(rows, errors):
+    """Întoarce perechile (date eveniment, bilete) valide; erorile se adaugă în `errors`."""
+    valid = []
+    for row in rows:
+        event = _validate_event(row, errors)
+        tickets = [validate_ticket(line, ticket, errors) for line, ticket in row.tickets]
+        if event is not None and all(ticket is not None for ticket in tickets):
+            valid.append((event, tickets))
+    return valid
+
+
+def import_events(organizer, source, file_format='csv', dry_run=False, batch_size=BATCH_SIZE):
+    """Validează tot fișierul, apoi (dacă nu e dry run) inserează totul într-o tranzacție."""
+    errors = []
+    text = _read_text(source)
+    rows = parse_json(text, errors) if file_format == 'json' else parse_csv(text, errors)
+    valid = validate(rows, errors)
+    result = ImportResult(
+        events=len(valid), ticket_types=sum(len(tickets) for _, tickets in valid),
+        errors=sorted(errors), dry_run=dry_run,
+    )
+    if errors or dry_run:
+        return result
+
+    with transaction.atomic():
+        # pre_save nu rulează la bulk_create: orașele se rezolvă (și se creează) o dată pentru tot fișierul
+        city_ids = cities.city_ids([data['location'][:255] for data, _ in valid])
+        events = []
+        for data, tickets in valid:
+            # Agregatele de disponibilitate se calculează aici: bulk_create nu trece prin refresh
+            available = sum(ticket['quantity'] for ticket in tickets)
+            events.append(Event(
+                organizer=organizer,
+                title=data['title'][:200],
+                description=data['description'],
+                location=data['location'][:255],
+                city_id=city_ids[data['location'][:255]],
+                start_date=data['start_date'],
+                end_date=data['end_date'],
+                tickets_available=available,
+                min_price=min((ticket['price'] for ticket in tickets), default=None),
+                is_sold_out=bool(tickets) and available == 0,
+            ))
+        Event.objects.bulk_create(events, batch_size=batch_size)
+
+        TicketType.objects.bulk_create((
+            TicketType(
+                event_id=event.pk, name=ticket['name'], price=ticket['price'],
+                total_quantity=ticket['quantity'], available_quantity=ticket['quantity'],
+            )
+            for event, (_, tickets) in zip(events, valid)
+            for ticket in tickets
+        ), batch_size=batch_size)
+
+        # Semnalele post_save nu rulează la bulk_create: indexăm și invalidăm explicit
+        search.get_backend().index_many(events)
+        page_cache.invalidate_listing()
+        cities.invalidate_index()
+    return result
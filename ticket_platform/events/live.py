@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Event, TicketType
+
+# 📡 Disponibilitatea biletelor în timp real. Pentru fiecare eveniment urmărit
+# există un singur publisher în proces: citește stocul o dată pe interval și
+# trimite schimbările tuturor clienților conectați. Un client inactiv costă doar
+# o corutină care așteaptă, fără fir de execuție și fără interogări proprii.
+#
+# Un flux se închide după LIVE_AVAILABILITY_STREAM_SECONDS; EventSource se reconectează
+# singur după `retry`. Sub WSGI fiecare flux ține ocupat un fir de execuție, de aceea
+# pagina evenimentului deschide fluxul doar când aplicația rulează sub ASGI.
+
+
+def publish_interval():
+    return getattr(settings, 'LIVE_AVAILABILITY_INTERVAL', 1.0)
+
+
+def keepalive_interval():
+    return getattr(settings, 'LIVE_AVAILABILITY_KEEPALIVE', 15.0)
+
+
+def stream_lifetime():
+    return getattr(settings, 'LIVE_AVAILABILITY_STREAM_SECONDS', 60.0)
+
+
+def availability_snapshot(event_id):
+    """Stocul curent al evenimentului (None dacă evenimentul nu există)."""
+    event = Event.objects.filter(pk=event_id).values('tickets_available', 'is_sold_out').first()
+    if event is None:
+        return None
+    ticket_types = (
+        TicketType.objects.filter(event_id=event_id)
+        .annotate(stock=Coalesce(Sum('stripes__available_quantity'), Value(0)))
+        .values('id', 'available_quantity', 'stock')
+        .order_by('id')
+    )
+    return {
+        'event': event_id,
+        'tickets_available': event['tickets_available'],
+        'is_sold_out': event['is_sold_out'],
+        'ticket_types': {
+            str(row['id']): row['available_quantity'] + row['stock'] for row in ticket_types
+        },
+    }
+
+
+class Subscriber:
+    def __init__(self):
+        self.latest = None
+        self.changed = asyncio.Event()
+
+    def push(self, snapshot):
+        # Dacă clientul n-a citit încă mesajul anterior, îl înlocuim: contează doar ultimul stoc
+        self.latest = snapshot
+        self.changed.set()
+
+    async def next(self, timeout):
+        """Următorul stoc sau None dacă n-a apărut nimic în `timeout` secunde."""
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.changed.clear()
+        return self.latest
+
+
+class AvailabilityPublisher:
+    def __init__(self, event_id):
+        self.event_id = event_id
+        self.subscribers = set()
+        self.latest = None
+        self.task = None
+
+    def subscribe(self):
+        subscriber = Subscriber()
+        if self.latest is not None:
+            subscriber.push(self.latest)
+        self.subscribers.add(subscriber)
+        # Un publisher oprit de o eroare (sau anulat) repornește la următorul client
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def run(self):
+        load = sync_to_async(availability_snapshot)
+        try:
+            while self.subscribers:
+                snapshot = await load(self.event_id)
+                if snapshot != self.latest:
+                    self.latest = snapshot
+                    for subscriber in self.subscribers:
+                        subscriber.push(snapshot)
+                # Schimbările apărute în interval ajung la clienți într-un singur mesaj
+                await asyncio.sleep(publish_interval())
+        finally:
+            key = (asyncio.get_running_loop(), self.event_id)
+            with _publishers_lock:
+                # Dacă au rămas clienți (eroare, anulare), publisher-ul rămâne înregistrat și
+                # e repornit de subscribe(): altfel următorul client ar porni un al doilea
+                if not self.subscribers and _publishers.get(key) is self:
+                    del _publishers[key]
+
+
+# Cheia include bucla de evenimente: sub WSGI fiecare cerere asincronă are bucla ei,
+# iar dicționarul e folosit din mai multe fire de execuție
+_publishers = {}
+_publishers_lock = threading.Lock()
+
+
+def get_publisher(event_id):
+    key = (asyncio.get_running_loop(), event_id)
+    with _publishers_lock:
+        publisher = _publishers.get(key)
+        if publisher is None:
+            publisher = _publishers[key] = AvailabilityPublisher(event_id)
+    return publisher
+
+
+def format_event(snapshot):
+    return f'event: availability\ndata: {json.dumps(snapshot)}\n\n'
+
+
+async def stream_availability(event_id, lifetime=None):
+    """Generatorul pentru răspunsul `text/event-stream` al unui eveniment; se termină după `lifetime` secunde."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (stream_lifetime() if lifetime is None else lifetime)
+    publisher = get_publisher(event_id)
+    subscriber = publisher.subscribe()
+    try:
+        yield f'retry: {int(publish_interval() * 1000) * 3}\n\n'
+        while (remaining := deadline - loop.time()) > 0:
+            snapshot = await subscriber.next(min(keepalive_interval(), remaining))
+            if snapshot is None:
+                # Comentariu SSE: ține conexiunea deschisă prin proxy-uri
+                yield ': keepalive\n\n'
+            else:
+                yield format_event(snapshot)
+    finally:
+        publisher.unsubscribe(subscriber)
@@ -0,0 +1,295 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.db.models import Count, Q, Sum
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import payments, webhooks
+from .models import Event, Payment, Reservation, TicketType, WebhookEvent
+from .reservations import set_stripe_count
+from .testing import FakeStripe
+from .ticket_editor import with_sold
+
+# 🏋️ Test de încărcare pentru deschiderea vânzărilor: mii de participanți simulați
+# parcurg, în paralel, drumul complet prin view-urile reale (client de test Django,
+# fără rețea): lista de evenimente -> pagina evenimentului -> rezervare -> plată
+# prin FakeProvider -> webhook semnat. La final se verifică invarianții stocului.
+
+STEPS = ['events_list', 'event_detail', 'reserve', 'payment_page', 'create_intent', 'webhook']
+PERCENTILES = [50, 95, 99]
+
+
+@dataclass
+class LoadTestConfig:
+    participants: int = 2000
+    workers: int = 50
+    events: int = 3
+    ticket_types: int = 2
+    stock: int = 500
+    max_quantity: int = 4
+    stripes: int = 1
+    seed: int = 1
+    # Secunde adăugate de FakeProvider fiecărui apel, ca latența unui procesator real
+    payment_latency: float = 0.0
+
+
+@dataclass
+class _Samples:
+    durations: dict = field(default_factory=lambda: {step: [] for step in STEPS})
+    errors: dict = field(default_factory=lambda: {step: 0 for step in STEPS})
+    outcomes: dict = field(default_factory=lambda: {'purchased': 0, 'sold_out': 0, 'failed': 0})
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, step, elapsed, ok):
+        with self.lock:
+            self.durations[step].append(elapsed)
+            if not ok:
+                self.errors[step] += 1
+
+    def outcome(self, name):
+        with self.lock:
+            self.outcomes[name] += 1
+
+
+def percentile(values, q):
+    """Percentila `q` (metoda nearest-rank) dintr-o listă sortată."""
+    if not values:
+        return None
+    rank = max(1, -(-q * len(values) // 100))
+    return values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    steps = {}
+    for step in STEPS:
+        values = sorted(samples.durations[step])
+        steps[step] = {
+            'count': len(values),
+            'errors': samples.errors[step],
+            'throughput': round(len(values) / elapsed, 2) if elapsed else 0.0,
+            'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else None,
+            'max_ms': round(values[-1] * 1000, 2) if values else None,
+            **{f'p{q}_ms': round(percentile(values, q) * 1000, 2) if values else None for q in PERCENTILES},
+        }
+    return steps
+
+
+def setup_data(config, prefix):
+    """Creează organizatorul, evenimentele și participanții (utilizatori fără parolă)."""
+    User = get_user_model()
+    organizer = User.objects.create_user(f'{prefix}-org', is_organizer=True)
+    start = timezone.now() + timedelta(days=30)
+    ticket_types = []
+    for e in range(config.events):
+        event = Event.objects.create(
+            organizer=organizer, title=f'Load test {e}', description='-', location='-',
+            start_date=start, end_date=start + timedelta(hours=3),
+        )
+        for t in range(config.ticket_types):
+            ticket_type = TicketType.objects.create(
+                event=event, name=f'Tip {t}', price='49.90',
+                total_quantity=config.stock, available_quantity=config.stock,
+            )
+            if config.stripes > 1:
+                ticket_type = set_stripe_count(ticket_type, config.stripes)
+            ticket_types.append(ticket_type)
+        event.refresh_availability()
+
+    User.objects.bulk_create(
+        User(username=f'{prefix}-{i}', is_participant=True) for i in range(config.participants)
+    )
+    participants = list(User.objects.filter(username__startswith=f'{prefix}-').exclude(pk=organizer.pk))
+    return organizer, ticket_types, participants
+
+
+def _timed(samples, step, call, ok_statuses=(200, 302)):
+    started = time.perf_counter()
+    response = call()
+    ok = response.status_code in ok_statuses
+    samples.add(step, time.perf_counter() - started, ok)
+    return response if ok else None
+
+
+def _logged_in(user):
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+    return client
+
+
+def _retrying(query):
+    # Interogările harness-ului (nu ale aplicației) se reiau dacă SQLite e blocat
+    while True:
+        try:
+            return query()
+        except OperationalError:
+            time.sleep(0.001)
+
+
+def _participant(user, client, ticket_types, config, samples, stripe, prefix, index):
+    rng = random.Random(config.seed * 1_000_003 + index)
+    ticket_type = rng.choice(ticket_types)
+    quantity = rng.randint(1, config.max_quantity)
+    try:
+        if not _timed(samples, 'events_list', lambda: client.get(reverse('events_list'))):
+            return samples.outcome('failed')
+        detail_url = reverse('event_detail', args=[ticket_type.event_id])
+        if not _timed(samples, 'event_detail', lambda: client.get(detail_url)):
+            return samples.outcome('failed')
+
+        response = _timed(samples, 'reserve', lambda: client.post(
+            detail_url, {'ticket_id': ticket_type.pk, 'quantity': quantity}
+        ))
+        if response is None:
+            return samples.outcome('failed')
+        if getattr(response, 'url', None) != reverse('my_reservations'):
+            return samples.outcome('sold_out')
+
+        reservation_id = _retrying(
+            lambda: Reservation.objects.filter(user=user).values_list('pk', flat=True).latest('pk')
+        )
+        if not _timed(samples, 'payment_page', lambda: client.get(reverse('payment_page', args=[reservation_id]))):
+            return samples.outcome('failed')
+        response = _timed(samples, 'create_intent', lambda: client.get(
+            reverse('create_payment_intent', args=[reservation_id])
+        ))
+        if response is None:
+            return samples.outcome('failed')
+
+        # Clientul confirmă plata la procesator, care trimite apoi webhook-ul
+        intent_id = response.json()['clientSecret'].split('_secret_')[0]
+        payments.get_provider().set_status(intent_id, 'succeeded')
+        event = stripe.payment_intent_event('payment_intent.succeeded', intent_id, event_id=f'evt_{prefix}_{index}')
+        if not _timed(samples, 'webhook', lambda: stripe.deliver(client, event), ok_statuses=(200,)):
+            return samples.outcome('failed')
+        samples.outcome('purchased')
+    finally:
+        connection.close()
+
+
+def _webhook_worker(stop):
+    # Ca `manage.py process_webhooks --loop`, în paralel cu cumpărătorii
+    try:
+        while not stop.is_set():
+            try:
+                done = webhooks.process_pending(batch_size=100)
+            except OperationalError:
+                # SQLite blochează scrierile concurente; worker-ul reîncearcă
+                stop.wait(0.01)
+                continue
+            if not done:
+                stop.wait(0.05)
+    finally:
+        connection.close()
+
+
+def check_invariants(ticket_types, purchased=None, webhooks_processed=None):
+    """Întoarce lista încălcărilor: vânzare peste stoc, stoc pierdut sau plăți neconfirmate."""
+    violations = []
+    if purchased is not None and webhooks_processed != purchased:
+        violations.append(f"{purchased} plăți confirmate la procesator, {webhooks_processed} webhook-uri procesate")
+    rows = with_sold(TicketType.objects.filter(pk__in=[t.pk for t in ticket_types])).annotate(
+        stripe_stock=Sum('stripes__available_quantity'),
+    )
+    for row in rows:
+        stock = row.available_quantity + (row.stripe_stock or 0)
+        if row.sold > row.total_quantity:
+            violations.append(f"{row.pk}: {row.sold} bilete rezervate din {row.total_quantity}")
+        if stock + row.sold != row.total_quantity:
+            violations.append(
+                f"{row.pk}: stoc {stock} + rezervate {row.sold} != total {row.total_quantity}"
+            )
+    unconfirmed = Payment.objects.filter(
+        reservation__ticket_type__in=ticket_types, status='completed', reservation__confirmed=False,
+    ).count()
+    if unconfirmed:
+        violations.append(f"{unconfirmed} plăți finalizate cu rezervarea neconfirmată")
+    return violations
+
+
+def _totals(ticket_types):
+    reservations = Reservation.objects.filter(ticket_type__in=ticket_types)
+    totals = reservations.aggregate(
+        reservations=Count('pk'),
+        tickets=Sum('quantity'),
+        paid=Count('pk', filter=Q(payment__status='completed')),
+    )
+    totals['stock'] = sum(t.total_quantity for t in ticket_types)
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def cleanup(organizer, prefix):
+    # Evenimentele, biletele și rezervările se șterg în cascadă; inbox-ul nu are cheie externă
+    organizer.organized_events.all().delete()
+    WebhookEvent.objects.filter(event_id__startswith=f'evt_{prefix}_').delete()
+    get_user_model().objects.filter(username__startswith=f'{prefix}-').delete()
+
+
+def run(config, keep=False):
+    """Rulează scenariul și întoarce rezultatul (serializabil JSON)."""
+    prefix = f'load-{time.time_ns()}'
+    overrides = override_settings(
+        PAYMENT_PROVIDER='events.payments.FakeProvider',
+        PAYMENT_FAKE_LATENCY=config.payment_latency,
+        STRIPE_WEBHOOK_SECRET=getattr(settings, 'STRIPE_WEBHOOK_SECRET', None) or 'whsec_loadtest',
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+    )
+    with overrides:
+        organizer, ticket_types, participants = setup_data(config, prefix)
+        # Autentificarea (sesiunile) face parte din pregătire, nu din măsurătoare
+        clients = [_logged_in(user) for user in participants]
+        samples, stripe = _Samples(), FakeStripe()
+        stop = threading.Event()
+        try:
+            worker = threading.Thread(target=_webhook_worker, args=(stop,))
+            worker.start()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=config.workers) as pool:
+                futures = [
+                    pool.submit(_participant, user, client, ticket_types, config, samples, stripe, prefix, index)
+                    for index, (user, client) in enumerate(zip(participants, clients))
+                ]
+                for future in futures:
+                    future.result()
+            elapsed = time.perf_counter() - started
+            stop.set()
+            worker.join()
+
+            # Ce a rămas în inbox după ultimul cumpărător
+            drain_started = time.perf_counter()
+            # (un eveniment care a eșuat e reîncercat abia la următoarea trecere)
+            inbox = WebhookEvent.objects.filter(event_id__startswith=f'evt_{prefix}_')
+            for _ in range(webhooks.max_attempts()):
+                webhooks.process_pending(batch_size=500)
+                if not inbox.filter(processed_at__isnull=True).exists():
+                    break
+            drain = time.perf_counter() - drain_started
+            processed = inbox.filter(processed_at__isnull=False).count()
+
+            violations = check_invariants(ticket_types, samples.outcomes['purchased'], processed)
+            return {
+                'started_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'config': asdict(config),
+                'elapsed_s': round(elapsed, 3),
+                'purchases_per_s': round(samples.outcomes['purchased'] / elapsed, 2) if elapsed else 0.0,
+                'outcomes': samples.outcomes,
+                'steps': summarize(samples, elapsed),
+                'webhooks_processed': processed,
+                'webhook_drain_s': round(drain, 3),
+                'totals': _totals(ticket_types),
+                'invariants': {'ok': not violations, 'violations': violations},
+            }
+        finally:
+            stop.set()
+            if not keep:
+                cleanup(organizer, prefix)
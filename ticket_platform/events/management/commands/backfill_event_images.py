@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from events.images import backfill_assets, process_pending
+
+
+class Command(BaseCommand):
+    help = "Generează variantele pentru imaginile evenimentelor încărcate înainte de pipeline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help="Imagini procesate în paralel.")
+
+    def handle(self, *args, **options):
+        created = backfill_assets()
+        self.stdout.write(f"{created} imagini noi înregistrate.")
+        processed = process_pending(workers=options['workers'])
+        self.stdout.write(f"{processed} imagini procesate.")
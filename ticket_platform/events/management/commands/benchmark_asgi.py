@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from events.loadtest import percentile
+from events.models import Event, TicketType
+
+HOST = 'testserver'
+
+
+def _rss_kb():
+    # ru_maxrss e în KB pe Linux și în bytes pe macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _environ(path, query):
+    return {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0), 'wsgi.multithread': True,
+        'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+
+def _scope(path, query):
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', HOST.encode())], 'server': (HOST, 80), 'client': ('127.0.0.1', 50000),
+    }
+
+
+def run_wsgi(urls, concurrency, per_connection):
+    """Un fir per conexiune, ca un server WSGI cu fire (ex. gunicorn --threads)."""
+    handler = WSGIHandler()
+    latencies, statuses = [], []
+
+    def connection(index):
+        for n in range(per_connection):
+            path, query = urls[(index + n * concurrency) % len(urls)]
+            started = time.perf_counter()
+            response = []
+            body = handler(_environ(path, query), lambda status, headers, exc_info=None: response.append(status))
+            for _ in body:
+                pass
+            body.close()
+            latencies.append(time.perf_counter() - started)
+            statuses.append(int(response[0].split()[0]))
+
+    threads = [threading.Thread(target=connection, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, statuses
+
+
+def run_asgi(urls, concurrency, per_connection):
+    """O corutină per conexiune, ca un server ASGI (ex. uvicorn)."""
+    handler = ASGIHandler()
+    latencies, statuses = [], []
+
+    async def request(path, query):
+        done = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await handler(_scope(path, query), receive, send)
+        done.set()
+
+    async def connection(index):
+        for n in range(per_connection):
+            started = time.perf_counter()
+            await request(*urls[(index + n * concurrency) % len(urls)])
+            latencies.append(time.perf_counter() - started)
+
+    async def main():
+        started = time.perf_counter()
+        await asyncio.gather(*(connection(i) for i in range(concurrency)))
+        return time.perf_counter() - started
+
+    return asyncio.run(main()), latencies, statuses
+
+
+RUNNERS = {'wsgi': run_wsgi, 'asgi': run_asgi}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compară WSGI și ASGI pe paginile de citire (listă, căutare, detalii eveniment): "
+        "cereri/secundă, latență și memorie per conexiune concurentă, la aceeași încărcare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 200])
+        parser.add_argument('--requests', type=int, default=2000, help="Cereri per rulare.")
+        parser.add_argument('--events', type=int, default=50)
+        parser.add_argument('--output', help="Fișier JSON în care se salvează rezultatele.")
+        # Folosit intern: fiecare rulare are propriul proces, ca memoria să fie măsurată curat
+        parser.add_argument('--worker', choices=sorted(RUNNERS), help=argparse.SUPPRESS)
+        parser.add_argument('--event-ids', type=int, nargs='*', default=[], help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self._worker(options)
+
+        event_ids, organizer = self._setup(options['events'])
+        results = []
+        try:
+            for concurrency in options['concurrency']:
+                for mode in sorted(RUNNERS, reverse=True):
+                    results.append(self._spawn(mode, concurrency, options['requests'], event_ids))
+        finally:
+            organizer.organized_events.all().delete()
+            organizer.delete()
+
+        self.stdout.write(
+            f"{'mod':<6}{'conexiuni':>10}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'erori':>7}{'KB/conexiune':>14}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['mode']:<6}{row['concurrency']:>10}{row['rps']:>10}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+                f"{row['p99_ms']:>9}{row['errors']:>7}{row['rss_per_connection_kb']:>14}"
+            )
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({
+                'started_at': timezone.now().isoformat(), 'results': results,
+            }, indent=2))
+            self.stdout.write(f"Rezultatele au fost salvate în {options['output']}.")
+
+    def _setup(self, count):
+        organizer = get_user_model().objects.create_user(f'bench-asgi-{time.time_ns()}', is_organizer=True)
+        start = timezone.now() + timedelta(days=7)
+        event_ids = []
+        for i in range(count):
+            event = Event.objects.create(
+                organizer=organizer, title=f'Benchmark {i}', description='Concert în aer liber', location='Cluj',
+                start_date=start + timedelta(hours=i), end_date=start + timedelta(hours=i + 3),
+            )
+            TicketType.objects.create(event=event, name='General', price=50, total_quantity=100, available_quantity=100)
+            event.refresh_availability()
+            event_ids.append(event.pk)
+        return event_ids, organizer
+
+    def _spawn(self, mode, concurrency, total, event_ids):
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_asgi', '--worker', mode,
+            '--concurrency', str(concurrency), '--requests', str(total),
+            '--event-ids', *map(str, event_ids),
+        ]
+        output = subprocess.run(command, check=True, capture_output=True, text=True, env=os.environ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def _worker(self, options):
+        concurrency = options['concurrency'][0]
+        per_connection = max(1, options['requests'] // concurrency)
+        urls = [(reverse('events_list'), ''), (reverse('events_list'), 'q=concert&format=json')]
+        urls += [(reverse('event_detail', args=[pk]), '') for pk in options['event_ids']]
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, HOST]):
+            runner = RUNNERS[options['worker']]
+            runner(urls, min(concurrency, 4), 2)  # încălzire: importuri, șabloane, cache
+            rss_before = _rss_kb()
+            elapsed, latencies, statuses = runner(urls, concurrency, per_connection)
+            rss_growth = max(0, _rss_kb() - rss_before)
+
+        latencies.sort()
+        self.stdout.write(json.dumps({
+            'mode': options['worker'],
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'errors': sum(status >= 400 for status in statuses),
+            'elapsed_s': round(elapsed, 3),
+            'rps': round(len(latencies) / elapsed, 1),
+            **{f'p{q}_ms': round(percentile(latencies, q) * 1000, 1) for q in (50, 95, 99)},
+            'rss_growth_kb': rss_growth,
+            'rss_per_connection_kb': round(rss_growth / concurrency, 1),
+        }))
@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError
+from django.utils import timezone
+
+from events.models import Event, TicketType
+from events.reservations import SoldOut, reserve_tickets, set_stripe_count
+
+
+class Command(BaseCommand):
+    help = "Măsoară câte rezervări pe secundă suportă un tip de bilet, pentru diferite numere de benzi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stripes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+        parser.add_argument('--stock', type=int, default=2000)
+        parser.add_argument('--workers', type=int, default=32)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        buyer = User.objects.create_user(f"bench-{time.time_ns()}", is_participant=True)
+        try:
+            for stripes in options['stripes']:
+                elapsed = self._run(buyer, stripes, options['stock'], options['workers'])
+                self.stdout.write(
+                    f"stripes={stripes:>3}  {options['stock'] / elapsed:>9.0f} rezervări/s  ({elapsed:.2f}s)"
+                )
+        finally:
+            # Evenimentele și rezervările de test se șterg în cascadă
+            buyer.organized_events.all().delete()
+            buyer.delete()
+
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite serializează toate scrierile; diferențele apar pe PostgreSQL/MySQL."
+            ))
+
+    def _run(self, buyer, stripes, stock, workers):
+        now = timezone.now()
+        event = Event.objects.create(
+            organizer=buyer, title="Benchmark", description="-", location="-",
+            start_date=now + timedelta(days=1), end_date=now + timedelta(days=1, hours=1),
+        )
+        ticket_type = TicketType.objects.create(
+            event=event, name="Bench", price=1, total_quantity=stock, available_quantity=stock,
+        )
+        ticket_type = set_stripe_count(ticket_type, stripes)
+
+        barrier = threading.Barrier(workers)
+
+        def worker():
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        reserve_tickets(buyer, ticket_type, 1)
+                    except SoldOut:
+                        return
+                    except OperationalError:
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(worker) for _ in range(workers)]:
+                future.result()
+        return time.perf_counter() - started
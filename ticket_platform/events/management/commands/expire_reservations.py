@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = "Eliberează biletele din rezervările neplătite al căror timp de așteptare a expirat."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Rulează continuu, ca worker.")
+        parser.add_argument('--interval', type=float, default=30, help="Secunde între rulări în modul --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_reservations(batch_size=options['batch_size'])
+            if expired or not options['loop']:
+                self.stdout.write(f"{expired} rezervări expirate au fost eliberate.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from events.importer import BATCH_SIZE, import_events
+
+
+class Command(BaseCommand):
+    help = "Importă evenimente și tipuri de bilete dintr-un fișier CSV sau JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--organizer', required=True, help="Username-ul organizatorului.")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Implicit, după extensia fișierului.")
+        parser.add_argument('--dry-run', action='store_true', help="Doar validează, fără să scrie nimic.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        organizer = get_user_model().objects.filter(username=options['organizer'], is_organizer=True).first()
+        if organizer is None:
+            raise CommandError(f"Organizatorul {options['organizer']} nu există.")
+        file_format = options['format'] or ('json' if path.suffix.lower() == '.json' else 'csv')
+
+        with path.open('rb') as source:
+            result = import_events(
+                organizer, source, file_format,
+                dry_run=options['dry_run'], batch_size=options['batch_size'],
+            )
+
+        for line, message in result.errors:
+            self.stderr.write(f"Rândul {line}: {message}")
+        if result.errors:
+            raise CommandError(f"{len(result.errors)} erori; nu a fost importat nimic.")
+
+        verb = "ar fi importate" if result.dry_run else "importate"
+        self.stdout.write(f"{result.events} evenimente și {result.ticket_types} tipuri de bilete {verb}.")
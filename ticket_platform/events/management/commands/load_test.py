@@ -0,0 +1,53 @@
+import json
+from dataclasses import fields
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from events.loadtest import LoadTestConfig, PERCENTILES, STEPS, run
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulează deschiderea vânzărilor: participanți concurenți trec prin listă, pagina "
+        "evenimentului, rezervare, plată (FakeProvider) și webhook, apoi se verifică stocul. "
+        "Rulează pe baza de date configurată (SQLite sau PostgreSQL local)."
+    )
+
+    def add_arguments(self, parser):
+        for config_field in fields(LoadTestConfig):
+            parser.add_argument(
+                f"--{config_field.name.replace('_', '-')}", type=type(config_field.default),
+                default=config_field.default,
+            )
+        parser.add_argument('--output', help="Fișier JSON în care se salvează rezultatul, pentru comparații.")
+        parser.add_argument('--keep', action='store_true', help="Nu șterge datele create de test.")
+
+    def handle(self, *args, **options):
+        config = LoadTestConfig(**{f.name: options[f.name] for f in fields(LoadTestConfig)})
+        result = run(config, keep=options['keep'])
+
+        self.stdout.write(
+            f"{connection.vendor}: {config.participants} participanți, {config.workers} în paralel, "
+            f"{result['elapsed_s']}s, {result['purchases_per_s']} cumpărări/s"
+        )
+        self.stdout.write(f"rezultate: {result['outcomes']}, webhook-uri procesate: {result['webhooks_processed']}")
+        header = f"{'pas':<14}{'cereri':>8}{'erori':>7}{'req/s':>9}" + ''.join(f"{f'p{q} ms':>10}" for q in PERCENTILES)
+        self.stdout.write(header)
+        for step in STEPS:
+            row = result['steps'][step]
+            latencies = ''.join(f"{row[f'p{q}_ms'] if row['count'] else '-':>10}" for q in PERCENTILES)
+            self.stdout.write(f"{step:<14}{row['count']:>8}{row['errors']:>7}{row['throughput']:>9}{latencies}")
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(result, indent=2))
+            self.stdout.write(f"Rezultatul a fost salvat în {options['output']}.")
+
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite serializează toate scrierile; pentru cifre comparabile cu producția rulați pe PostgreSQL."
+            ))
+        if not result['invariants']['ok']:
+            raise CommandError("Invarianții stocului au fost încălcați:\n" + '\n'.join(result['invariants']['violations']))
+        self.stdout.write(self.style.SUCCESS("Invarianții stocului sunt respectați."))
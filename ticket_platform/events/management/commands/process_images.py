@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.images import process_pending
+
+
+class Command(BaseCommand):
+    help = "Generează variantele redimensionate (JPEG și WebP) pentru imaginile încărcate."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Imagini procesate în paralel.")
+        parser.add_argument('--loop', action='store_true', help="Rulează continuu, ca worker.")
+        parser.add_argument('--interval', type=float, default=5, help="Secunde între rulări în modul --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending(workers=options['workers'])
+            if processed or not options['loop']:
+                self.stdout.write(f"{processed} imagini procesate.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = "Procesează evenimentele de webhook salvate în inbox (o singură dată per eveniment)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Rulează continuu, ca worker.")
+        parser.add_argument('--interval', type=float, default=2, help="Secunde între rulări în modul --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending(batch_size=options['batch_size'])
+            if processed or not options['loop']:
+                self.stdout.write(f"{processed} evenimente de webhook procesate.")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from events import analytics
+
+
+class Command(BaseCommand):
+    help = "Recalculează rollup-urile de vânzări din rezervări și plăți."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', type=int, action='append', dest='events',
+                            help="Doar pentru evenimentul dat (se poate repeta).")
+
+    def handle(self, *args, **options):
+        count = analytics.rebuild(options['events'])
+        self.stdout.write(f"{count} rânduri de rollup recalculate.")
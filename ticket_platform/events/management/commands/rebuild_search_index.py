@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from events.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Reconstruiește indexul de căutare full-text pentru evenimente."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=None)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['database'])
+        count = backend.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(f"{count} evenimente indexate ({type(backend).__name__}).")
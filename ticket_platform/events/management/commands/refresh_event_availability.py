@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = "Recalculează stocul total, prețul minim și starea sold-out pentru toate evenimentele."
+
+    def handle(self, *args, **options):
+        count = Event.objects.refresh_availability()
+        self.stdout.write(f"{count} evenimente actualizate.")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from ticket_platform.db_router import replicas, replicate_sqlite
+
+
+class Command(BaseCommand):
+    help = (
+        "Copiază baza SQLite primară peste replicile din DATABASE_REPLICAS. Cu --loop, "
+        "replicile rămân în urmă cel mult --interval secunde (replicare simulată, pentru dezvoltare)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Rulează continuu, ca worker.")
+        parser.add_argument('--interval', type=float, default=1, help="Întârzierea replicării, în secunde.")
+
+    def handle(self, *args, **options):
+        aliases = replicas()
+        if not aliases:
+            raise CommandError("DATABASE_REPLICAS nu conține nicio replică.")
+        if any(connections[alias].vendor != 'sqlite' for alias in ['default', *aliases]):
+            raise CommandError("Replicarea simulată funcționează doar cu SQLite.")
+        while True:
+            replicate_sqlite()
+            if not options['loop']:
+                self.stdout.write(f"Replici actualizate: {', '.join(aliases)}.")
+                return
+            time.sleep(options['interval'])
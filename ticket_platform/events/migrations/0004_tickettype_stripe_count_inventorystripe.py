@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_rename_payment_date_payment_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettype',
+            name='stripe_count',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='InventoryStripe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('available_quantity', models.PositiveIntegerField(default=0)),
+                ('ticket_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stripes', to='events.tickettype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ticket_type', 'index'), name='unique_stripe_per_ticket_type')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_tickettype_stripe_count_inventorystripe'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['confirmed', 'created_at'], name='reservation_hold_idx'),
+        ),
+    ]
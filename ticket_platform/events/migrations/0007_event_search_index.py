@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE events_event_fts USING fts5("
+            "title, location, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO events_event_fts (rowid, title, location, description) "
+            "SELECT id, title, location, description FROM events_event"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE events_event_search ("
+            "event_id bigint PRIMARY KEY REFERENCES events_event (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX events_event_search_document_idx ON events_event_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO events_event_search (event_id, document) "
+            "SELECT id, setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', location), 'B') || "
+            "setweight(to_tsvector('simple', description), 'C') FROM events_event"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS events_event_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS events_event_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_admission_rate'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
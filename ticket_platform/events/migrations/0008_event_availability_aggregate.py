@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:08
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Min
+from django.db.models.functions import Coalesce
+
+
+def backfill_availability(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    TicketType = apps.get_model('events', 'TicketType')
+    InventoryStripe = apps.get_model('events', 'InventoryStripe')
+
+    tickets = TicketType.objects.filter(event=OuterRef('pk')).order_by().values('event')
+    stripes = InventoryStripe.objects.filter(ticket_type__event=OuterRef('pk')).order_by().values('ticket_type__event')
+    Event.objects.update(
+        tickets_available=(
+            Coalesce(Subquery(tickets.annotate(total=Sum('available_quantity')).values('total')), 0)
+            + Coalesce(Subquery(stripes.annotate(total=Sum('available_quantity')).values('total')), 0)
+        ),
+        min_price=Subquery(tickets.annotate(price=Min('price')).values('price')),
+    )
+    Event.objects.filter(tickets_available=0, ticket_types__isnull=False).update(is_sold_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='is_sold_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='tickets_available',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0010_webhook_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('reservations', models.IntegerField(default=0)),
+                ('tickets_reserved', models.IntegerField(default=0)),
+                ('paid_reservations', models.IntegerField(default=0)),
+                ('tickets_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('released_reservations', models.IntegerField(default=0)),
+                ('released_tickets', models.IntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='events.event')),
+                ('ticket_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='events.tickettype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'day'], name='sales_rollup_event_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ticket_type', 'day', 'shard'), name='unique_sales_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_image_asset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckIn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat', models.PositiveSmallIntegerField()),
+                ('checked_in_at', models.DateTimeField()),
+                ('gate', models.CharField(blank=True, max_length=50)),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='check_ins', to='events.reservation')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('reservation', 'seat'), name='unique_check_in')],
+            },
+        ),
+    ]
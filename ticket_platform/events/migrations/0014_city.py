@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:08
+
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Copie a events.cities.normalize: migrația nu trebuie să depindă de codul care se schimbă
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r'[\W_]+', ' ', stripped.casefold()).strip()
+
+
+def backfill_cities(apps, schema_editor):
+    City = apps.get_model('events', 'City')
+    Event = apps.get_model('events', 'Event')
+
+    # Orașul e ultima parte a locației ("Sala Palatului, București")
+    spellings = defaultdict(Counter)
+    locations = defaultdict(list)
+    for location, count in Event.objects.order_by().values_list('location').annotate(count=Count('pk')):
+        name = location.rsplit(',', 1)[-1].strip()[:100]
+        key = normalize(name)[:100]
+        if key:
+            spellings[key][name] += count
+            locations[key].append(location)
+
+    # Numele afișat e scrierea cea mai folosită; la egalitate, cea cu diacritice și majusculă
+    def preferred(names):
+        return max(names, key=lambda name: (names[name], sum(ord(c) > 127 for c in name), name.istitle(), name))
+
+    City.objects.bulk_create(
+        [City(normalized=key, name=preferred(names)) for key, names in spellings.items()], batch_size=1000,
+    )
+    for key, pk in City.objects.values_list('normalized', 'pk'):
+        for start in range(0, len(locations[key]), 500):
+            Event.objects.filter(location__in=locations[key][start:start + 500]).update(city_id=pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_check_in'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('normalized', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'cities',
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='city',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='events.city'),
+        ),
+        migrations.RunPython(backfill_cities, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,72 @@
 from django.db import models
+from django.db.models import Case, Exists, F, OuterRef, Subquery, Sum, Min, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.lookups import GreaterThan
 from django.conf import settings
 
+
+class EventQuerySet(models.QuerySet):
+    @staticmethod
+    def _available_expression():
+        tickets = (
+            TicketType.objects.filter(event=OuterRef('pk')).order_by()
+            .values('event').annotate(total=Sum('available_quantity')).values('total')
+        )
+        stripes = (
+            InventoryStripe.objects.filter(ticket_type__event=OuterRef('pk')).order_by()
+            .values('ticket_type__event').annotate(total=Sum('available_quantity')).values('total')
+        )
+        return Coalesce(Subquery(tickets), 0) + Coalesce(Subquery(stripes), 0)
+
+    @staticmethod
+    def _min_price_expression():
+        return Subquery(
+            TicketType.objects.filter(event=OuterRef('pk')).order_by()
+            .values('event').annotate(price=Min('price')).values('price')
+        )
+
+    def with_availability(self):
+        # Calcul direct din TicketType, într-o singură interogare (fără N+1)
+        return self.annotate(
+            live_tickets_available=self._available_expression(),
+            live_min_price=self._min_price_expression(),
+        )
+
+    def refresh_availability(self):
+        # Recalculează câmpurile denormalizate cu un singur UPDATE
+        available = self._available_expression()
+        return self.update(
+            tickets_available=available,
+            min_price=self._min_price_expression(),
+            is_sold_out=Case(
+                When(GreaterThan(available, 0), then=Value(False)),
+                When(Exists(TicketType.objects.filter(event=OuterRef('pk'))), then=Value(True)),
+                default=Value(False),
+            ),
+        )
+
+    def adjust_availability(self, delta):
+        # Variația de stoc a unei rezervări / eliberări: un UPDATE pe coloane, fără subinterogări.
+        # În SET, F('tickets_available') e valoarea dinainte de UPDATE.
+        return self.update(
+            tickets_available=Greatest(F('tickets_available') + delta, Value(0)),
+            is_sold_out=Case(When(tickets_available__lte=-delta, then=Value(True)), default=Value(False)),
+        )
+
+
+# 🏙️ Orașele evenimentelor, normalizate: "Cluj-Napoca", "cluj napoca" și "CLUJ-NAPOCA"
+# sunt același rând. `normalized` e forma fără diacritice și majuscule (cities.normalize).
+class City(models.Model):
+    name = models.CharField(max_length=100)
+    normalized = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        verbose_name_plural = 'cities'
+
+    def __str__(self):
+        return self.name
+
+
 class Event(models.Model):
     organizer = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -10,21 +76,53 @@ class Event(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     location = models.CharField(max_length=255)
+    # Orașul normalizat, dedus din `location` la salvare (vezi events/cities.py)
+    city = models.ForeignKey(
+        'City', on_delete=models.SET_NULL, blank=True, null=True, related_name='events', editable=False
+    )
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     image = models.ImageField(upload_to='events/', blank=True, null=True)
+    # Variantele redimensionate ale imaginii (generate de worker, vezi events/images.py)
+    image_asset = models.ForeignKey(
+        'ImageAsset', on_delete=models.SET_NULL, blank=True, null=True, related_name='events', editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     theme_color = models.CharField(max_length=20, default="#4f46e5")
     banner_text = models.CharField(max_length=100, blank=True, null=True)
     promo_message = models.TextField(blank=True, null=True)
+    # Coadă virtuală la rezervare: câți vizitatori sunt admiși pe minut (gol = fără coadă)
+    admission_rate = models.PositiveIntegerField(blank=True, null=True)
+    # Agregate denormalizate din TicketType, actualizate la orice schimbare de stoc
+    tickets_available = models.PositiveIntegerField(default=0, editable=False)
+    min_price = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True, editable=False)
+    is_sold_out = models.BooleanField(default=False, editable=False)
+
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_date', 'id'], name='event_start_idx'),
+            models.Index(fields=['organizer', 'start_date'], name='event_organizer_start_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Locația citită din baza de date: orașul se caută din nou doar dacă ea se schimbă
+        instance._saved_location = instance.__dict__.get('location')
+        return instance
+
     @property
     def available_tickets(self):
-        total = sum(t.available_quantity for t in self.ticket_types.all())
-        return total
+        return self.tickets_available
+
+    def refresh_availability(self):
+        Event.objects.filter(pk=self.pk).refresh_availability()
+        self.refresh_from_db(fields=['tickets_available', 'min_price', 'is_sold_out'])
 
 
 class TicketType(models.Model):
@@ -33,10 +131,37 @@ class TicketType(models.Model):
     price = models.DecimalField(max_digits=8, decimal_places=2)
     total_quantity = models.PositiveIntegerField()
     available_quantity = models.PositiveIntegerField()
+    # 1 = stoc într-un singur rând; >1 = stocul e împărțit pe mai multe rânduri (InventoryStripe)
+    stripe_count = models.PositiveSmallIntegerField(default=1)
 
     def __str__(self):
         return f"{self.name} - {self.event.title}"
 
+    @property
+    def is_striped(self):
+        return self.stripe_count > 1
+
+    @property
+    def stock(self):
+        # Stocul total disponibil, indiferent de modul de stocare
+        if not self.is_striped:
+            return self.available_quantity
+        return self.available_quantity + sum(s.available_quantity for s in self.stripes.all())
+
+
+class InventoryStripe(models.Model):
+    ticket_type = models.ForeignKey(TicketType, on_delete=models.CASCADE, related_name='stripes')
+    index = models.PositiveSmallIntegerField()
+    available_quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticket_type', 'index'], name='unique_stripe_per_ticket_type'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_type.name} #{self.index} ({self.available_quantity})"
+
 
 class Reservation(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reservations')
@@ -45,9 +170,33 @@ class Reservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     confirmed = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Folosit de curățarea rezervărilor neplătite (expire_reservations). Index parțial:
+            # filtrul confirmed=False devine `NOT confirmed`, pe care un index compus nu îl folosește.
+            models.Index(fields=['created_at'], condition=models.Q(confirmed=False), name='reservation_pending_idx'),
+            # my_tickets / my_reservations
+            models.Index(fields=['user', 'confirmed'], name='reservation_user_confirmed_idx'),
+            # ticket_management: rezervările unui eveniment, după tipul de bilet
+            models.Index(fields=['ticket_type', 'created_at'], name='reservation_tt_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.ticket_type.name}"
 
+    @property
+    def hold_expires_at(self):
+        if self.confirmed:
+            return None
+        from .reservations import hold_ttl
+        return self.created_at + hold_ttl()
+
+    @property
+    def ticket_codes(self):
+        """Codurile semnate, câte unul pe loc (vezi events.checkin)."""
+        from .checkin import ticket_code
+        return [ticket_code(self.ticket_type.event_id, self.pk, seat) for seat in range(1, self.quantity + 1)]
+
 
 class Payment(models.Model):
     reservation = models.OneToOneField(
@@ -63,6 +212,142 @@ class Payment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Căutarea plății în webhook-ul Stripe
+            models.Index(fields=['stripe_payment_intent'], name='payment_intent_idx'),
+        ]
+
     def __str__(self):
         return f"Plată {self.id} - {self.reservation.user.username} ({self.status})"
 
+
+
+# 📬 Inbox pentru webhook-uri: fiecare eveniment primit de la procesatorul de plăți
+# este salvat o singură dată (după id-ul lui) și procesat ulterior de un worker.
+class WebhookEvent(models.Model):
+    provider = models.CharField(max_length=20, default='stripe')
+    event_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    occurred_at = models.DateTimeField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='unique_webhook_event'),
+        ]
+        indexes = [
+            # Coada worker-ului: doar evenimentele neprocesate, în ordinea apariției
+            models.Index(
+                fields=['occurred_at', 'id'], name='webhook_pending_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.event_type} ({self.event_id})"
+
+
+# 📊 Totaluri de vânzări pe tip de bilet și zi (ziua creării rezervării), actualizate
+# incremental la rezervare, eliberare și plată. Panoul organizatorului citește doar de aici.
+class SalesRollup(models.Model):
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='sales_rollups')
+    ticket_type = models.ForeignKey(TicketType, on_delete=models.CASCADE, related_name='sales_rollups')
+    day = models.DateField()
+    # Tipurile cu benzi scriu pe mai multe rânduri pe zi, ca și stocul; totalul e suma lor
+    shard = models.PositiveSmallIntegerField(default=0)
+
+    # Rezervările existente (recalculabile oricând din Reservation / Payment)
+    reservations = models.IntegerField(default=0)
+    tickets_reserved = models.IntegerField(default=0)
+    paid_reservations = models.IntegerField(default=0)
+    tickets_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # Rezervările șterse (expirate, anulate); există doar aici, reconstruirea le păstrează
+    released_reservations = models.IntegerField(default=0)
+    released_tickets = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticket_type', 'day', 'shard'], name='unique_sales_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['event', 'day'], name='sales_rollup_event_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticket_type_id} {self.day}: {self.tickets_sold} bilete, {self.revenue} RON"
+
+
+# 🖼️ O imagine încărcată, identificată după conținut (SHA-256): aceeași poză încărcată
+# de mai multe ori e stocată și procesată o singură dată.
+class ImageAsset(models.Model):
+    content_hash = models.CharField(max_length=64, unique=True)
+    original = models.CharField(max_length=255)
+    # {"card": {"width": 480, "height": 270, "jpeg": "events/variants/...", "webp": "..."}, ...}
+    variants = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], name='image_asset_pending_idx',
+                         condition=models.Q(processed_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return self.original
+
+
+# 🚪 Intrarea la eveniment: un rând per loc scanat. Constrângerea unică face ca un
+# bilet să fie validat o singură dată, chiar dacă mai multe porți îl trimit simultan.
+class CheckIn(models.Model):
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='check_ins')
+    seat = models.PositiveSmallIntegerField()
+    checked_in_at = models.DateTimeField()
+    gate = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'seat'], name='unique_check_in'),
+        ]
+
+    def __str__(self):
+        return f"{self.reservation_id}/{self.seat} @ {self.checked_in_at}"
+
+
+# 🔎 Tabelele indexului de căutare (create de migrarea 0007, câte unul pe bază de date).
+# Nu sunt gestionate de Django: modelele există doar ca lista de evenimente să le poată
+# uni (JOIN) cu evenimentele și să calculeze relevanța o singură dată pe rând.
+class EventFullTextEntry(models.Model):
+    """Rândul evenimentului în tabelul virtual FTS5 (SQLite); rowid = id-ul evenimentului."""
+
+    event = models.OneToOneField(
+        Event, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='fts_entry',
+    )
+    # Coloana ascunsă FTS5: scorul bm25 al potrivirii curente (mai mic = mai relevant)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'events_event_fts'
+
+
+class EventSearchDocument(models.Model):
+    """Documentul tsvector al evenimentului (PostgreSQL)."""
+
+    event = models.OneToOneField(
+        Event, on_delete=models.DO_NOTHING, primary_key=True, related_name='search_document',
+    )
+    document = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'events_event_search'
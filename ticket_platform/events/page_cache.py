@@ -0,0 +1,131 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import QueryDict
+
+# 🗄️ Cache pentru fragmentele paginilor de evenimente. Cheile includ o versiune:
+# la orice modificare versiunea crește, iar fragmentele vechi nu mai sunt citite.
+
+LISTING_VERSION_KEY = 'events:listing:version'
+# Parametrii care schimbă lista (filtre, fațete, sortare, pagină); restul (utm_*, fbclid...)
+# nu ajung în chei, altfel orice link de campanie ar crea o intrare nouă în cache.
+LISTING_PARAMS = (
+    'q', 'date', 'date_from', 'date_to', 'upcoming', 'max_price',
+    'city', 'when', 'price', 'available', 'sort', 'cursor',
+)
+
+
+def cache_alias():
+    return getattr(settings, 'EVENTS_CACHE', 'default')
+
+
+def cache_timeout():
+    return getattr(settings, 'EVENTS_CACHE_TIMEOUT', 300)
+
+
+def facets_timeout():
+    # Numărătorile includ disponibilitatea, care se schimbă la fiecare rezervare
+    return getattr(settings, 'EVENTS_FACETS_TIMEOUT', 60)
+
+
+def get_cache():
+    return caches[cache_alias()]
+
+
+def _event_version_key(event_id):
+    return f'events:event:{event_id}:version'
+
+
+def _version(key):
+    cache = get_cache()
+    return cache.get_or_set(key, 1, timeout=None)
+
+
+async def _aversion(key):
+    return await get_cache().aget_or_set(key, 1, timeout=None)
+
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def event_version(event_id):
+    return _version(_event_version_key(event_id))
+
+
+def listing_version():
+    return _version(LISTING_VERSION_KEY)
+
+
+async def aevent_version(event_id):
+    return await _aversion(_event_version_key(event_id))
+
+
+async def alisting_version():
+    return await _aversion(LISTING_VERSION_KEY)
+
+
+def _bump_versions(event_id, listing):
+    _bump(_event_version_key(event_id))
+    if listing:
+        _bump(LISTING_VERSION_KEY)
+
+
+def invalidate_event(event_id, listing=True):
+    _bump_versions(event_id, listing)
+    # O cerere paralelă poate pune în cache datele vechi înainte de commit,
+    # așa că mai creștem versiunea o dată după ce tranzacția se încheie.
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_versions(event_id, listing))
+
+
+def invalidate_listing():
+    _bump(LISTING_VERSION_KEY)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(LISTING_VERSION_KEY))
+
+
+def listing_params(params):
+    """Doar parametrii cunoscuți ai listei, nevizi, în ordinea din LISTING_PARAMS."""
+    known = QueryDict(mutable=True)
+    for name in LISTING_PARAMS:
+        values = sorted(value for value in params.getlist(name) if value)
+        if values:
+            known.setlist(name, values)
+    return known
+
+
+def _params_digest(params):
+    # Aceeași combinație de filtre, indiferent de ordinea parametrilor, dă aceeași cheie
+    query = listing_params(params).urlencode()
+    return hashlib.md5(query.encode()).hexdigest()
+
+
+def listing_key(params):
+    return f'events:listing:{listing_version()}:{_params_digest(params)}'
+
+
+async def alisting_key(params):
+    return f'events:listing:{await alisting_version()}:{_params_digest(params)}'
+
+
+def _facets_digest(params):
+    # Paginarea și sortarea nu schimbă numărătorile
+    params = listing_params(params)
+    for name in ('cursor', 'sort'):
+        params.pop(name, None)
+    return _params_digest(params)
+
+
+def facets_key(params):
+    return f'events:facets:{listing_version()}:{_facets_digest(params)}'
+
+
+async def afacets_key(params):
+    return f'events:facets:{await alisting_version()}:{_facets_digest(params)}'
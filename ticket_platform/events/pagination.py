@@ -0,0 +1,113 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = 'events.pagination'
+PAGE_SIZE = 24
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, keys, has_next, has_previous):
+        self.items = items
+        self.keys = keys
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def next_cursor(self):
+        return _encode(self.items[-1], self.keys, 'next') if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return _encode(self.items[0], self.keys, 'prev') if self.has_previous else None
+
+
+# 📄 Paginare după chei stabile (ex. start_date, id), fără OFFSET:
+# fiecare pagină e un WHERE pe ultima cheie văzută, deci costă la fel oricât de departe ar fi.
+def paginate_keyset(queryset, keys, cursor=None, page_size=PAGE_SIZE):
+    queryset, direction, values = _page_queryset(queryset, keys, cursor)
+    return _page(list(queryset[:page_size + 1]), keys, direction, values, page_size)
+
+
+async def apaginate_keyset(queryset, keys, cursor=None, page_size=PAGE_SIZE):
+    """Varianta pentru vederile asincrone (ORM-ul asincron)."""
+    queryset, direction, values = _page_queryset(queryset, keys, cursor)
+    return _page([item async for item in queryset[:page_size + 1]], keys, direction, values, page_size)
+
+
+def _page_queryset(queryset, keys, cursor):
+    direction, values = _decode(cursor, keys) if cursor else ('next', None)
+
+    ordering = keys if direction == 'next' else [_flip(key) for key in keys]
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+    return queryset, direction, values
+
+
+def _page(items, keys, direction, values, page_size):
+    has_more = len(items) > page_size
+    items = items[:page_size]
+
+    if direction == 'next':
+        return KeysetPage(items, keys, has_next=has_more, has_previous=values is not None)
+    items.reverse()
+    return KeysetPage(items, keys, has_next=True, has_previous=has_more)
+
+
+def _flip(key):
+    return key[1:] if key.startswith('-') else '-' + key
+
+
+def _after(ordering, values):
+    # (a, b) > (va, vb)  <=>  a > va OR (a = va AND b > vb), pentru orice direcție a cheilor
+    condition = Q()
+    for i, key in enumerate(ordering):
+        name = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        step = Q(**{f'{name}__{lookup}': values[i]})
+        for previous, value in zip(ordering[:i], values):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def _value(item, key):
+    value = getattr(item, key.lstrip('-'))
+    # Decimal nu e serializabil JSON: îl păstrăm ca text, marcat ca să revină Decimal la decodare
+    if isinstance(value, Decimal):
+        return {'decimal': str(value)}
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _load_value(value):
+    if isinstance(value, dict):
+        return Decimal(value['decimal'])
+    return value
+
+
+def _encode(item, keys, direction):
+    return signing.dumps([direction, list(keys), [_value(item, key) for key in keys]], salt=CURSOR_SALT)
+
+
+def _decode(cursor, keys):
+    try:
+        direction, cursor_keys, values = signing.loads(cursor, salt=CURSOR_SALT)
+        values = [_load_value(value) for value in values]
+    except (signing.BadSignature, ValueError, TypeError, KeyError, InvalidOperation):
+        raise InvalidCursor(cursor)
+    # Un cursor emis pentru altă sortare are alte tipuri de valori; nu-l aplicăm pe cheile curente
+    if direction not in ('next', 'prev') or cursor_keys != list(keys) or len(values) != len(keys):
+        raise InvalidCursor(cursor)
+    return direction, values
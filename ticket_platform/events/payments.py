@@ -0,0 +1,257 @@
+import hashlib
+import hmac
+import itertools
+import json
+import secrets
+import threading
+import time
+from dataclasses import dataclass, replace
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+# 💳 Procesatorul de plăți din spatele paginii de plată. Implementarea se alege
+# prin setarea PAYMENT_PROVIDER; Stripe e implicit, FakeProvider rulează local
+# (teste, benchmark-uri) fără rețea. Sumele circulă ca întregi în subunități (bani).
+
+# Monede fără subunități la Stripe (suma se trimite în unități întregi)
+ZERO_DECIMAL_CURRENCIES = {'bif', 'clp', 'djf', 'gnf', 'jpy', 'kmf', 'krw', 'mga', 'pyg', 'rwf', 'ugx', 'vnd', 'vuv', 'xaf', 'xof', 'xpf'}
+# Un intent anulat nu mai poate fi plătit; pentru toate celelalte stări îl refolosim
+CLOSED_STATUSES = {'canceled'}
+# Stările în care suma intentului se mai poate modifica
+EDITABLE_STATUSES = {'requires_payment_method', 'requires_confirmation', 'requires_action'}
+
+
+class PaymentError(Exception):
+    """Procesatorul de plăți a refuzat cererea sau nu a putut fi contactat."""
+
+
+class InvalidWebhook(Exception):
+    """Corpul sau semnătura webhook-ului nu sunt valide."""
+
+
+@dataclass(frozen=True)
+class Intent:
+    id: str
+    client_secret: str
+    amount: int
+    currency: str
+    status: str
+
+    @property
+    def is_open(self):
+        return self.status not in CLOSED_STATUSES
+
+
+def _exponent(currency):
+    return 0 if currency.lower() in ZERO_DECIMAL_CURRENCIES else 2
+
+
+def to_minor_units(amount, currency):
+    """Decimal('19.99') RON -> 1999; calculul rămâne exact, fără float."""
+    return int((Decimal(amount) * 10 ** _exponent(currency)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(value, currency):
+    return Decimal(value).scaleb(-_exponent(currency)).quantize(Decimal('0.01'))
+
+
+def reservation_amount(reservation, currency):
+    return to_minor_units(reservation.ticket_type.price * reservation.quantity, currency)
+
+
+class PaymentProvider:
+    def create_intent(self, amount, currency, metadata, idempotency_key):
+        raise NotImplementedError
+
+    def retrieve_intent(self, intent_id):
+        raise NotImplementedError
+
+    def update_amount(self, intent_id, amount):
+        raise NotImplementedError
+
+    def cancel_intent(self, intent_id):
+        """Anulează intentul; ridică PaymentError dacă plata nu mai poate fi oprită."""
+        raise NotImplementedError
+
+    def verify_webhook(self, payload, signature):
+        """Întoarce evenimentul (dict) dacă semnătura e validă, altfel ridică InvalidWebhook."""
+        raise NotImplementedError
+
+
+class StripeProvider(PaymentProvider):
+    """Stripe printr-un StripeClient propriu: o sesiune HTTP cu pool de conexiuni,
+    timeout și reîncercări, fără să modifice cheia globală `stripe.api_key`."""
+
+    def __init__(self):
+        # Importat doar când e folosit, ca serverele cu alt procesator să nu depindă de SDK
+        import requests
+        import stripe
+
+        pool_size = getattr(settings, 'PAYMENT_POOL_SIZE', 10)
+        session = requests.Session()
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._stripe = stripe
+        self._client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            # Reîncercările la POST refolosesc aceeași cheie de idempotență
+            max_network_retries=getattr(settings, 'PAYMENT_MAX_RETRIES', 2),
+            http_client=stripe.RequestsClient(timeout=getattr(settings, 'PAYMENT_HTTP_TIMEOUT', 10), session=session),
+        )
+
+    @staticmethod
+    def _intent(obj):
+        return Intent(obj.id, obj.client_secret, obj.amount, obj.currency, obj.status)
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return self._intent(method(*args, **kwargs))
+        except self._stripe.StripeError as exc:
+            raise PaymentError(str(exc)) from exc
+
+    def create_intent(self, amount, currency, metadata, idempotency_key):
+        return self._call(
+            self._client.v1.payment_intents.create,
+            params={'amount': amount, 'currency': currency, 'metadata': metadata},
+            options={'idempotency_key': idempotency_key},
+        )
+
+    def retrieve_intent(self, intent_id):
+        return self._call(self._client.v1.payment_intents.retrieve, intent_id)
+
+    def update_amount(self, intent_id, amount):
+        return self._call(self._client.v1.payment_intents.update, intent_id, params={'amount': amount})
+
+    def cancel_intent(self, intent_id):
+        return self._call(
+            self._client.v1.payment_intents.cancel, intent_id, params={'cancellation_reason': 'abandoned'},
+        )
+
+    def verify_webhook(self, payload, signature):
+        try:
+            self._stripe.Webhook.construct_event(payload, signature, settings.STRIPE_WEBHOOK_SECRET)
+        except (ValueError, self._stripe.SignatureVerificationError) as exc:
+            raise InvalidWebhook(str(exc)) from exc
+        return json.loads(payload)
+
+
+class FakeProvider(PaymentProvider):
+    """Procesator în memorie, cu aceeași semantică: idempotență, refolosire, webhook-uri
+    semnate ca la Stripe (vezi events/testing.FakeStripe). PAYMENT_FAKE_LATENCY
+    (secunde) simulează durata unui apel prin rețea în benchmark-uri."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Prefix aleator: id-urile nu se repetă între procese, ca în baza de date reală
+        self._prefix = secrets.token_hex(4)
+        self._ids = itertools.count(1)
+        self.intents = {}
+        self._idempotency = {}
+        self.calls = []
+
+    def _request(self, name):
+        latency = getattr(settings, 'PAYMENT_FAKE_LATENCY', 0)
+        if latency:
+            time.sleep(latency)
+        self.calls.append(name)
+
+    def _get(self, intent_id):
+        try:
+            return self.intents[intent_id]
+        except KeyError:
+            raise PaymentError(f"No such payment_intent: '{intent_id}'") from None
+
+    def create_intent(self, amount, currency, metadata, idempotency_key):
+        self._request('create')
+        with self._lock:
+            if idempotency_key in self._idempotency:
+                return self.intents[self._idempotency[idempotency_key]]
+            intent_id = f'pi_fake_{self._prefix}{next(self._ids)}'
+            intent = Intent(
+                intent_id, f'{intent_id}_secret_{secrets.token_hex(8)}', amount, currency, 'requires_payment_method'
+            )
+            self.intents[intent_id] = intent
+            self._idempotency[idempotency_key] = intent_id
+            return intent
+
+    def retrieve_intent(self, intent_id):
+        self._request('retrieve')
+        with self._lock:
+            return self._get(intent_id)
+
+    def update_amount(self, intent_id, amount):
+        self._request('update')
+        with self._lock:
+            intent = self._get(intent_id)
+            if intent.status not in EDITABLE_STATUSES:
+                raise PaymentError(f"PaymentIntent {intent_id} cannot be updated in status {intent.status}")
+            intent = self.intents[intent_id] = replace(intent, amount=amount)
+            return intent
+
+    def cancel_intent(self, intent_id):
+        self._request('cancel')
+        with self._lock:
+            intent = self._get(intent_id)
+            # Ca la Stripe: o plată reușită sau în curs de procesare nu mai poate fi anulată
+            if intent.status in ('succeeded', 'processing'):
+                raise PaymentError(f"PaymentIntent {intent_id} cannot be canceled in status {intent.status}")
+            intent = self.intents[intent_id] = replace(intent, status='canceled')
+            return intent
+
+    def set_status(self, intent_id, status):
+        """Simulează confirmarea / anularea plății din partea clientului."""
+        with self._lock:
+            intent = self.intents[intent_id] = replace(self._get(intent_id), status=status)
+            return intent
+
+    def verify_webhook(self, payload, signature):
+        parts = dict(part.split('=', 1) for part in signature.split(',') if '=' in part)
+        signed = f"{parts.get('t', '')}.{payload.decode() if isinstance(payload, bytes) else payload}"
+        expected = hmac.new(settings.STRIPE_WEBHOOK_SECRET.encode(), signed.encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, parts.get('v1', '')):
+            raise InvalidWebhook("Semnătură invalidă.")
+        try:
+            return json.loads(payload)
+        except ValueError as exc:
+            raise InvalidWebhook(str(exc)) from exc
+
+
+@lru_cache(maxsize=None)
+def get_provider():
+    path = getattr(settings, 'PAYMENT_PROVIDER', 'events.payments.StripeProvider')
+    return import_string(path)()
+
+
+@receiver(setting_changed)
+def _reset_provider(setting, **kwargs):
+    if setting.startswith(('PAYMENT_', 'STRIPE_')):
+        get_provider.cache_clear()
+
+
+def intent_for_reservation(payment, currency):
+    """Intentul de plată al rezervării: cel existent dacă mai poate fi plătit, altfel unul nou.
+
+    `payment.amount` trebuie să fie deja suma curentă a rezervării; apelantul salvează plata.
+    """
+    provider = get_provider()
+    amount = to_minor_units(payment.amount, currency)
+    previous = payment.stripe_payment_intent
+
+    if previous:
+        intent = provider.retrieve_intent(previous)
+        if intent.is_open and intent.currency == currency:
+            if intent.amount != amount and intent.status in EDITABLE_STATUSES:
+                intent = provider.update_amount(intent.id, amount)
+            return intent
+
+    # Cheia de idempotență face ca două cereri simultane să primească același intent
+    reservation = payment.reservation
+    return provider.create_intent(
+        amount, currency,
+        metadata={'reservation_id': reservation.pk, 'user_id': reservation.user_id},
+        idempotency_key=f'reservation-{reservation.pk}-{previous or "new"}-{amount}',
+    )
@@ -0,0 +1,287 @@
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from . import analytics, page_cache, payments
+from .models import Event, TicketType, Reservation, InventoryStripe, Payment
+
+logger = logging.getLogger(__name__)
+
+
+class SoldOut(Exception):
+    """Nu mai sunt suficiente bilete pentru cantitatea cerută."""
+
+
+# 🎟️ Rezervare atomică: un singur UPDATE condiționat, fără citire-modificare-scriere
+def reserve_tickets(user, ticket_type, quantity):
+    if quantity < 1:
+        raise ValueError("Cantitatea trebuie să fie cel puțin 1.")
+
+    with transaction.atomic():
+        if ticket_type.is_striped:
+            _take_from_stripes(ticket_type, quantity)
+        else:
+            # Condiția din WHERE garantează că stocul nu devine negativ,
+            # indiferent câte cereri rulează în paralel.
+            updated = TicketType.objects.filter(
+                pk=ticket_type.pk,
+                available_quantity__gte=quantity,
+            ).update(available_quantity=F('available_quantity') - quantity)
+
+            if not updated:
+                raise SoldOut(ticket_type.pk)
+
+        reservation = Reservation.objects.create(
+            user=user,
+            ticket_type=ticket_type,
+            quantity=quantity,
+            confirmed=False,
+        )
+        analytics.record_reservation(reservation)
+        # Ultima scriere din tranzacție: rândul Event (comun tuturor tipurilor de bilete
+        # ale evenimentului) rămâne blocat cât mai puțin
+        _adjust_event(ticket_type.event_id, -quantity)
+        return reservation
+
+
+# 🔓 Eliberare rezervare: biletele revin în stoc o singură dată
+def release_reservation(reservation):
+    with transaction.atomic():
+        rows = Reservation.objects.filter(pk=reservation.pk)
+        # Rândul blocat garantează că două eliberări simultane nu scad rollup-urile de două ori
+        if not rows.select_for_update().exists():
+            return False
+        analytics.record_release(rows)
+        rows.delete()
+
+        ticket_type = reservation.ticket_type
+        returned = ticket_type.is_striped and InventoryStripe.objects.filter(
+            ticket_type_id=ticket_type.pk,
+            index=random.randrange(ticket_type.stripe_count),
+        ).update(available_quantity=F('available_quantity') + reservation.quantity)
+        if not returned:
+            TicketType.objects.filter(pk=ticket_type.pk).update(
+                available_quantity=F('available_quantity') + reservation.quantity
+            )
+        _adjust_event(ticket_type.event_id, reservation.quantity)
+        return True
+
+
+def _adjust_event(event_id, delta):
+    Event.objects.filter(pk=event_id).adjust_availability(delta)
+    page_cache.invalidate_event(event_id, listing=False)
+
+
+def _refresh_event(event_id):
+    Event.objects.filter(pk=event_id).refresh_availability()
+    # Stocul afișat pe pagina evenimentului s-a schimbat; grila de evenimente
+    # (preț minim, sold-out) se reîmprospătează la expirarea EVENTS_CACHE_TIMEOUT.
+    page_cache.invalidate_event(event_id, listing=False)
+
+
+# 🧮 Stoc împărțit pe benzi (stripes) pentru tipurile de bilete foarte căutate
+def _take_from_stripes(ticket_type, quantity):
+    stripes = InventoryStripe.objects.filter(ticket_type_id=ticket_type.pk)
+
+    # O bandă aleasă aleator, ca cererile simultane să nu aștepte după același rând
+    index = random.randrange(ticket_type.stripe_count)
+    while True:
+        if stripes.filter(index=index, available_quantity__gte=quantity).update(
+            available_quantity=F('available_quantity') - quantity
+        ):
+            return
+
+        # Banda aleasă s-a golit: încercăm una dintre cele care mai au stoc
+        candidates = list(
+            stripes.filter(available_quantity__gte=quantity).values_list('index', flat=True)
+        )
+        if not candidates:
+            break
+        index = random.choice(candidates)
+
+    # Nicio bandă nu mai are destul stoc singură (sau benzile lipsesc): reechilibrăm sub blocare
+    _rebalance(ticket_type, take=quantity)
+
+
+def _rebalance(ticket_type, take=0):
+    # Stocul rămas direct pe TicketType (ex. adăugat de organizator) intră și el în benzi
+    pool = TicketType.objects.select_for_update().values_list(
+        'available_quantity', flat=True
+    ).get(pk=ticket_type.pk)
+    stripes = list(
+        InventoryStripe.objects.select_for_update()
+        .filter(ticket_type_id=ticket_type.pk)
+        .order_by('index')
+    )
+    total = pool + sum(s.available_quantity for s in stripes)
+    if total < take:
+        raise SoldOut(ticket_type.pk)
+
+    if not stripes:
+        # stripe_count > 1 fără benzi create (ex. modificat direct în baza de date):
+        # tot stocul e pe rândul TicketType, blocat mai sus
+        TicketType.objects.filter(pk=ticket_type.pk).update(available_quantity=pool - take)
+        return
+
+    if pool:
+        TicketType.objects.filter(pk=ticket_type.pk).update(available_quantity=0)
+
+    share, extra = divmod(total - take, len(stripes))
+    for i, stripe in enumerate(stripes):
+        stripe.available_quantity = share + (1 if i < extra else 0)
+    InventoryStripe.objects.bulk_update(stripes, ['available_quantity'])
+
+
+@transaction.atomic
+def set_stripe_count(ticket_type, stripe_count):
+    """Mută stocul între rândul TicketType și benzi, conform noului număr de benzi."""
+    ticket_type = TicketType.objects.select_for_update().get(pk=ticket_type.pk)
+    stripes = InventoryStripe.objects.filter(ticket_type=ticket_type)
+    total = ticket_type.available_quantity + (
+        stripes.aggregate(total=Sum('available_quantity'))['total'] or 0
+    )
+    stripes.delete()
+
+    stripe_count = max(1, stripe_count)
+    if stripe_count > 1:
+        InventoryStripe.objects.bulk_create(
+            InventoryStripe(ticket_type=ticket_type, index=i) for i in range(stripe_count)
+        )
+        ticket_type.available_quantity = total
+        ticket_type.stripe_count = stripe_count
+        ticket_type.save(update_fields=['available_quantity', 'stripe_count'])
+        _rebalance(ticket_type)
+        _refresh_event(ticket_type.event_id)
+        ticket_type.available_quantity = 0
+    else:
+        ticket_type.available_quantity = total
+        ticket_type.stripe_count = 1
+        ticket_type.save(update_fields=['available_quantity', 'stripe_count'])
+        _refresh_event(ticket_type.event_id)
+    return ticket_type
+
+
+# ⏳ Rezervările neplătite expiră după RESERVATION_HOLD_MINUTES. Cele cu un intent de
+# plată deschis (pagina de plată a fost deschisă) mai primesc RESERVATION_PAYMENT_GRACE_MINUTES,
+# apoi intentul e anulat la procesator înainte ca biletele să revină în stoc.
+def hold_ttl():
+    return timedelta(minutes=getattr(settings, 'RESERVATION_HOLD_MINUTES', 15))
+
+
+def payment_grace():
+    return timedelta(minutes=getattr(settings, 'RESERVATION_PAYMENT_GRACE_MINUTES', 15))
+
+
+OPEN_INTENT = Q(payment__status='pending', payment__stripe_payment_intent__isnull=False)
+
+
+def expirable_reservations(now=None):
+    now = now or timezone.now()
+    return Reservation.objects.filter(confirmed=False, created_at__lt=now - hold_ttl()).exclude(
+        # Plățile finalizate nu se ating niciodată; cele în curs doar după perioada de grație
+        Q(payment__status='completed')
+        | OPEN_INTENT & Q(created_at__gte=now - hold_ttl() - payment_grace())
+    )
+
+
+def expire_reservations(now=None, batch_size=500):
+    """Șterge rezervările expirate în loturi și returnează câte au fost eliberate."""
+    _cancel_abandoned_intents(now, batch_size)
+    expired = 0
+    while True:
+        with transaction.atomic():
+            # Un intent care n-a putut fi anulat (plata e în curs) păstrează rezervarea
+            pending = expirable_reservations(now).exclude(OPEN_INTENT)
+            # Doar rândurile rezervărilor: PostgreSQL nu blochează partea nulabilă a LEFT JOIN-ului cu plata
+            locked = pending.select_for_update(of=('self',)).order_by('created_at')
+            ids = list(locked.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return expired
+
+            expired += _release(pending.filter(id__in=ids))
+
+        if len(ids) < batch_size:
+            return expired
+
+
+def _cancel_abandoned_intents(now, batch_size):
+    """Anulează la procesator intenturile rezervărilor expirate; plata e marcată eșuată."""
+    provider = None
+    last_id = 0
+    while True:
+        rows = list(
+            expirable_reservations(now).filter(OPEN_INTENT, id__gt=last_id).order_by('id')
+            .values_list('id', 'payment__stripe_payment_intent')[:batch_size]
+        )
+        if not rows:
+            return
+        provider = provider or payments.get_provider()
+        for reservation_id, intent_id in rows:
+            try:
+                provider.cancel_intent(intent_id)
+            except payments.PaymentError:
+                logger.warning("Intentul %s al rezervării %s nu a putut fi anulat.", intent_id, reservation_id)
+                continue
+            # Doar dacă plata are încă intentul anulat (clientul poate fi cerut între timp altul)
+            Payment.objects.filter(
+                reservation_id=reservation_id, stripe_payment_intent=intent_id, status='pending',
+            ).update(status='failed')
+        last_id = rows[-1][0]
+
+
+def _release(rows):
+    """Șterge rezervările și returnează stocul; rândurile trebuie să fie deja blocate."""
+    released = list(
+        rows.order_by().values('ticket_type_id').annotate(quantity=Sum('quantity'))
+    )
+    analytics.record_release(rows)
+    count = rows.delete()[1].get(Reservation._meta.label, 0)
+
+    # O singură actualizare pe tip de bilet; la tipurile cu benzi stocul
+    # ajunge în rezerva comună și e redistribuit la următoarea reechilibrare.
+    for row in released:
+        TicketType.objects.filter(pk=row['ticket_type_id']).update(
+            available_quantity=F('available_quantity') + row['quantity']
+        )
+    events = Event.objects.filter(ticket_types__in=[row['ticket_type_id'] for row in released])
+    events.refresh_availability()
+    for event_id in events.values_list('pk', flat=True):
+        page_cache.invalidate_event(event_id, listing=False)
+    return count
+
+
+# 📦 Acțiuni în masă pentru organizatori: câte o singură interogare pe acțiune,
+# indiferent câte rezervări sunt selectate.
+def bulk_confirm(queryset):
+    return queryset.filter(confirmed=False).update(confirmed=True)
+
+
+def bulk_cancel(queryset):
+    """Anulează confirmarea; rezervarea redevine o rezervare neplătită, care poate expira."""
+    return queryset.filter(confirmed=True).update(confirmed=False)
+
+
+# Rezervările confirmate sau plătite sunt bilete vândute: nu se eliberează în masă
+# (ștergerea ar lua cu ea și plata finalizată)
+SOLD = Q(confirmed=True) | Q(payment__status='completed')
+
+
+def bulk_release(queryset):
+    """Șterge rezervările neplătite și returnează biletele în stoc: (eliberate, sărite)."""
+    with transaction.atomic():
+        # Blocăm doar rândurile rezervărilor, nu și tipurile de bilete din join-uri
+        rows = list(
+            queryset.select_for_update(of=('self',))
+            .annotate(sold=Case(When(SOLD, then=Value(True)), default=Value(False)))
+            .values_list('id', 'sold')
+        )
+        ids = [pk for pk, sold in rows if not sold]
+        skipped = len(rows) - len(ids)
+        if not ids:
+            return 0, skipped
+        return _release(Reservation.objects.filter(id__in=ids).exclude(SOLD)), skipped
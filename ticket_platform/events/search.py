@@ -0,0 +1,220 @@
+import re
+
+from django.db import connections, router
+from django.db.models import BooleanField, F, FloatField, IntegerField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Event
+
+# Titlul cântărește cel mai mult, apoi locația, apoi descrierea
+TITLE_WEIGHT, LOCATION_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 5.0, 1.0
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def terms(query):
+    return WORD_RE.findall(query.lower())
+
+
+# 🔎 Indexul de căutare pentru evenimente; aceeași interfață pe SQLite și PostgreSQL
+class SearchBackend:
+    def __init__(self, using):
+        self.using = using
+
+    def index(self, event):
+        raise NotImplementedError
+
+    def index_many(self, events):
+        # Folosit la importuri în masă, unde bulk_create nu trimite semnale post_save
+        for event in events:
+            self.index(event)
+
+    def remove(self, event_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, limit=200):
+        """Întoarce id-urile evenimentelor, ordonate după relevanță."""
+        raise NotImplementedError
+
+    def apply(self, queryset, query):
+        """Filtrează `queryset` printr-un JOIN cu indexul și adaugă `search_rank`, calculat
+        o singură dată pe rând: cu cât mai mic, cu atât mai relevant. `query` are cel puțin un cuvânt."""
+        raise NotImplementedError
+
+    def rebuild(self, chunk_size=2000):
+        self.clear()
+        events = Event.objects.using(self.using).only('title', 'location', 'description')
+        count = 0
+        for event in events.iterator(chunk_size=chunk_size):
+            self.index(event)
+            count += 1
+        return count
+
+    def _execute(self, sql, params=()):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def _execute_many(self, sql, param_list):
+        with connections[self.using].cursor() as cursor:
+            cursor.executemany(sql, param_list)
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Tabel virtual FTS5 `events_event_fts`, cu rowid = id-ul evenimentului."""
+
+    INSERT = (
+        'INSERT OR REPLACE INTO events_event_fts (rowid, title, location, description) '
+        'VALUES (%s, %s, %s, %s)'
+    )
+
+    def index(self, event):
+        self._execute(self.INSERT, [event.pk, event.title, event.location, event.description])
+
+    def index_many(self, events):
+        self._execute_many(self.INSERT, [
+            [event.pk, event.title, event.location, event.description] for event in events
+        ])
+
+    def remove(self, event_id):
+        self._execute('DELETE FROM events_event_fts WHERE rowid = %s', [event_id])
+
+    def clear(self):
+        self._execute('DELETE FROM events_event_fts')
+
+    @staticmethod
+    def _match(query):
+        # Fiecare cuvânt devine o căutare după prefix: "conc"* găsește "concert"
+        return ' '.join('"%s"*' % word for word in terms(query))
+
+    def search(self, query, limit=200):
+        if not terms(query):
+            return []
+        rows = self._execute(
+            'SELECT rowid FROM events_event_fts WHERE events_event_fts MATCH %s '
+            'ORDER BY bm25(events_event_fts, %s, %s, %s) LIMIT %s',
+            [self._match(query), TITLE_WEIGHT, LOCATION_WEIGHT, DESCRIPTION_WEIGHT, limit],
+        )
+        return [row[0] for row in rows]
+
+    def apply(self, queryset, query):
+        # Tabelul FTS conduce interogarea (MATCH), evenimentele se caută după cheia primară;
+        # `rank` e bm25 cu ponderile de mai jos (negativ: mai mic = mai relevant).
+        match = RawSQL(
+            '"events_event_fts" MATCH %s AND "events_event_fts"."rank" MATCH %s',
+            [self._match(query), f'bm25({TITLE_WEIGHT}, {LOCATION_WEIGHT}, {DESCRIPTION_WEIGHT})'],
+            output_field=BooleanField(),
+        )
+        return queryset.filter(match, fts_entry__isnull=False).annotate(search_rank=F('fts_entry__rank'))
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Tabel `events_event_search` cu o coloană tsvector și index GIN."""
+
+    DOCUMENT = (
+        "setweight(to_tsvector('simple', %s), 'A') || "
+        "setweight(to_tsvector('simple', %s), 'B') || "
+        "setweight(to_tsvector('simple', %s), 'C')"
+    )
+
+    INSERT = (
+        'INSERT INTO events_event_search (event_id, document) VALUES (%s, ' + DOCUMENT + ') '
+        'ON CONFLICT (event_id) DO UPDATE SET document = EXCLUDED.document'
+    )
+
+    def index(self, event):
+        self._execute(self.INSERT, [event.pk, event.title, event.location, event.description])
+
+    def index_many(self, events):
+        self._execute_many(self.INSERT, [
+            [event.pk, event.title, event.location, event.description] for event in events
+        ])
+
+    def remove(self, event_id):
+        self._execute('DELETE FROM events_event_search WHERE event_id = %s', [event_id])
+
+    def clear(self):
+        self._execute('TRUNCATE events_event_search')
+
+    @staticmethod
+    def _tsquery(query):
+        return ' & '.join('%s:*' % word for word in terms(query))
+
+    def search(self, query, limit=200):
+        if not terms(query):
+            return []
+        rows = self._execute(
+            "SELECT event_id FROM events_event_search, to_tsquery('simple', %s) query "
+            "WHERE document @@ query "
+            "ORDER BY ts_rank(document, query, 1) DESC LIMIT %s",
+            [self._tsquery(query), limit],
+        )
+        return [row[0] for row in rows]
+
+    def apply(self, queryset, query):
+        tsquery = self._tsquery(query)
+        match = RawSQL(
+            "\"events_event_search\".\"document\" @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            "-ts_rank(\"events_event_search\".\"document\", to_tsquery('simple', %s), 1)", [tsquery],
+            output_field=FloatField(),
+        )
+        return queryset.filter(match, search_document__isnull=False).annotate(search_rank=rank)
+
+
+class IcontainsSearchBackend(SearchBackend):
+    """Rezervă pentru alte baze de date: fără index, fără relevanță."""
+
+    def index(self, event):
+        pass
+
+    def index_many(self, events):
+        pass
+
+    def remove(self, event_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def rebuild(self, chunk_size=2000):
+        return 0
+
+    def search(self, query, limit=200):
+        events = self.apply(Event.objects.using(self.using), query).order_by('start_date')
+        return list(events.values_list('pk', flat=True)[:limit])
+
+    def apply(self, queryset, query):
+        for word in terms(query):
+            queryset = queryset.filter(
+                Q(title__icontains=word) | Q(location__icontains=word) | Q(description__icontains=word)
+            )
+        # Fără relevanță: cele mai apropiate evenimente primele
+        return queryset.annotate(search_rank=F('start_date'))
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(using=None):
+    using = using or router.db_for_write(Event)
+    return BACKENDS.get(connections[using].vendor, IcontainsSearchBackend)(using)
+
+
+def search_events(queryset, query):
+    """Filtrează `queryset` după textul căutat și îl ordonează după relevanță.
+
+    Căutarea e un JOIN în aceeași interogare cu celelalte filtre și cu paginarea,
+    deci toate potrivirile sunt luate în calcul, nu doar primele N din index.
+    """
+    if not terms(query):
+        # Fără cuvinte nu se potrivește nimic; `search_rank` rămâne disponibil pentru sortare
+        return queryset.annotate(search_rank=Value(0, IntegerField())).none()
+    return get_backend(queryset.db).apply(queryset, query).order_by('search_rank', 'pk')
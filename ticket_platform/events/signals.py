@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cities, page_cache, search
+from .models import City, Event, TicketType
+
+
+# 🔎 Indexul de căutare rămâne sincronizat cu tabela de evenimente
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, using, **kwargs):
+    search.get_backend(using).index(instance)
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event(sender, instance, using, **kwargs):
+    search.get_backend(using).remove(instance.pk)
+
+
+# 🗄️ Fragmentele din cache ale evenimentului (și grila de evenimente) se invalidează
+# la orice modificare a evenimentului, a temei sau a tipurilor de bilete
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_cache(sender, instance, **kwargs):
+    page_cache.invalidate_event(instance.pk)
+
+
+@receiver(post_save, sender=TicketType)
+@receiver(post_delete, sender=TicketType)
+def invalidate_ticket_type_cache(sender, instance, **kwargs):
+    page_cache.invalidate_event(instance.event_id)
+
+
+# 🏙️ Orașul evenimentului se deduce din locație. Indexul de autocompletare (care
+# ordonează după numărul de evenimente) se reîncarcă doar când un eveniment își schimbă
+# orașul, apare sau dispare dintr-un oraș, ori când se modifică un oraș
+@receiver(pre_save, sender=Event)
+def assign_city(sender, instance, update_fields=None, **kwargs):
+    # Salvările parțiale (update_fields) nu ating locația
+    if update_fields is None and instance.location != getattr(instance, '_saved_location', None):
+        city_id = cities.city_ids([instance.location])[instance.location]
+        instance._city_changed = city_id != instance.city_id
+        instance.city_id = city_id
+        instance._saved_location = instance.location
+
+
+@receiver(post_save, sender=Event)
+def invalidate_city_index_on_save(sender, instance, **kwargs):
+    if getattr(instance, '_city_changed', False):
+        instance._city_changed = False
+        cities.invalidate_index()
+
+
+@receiver(post_delete, sender=Event)
+def invalidate_city_index_on_delete(sender, instance, **kwargs):
+    if instance.city_id:
+        cities.invalidate_index()
+
+
+# Orașele se salvează doar când sunt create sau redenumite (admin)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_city_index(sender, **kwargs):
+    cities.invalidate_index()
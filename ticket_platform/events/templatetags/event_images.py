@@ -0,0 +1,37 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+def _srcset(variants, fmt):
+    return ', '.join(
+        f"{default_storage.url(variant[fmt])} {variant['width']}w" for variant in variants.values()
+    )
+
+
+# 🖼️ {% event_image event 'card' sizes='(min-width: 1024px) 33vw, 100vw' class='h-48 w-full object-cover' %}
+# Cu variantele procesate, browserul alege singur mărimea (și WebP, dacă îl suportă);
+# până atunci se afișează imaginea originală.
+@register.simple_tag
+def event_image(event, variant='card', sizes='100vw', **attrs):
+    if not event.image:
+        return ''
+    attrs.setdefault('alt', event.title)
+    asset = event.image_asset if event.image_asset_id else None
+    variants = asset.variants if asset and asset.processed_at else None
+
+    if not variants or variant not in variants:
+        attributes = format_html_join(' ', '{}="{}"', attrs.items())
+        return format_html('<img src="{}" {} loading="lazy">', event.image.url, attributes)
+
+    chosen = variants[variant]
+    attrs.update(width=chosen['width'], height=chosen['height'])
+    attributes = format_html_join(' ', '{}="{}"', attrs.items())
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {} loading="lazy"></picture>',
+        _srcset(variants, 'webp'), sizes,
+        default_storage.url(chosen['jpeg']), _srcset(variants, 'jpeg'), sizes, attributes,
+    )
@@ -0,0 +1,45 @@
+import hashlib
+import hmac
+import itertools
+import json
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+# 🧪 Un Stripe local pentru teste și dezvoltare: construiește evenimente de
+# webhook și le semnează exact ca Stripe (antetul `Stripe-Signature`, schema v1),
+# așa că view-ul le verifică prin aceeași cale ca pe cele reale.
+
+
+class FakeStripe:
+    def __init__(self, secret=None):
+        self.secret = secret or settings.STRIPE_WEBHOOK_SECRET
+        self._ids = itertools.count(1)
+
+    def event(self, event_type, obj, event_id=None, created=None):
+        return {
+            'id': event_id or f'evt_test_{next(self._ids)}',
+            'object': 'event',
+            'type': event_type,
+            'created': created or int(time.time()),
+            'data': {'object': obj},
+        }
+
+    def payment_intent_event(self, event_type, intent_id, **kwargs):
+        return self.event(event_type, {'id': intent_id, 'object': 'payment_intent'}, **kwargs)
+
+    def sign(self, payload, timestamp=None):
+        timestamp = timestamp or int(time.time())
+        signed = f'{timestamp}.{payload}'.encode()
+        signature = hmac.new(self.secret.encode(), signed, hashlib.sha256).hexdigest()
+        return f't={timestamp},v1={signature}'
+
+    def deliver(self, client, event, secret=None):
+        """Trimite evenimentul semnat către webhook prin clientul de test dat."""
+        payload = json.dumps(event)
+        signer = FakeStripe(secret) if secret else self
+        return client.post(
+            reverse('stripe_webhook'), payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=signer.sign(payload),
+        )
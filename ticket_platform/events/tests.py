@@ -1,3 +1,2112 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import inspect
+import io
+import json
+import random
+import shutil
+import tempfile
+import threading
+import tracemalloc
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from importlib import import_module
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.admin import site as admin_site
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.db import connection, connections, transaction, OperationalError
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, TransactionTestCase, modify_settings, override_settings
+from django.http import QueryDict
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from ticket_platform.db_router import PIN_COOKIE, replicate_sqlite, use_primary
+from ticket_platform.query_budget import assert_query_budget, record_queries
+
+from . import cities, page_cache, payments, urls as events_urls, views
+from .admin import TicketTypeAdmin
+from .images import process_pending as process_images
+from .checkin import Gate, get_gate, make_gate_token, parse_code, reset_gates, signing_key
+from .models import CheckIn, City, Event, ImageAsset, TicketType, Reservation, Payment, SalesRollup, WebhookEvent
+from .reservations import (
+    SoldOut, reserve_tickets, release_reservation, set_stripe_count, expire_reservations,
+    expirable_reservations, bulk_confirm, bulk_release,
+)
+from .search import get_backend as get_search_backend, search_events
+from .pagination import PAGE_SIZE, InvalidCursor, paginate_keyset
+from .analytics import event_report, rebuild as rebuild_rollups
+from .exports import stream_csv
+from .facets import counts as facet_counts, selection as facet_selection
+from .importer import import_events
+from .testing import FakeStripe
+from .ticket_editor import TicketEditError, apply_changes as apply_ticket_changes
+from .webhooks import HANDLERS, pending_events, process_pending
+from .live import get_publisher, stream_availability
+from .loadtest import LoadTestConfig, check_invariants, percentile
+from .payments import get_provider, to_minor_units
+from .waiting_room import CacheQueueBackend, LocalQueueBackend, get_backend, make_token as make_queue_token
+
+User = get_user_model()
+
+
+def make_event(organizer, **kwargs):
+    start = kwargs.pop('start_date', timezone.now() + timedelta(days=7))
+    return Event.objects.create(
+        organizer=organizer,
+        title=kwargs.pop('title', 'Concert'),
+        description=kwargs.pop('description', 'Descriere'),
+        location=kwargs.pop('location', 'București'),
+        start_date=start,
+        end_date=kwargs.pop('end_date', start + timedelta(hours=3)),
+        **kwargs
+    )
+
+
+def make_ticket_type(event, quantity=10, **kwargs):
+    return TicketType.objects.create(
+        event=event,
+        name=kwargs.pop('name', 'General'),
+        price=kwargs.pop('price', '50.00'),
+        total_quantity=quantity,
+        available_quantity=quantity,
+        **kwargs
+    )
+
+
+class ReservationServiceTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.ticket_type = make_ticket_type(make_event(self.organizer), quantity=3)
+
+    def test_reserve_decrements_stock(self):
+        reservation = reserve_tickets(self.buyer, self.ticket_type, 2)
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.available_quantity, 1)
+        self.assertEqual(reservation.quantity, 2)
+
+    def test_reserve_more_than_available_is_sold_out(self):
+        with self.assertRaises(SoldOut):
+            reserve_tickets(self.buyer, self.ticket_type, 4)
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.available_quantity, 3)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_release_returns_stock_once(self):
+        reservation = reserve_tickets(self.buyer, self.ticket_type, 2)
+        self.assertTrue(release_reservation(reservation))
+        self.assertFalse(release_reservation(reservation))
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.available_quantity, 3)
+
+    def test_event_detail_post_reserves(self):
+        self.client.force_login(self.buyer)
+        url = reverse('event_detail', args=[self.ticket_type.event_id])
+        self.client.post(url, {'ticket_id': self.ticket_type.id, 'quantity': 3})
+        response = self.client.post(url, {'ticket_id': self.ticket_type.id, 'quantity': 1})
+        self.assertRedirects(response, url)
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.available_quantity, 0)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+class StripedInventoryTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.ticket_type = set_stripe_count(make_ticket_type(make_event(self.organizer), quantity=10), 4)
+
+    def test_stock_is_spread_over_stripes(self):
+        self.assertEqual(self.ticket_type.available_quantity, 0)
+        self.assertEqual(
+            sorted(self.ticket_type.stripes.values_list('available_quantity', flat=True)),
+            [2, 2, 3, 3],
+        )
+        self.assertEqual(self.ticket_type.stock, 10)
+        self.assertEqual(self.ticket_type.event.available_tickets, 10)
+
+    def test_reserve_rebalances_when_no_single_stripe_is_enough(self):
+        reserve_tickets(self.buyer, self.ticket_type, 7)
+        self.assertEqual(self.ticket_type.stock, 3)
+        with self.assertRaises(SoldOut):
+            reserve_tickets(self.buyer, self.ticket_type, 4)
+        reserve_tickets(self.buyer, self.ticket_type, 3)
+        self.assertEqual(self.ticket_type.stock, 0)
+
+    def test_missing_stripes_fall_back_to_the_ticket_type_row(self):
+        ticket_type = make_ticket_type(self.ticket_type.event, quantity=5, name='Fără benzi')
+        TicketType.objects.filter(pk=ticket_type.pk).update(stripe_count=4)
+        ticket_type.refresh_from_db()
+        reservation = reserve_tickets(self.buyer, ticket_type, 3)
+        ticket_type.refresh_from_db()
+        self.assertEqual(ticket_type.stock, 2)
+        with self.assertRaises(SoldOut):
+            reserve_tickets(self.buyer, ticket_type, 3)
+        release_reservation(reservation)
+        ticket_type.refresh_from_db()
+        self.assertEqual(ticket_type.stock, 5)
+
+    def test_admin_changes_stripe_count_through_set_stripe_count(self):
+        model_admin = TicketTypeAdmin(TicketType, admin_site)
+        request = RequestFactory().post('/')
+        request.user = User.objects.create_superuser('admin', password='x')
+        ticket_type = make_ticket_type(self.ticket_type.event, quantity=9, name='Admin')
+        Form = model_admin.get_form(request, ticket_type)
+        data = {
+            'event': ticket_type.event_id, 'name': 'Admin', 'price': '50.00', 'total_quantity': 9,
+            'available_quantity': 9, 'stripe_count': 3,
+        }
+        form = Form(data, instance=ticket_type)
+        self.assertTrue(form.is_valid(), form.errors)
+        model_admin.save_model(request, form.save(commit=False), form, change=True)
+        self.assertEqual(
+            sorted(ticket_type.stripes.values_list('available_quantity', flat=True)), [3, 3, 3],
+        )
+        ticket_type.refresh_from_db()
+        self.assertEqual((ticket_type.stripe_count, ticket_type.available_quantity), (3, 0))
+
+    def test_admin_edits_refresh_the_event_aggregate(self):
+        model_admin = TicketTypeAdmin(TicketType, admin_site)
+        request = RequestFactory().post('/')
+        request.user = User.objects.create_superuser('admin', password='x')
+        event = self.ticket_type.event
+        ticket_type = make_ticket_type(event, quantity=9, name='Admin')
+        Form = model_admin.get_form(request, ticket_type)
+        data = {
+            'event': event.pk, 'name': 'Admin', 'price': '20.00', 'total_quantity': 9,
+            'available_quantity': 4, 'stripe_count': 1,
+        }
+        form = Form(data, instance=ticket_type)
+        self.assertTrue(form.is_valid(), form.errors)
+        model_admin.save_model(request, form.save(commit=False), form, change=True)
+        event.refresh_from_db()
+        self.assertEqual((event.tickets_available, event.min_price), (14, Decimal('20.00')))
+
+        model_admin.delete_model(request, ticket_type)
+        event.refresh_from_db()
+        self.assertEqual((event.tickets_available, event.min_price), (10, Decimal('50.00')))
+
+        model_admin.delete_queryset(request, TicketType.objects.filter(event=event))
+        event.refresh_from_db()
+        self.assertEqual((event.tickets_available, event.min_price, event.is_sold_out), (0, None, False))
+
+    def test_release_and_unstripe_conserve_stock(self):
+        reservation = reserve_tickets(self.buyer, self.ticket_type, 5)
+        release_reservation(reservation)
+        ticket_type = set_stripe_count(self.ticket_type, 1)
+        self.assertEqual(ticket_type.available_quantity, 10)
+        self.assertFalse(ticket_type.stripes.exists())
+
+
+class ReservationExpiryTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.ticket_type = make_ticket_type(make_event(self.organizer), quantity=10)
+
+    def _reserve(self, quantity, age_minutes):
+        reservation = reserve_tickets(self.buyer, self.ticket_type, quantity)
+        Reservation.objects.filter(pk=reservation.pk).update(
+            created_at=timezone.now() - timedelta(minutes=age_minutes)
+        )
+        return reservation
+
+    def test_expires_stale_holds_in_batches(self):
+        for _ in range(5):
+            self._reserve(1, age_minutes=60)
+        fresh = self._reserve(2, age_minutes=1)
+
+        self.assertEqual(expire_reservations(batch_size=2), 5)
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.available_quantity, 8)
+        self.assertQuerySetEqual(Reservation.objects.all(), [fresh])
+
+    def test_paid_and_in_flight_payments_are_kept(self):
+        paid = self._reserve(1, age_minutes=60)
+        Payment.objects.create(reservation=paid, amount=50, status='completed')
+        # Intent deschis, dar încă în perioada de grație (15 + 15 minute)
+        in_flight = self._reserve(1, age_minutes=20)
+        Payment.objects.create(reservation=in_flight, amount=50, stripe_payment_intent='pi_123')
+        failed = self._reserve(1, age_minutes=60)
+        Payment.objects.create(reservation=failed, amount=50, stripe_payment_intent='pi_456', status='failed')
+
+        self.assertEqual(expire_reservations(), 1)
+        self.assertQuerySetEqual(Reservation.objects.order_by('id'), [paid, in_flight])
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.available_quantity, 8)
+
+    @override_settings(PAYMENT_PROVIDER='events.payments.FakeProvider')
+    def test_abandoned_checkout_is_canceled_and_released(self):
+        get_provider.cache_clear()
+        provider = get_provider()
+        intents = [provider.create_intent(5000, 'ron', {}, f'k{i}') for i in range(2)]
+        abandoned = self._reserve(2, age_minutes=60)
+        Payment.objects.create(reservation=abandoned, amount=100, stripe_payment_intent=intents[0].id)
+        # Plata e deja în procesare: nu mai poate fi anulată, rezervarea rămâne
+        processing = self._reserve(1, age_minutes=60)
+        Payment.objects.create(reservation=processing, amount=50, stripe_payment_intent=intents[1].id)
+        provider.set_status(intents[1].id, 'processing')
+
+        with self.assertLogs('events.reservations', 'WARNING'):
+            self.assertEqual(expire_reservations(), 1)
+        self.assertEqual(provider.intents[intents[0].id].status, 'canceled')
+        self.assertQuerySetEqual(Reservation.objects.all(), [processing])
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.available_quantity, 9)
+
+    def test_locks_only_reservation_rows(self):
+        stale = self._reserve(1, age_minutes=60)
+        Payment.objects.create(reservation=stale, amount=50, stripe_payment_intent='pi_1', status='failed')
+        # Ca pe PostgreSQL: FOR UPDATE fără OF ar bloca și plata din LEFT JOIN, ceea ce e respins
+        locks = mock.patch.multiple(connection.features, has_select_for_update=True, has_select_for_update_of=True)
+        clause = mock.patch.object(
+            connection.ops, 'for_update_sql', lambda *args, of=(), **kwargs: f"/* FOR UPDATE OF {', '.join(of)} */",
+        )
+        with locks, clause, CaptureQueriesContext(connection) as queries:
+            self.assertEqual(expire_reservations(), 1)
+        locked = [query['sql'] for query in queries if 'FOR UPDATE' in query['sql'] and 'events_payment' in query['sql']]
+        self.assertTrue(locked)
+        for sql in locked:
+            self.assertIn('FOR UPDATE OF "events_reservation" */', sql)
+
+    def test_striped_ticket_type_gets_stock_back(self):
+        self.ticket_type = set_stripe_count(self.ticket_type, 4)
+        self._reserve(3, age_minutes=60)
+        expire_reservations()
+        self.ticket_type.refresh_from_db()
+        self.assertEqual(self.ticket_type.stock, 10)
+
+
+@override_settings(WAITING_ROOM_BURST=2)
+class WaitingRoomTests(TestCase):
+    def test_token_bucket_admits_at_configured_rate(self):
+        for backend in (LocalQueueBackend(), CacheQueueBackend()):
+            with self.subTest(backend=type(backend).__name__):
+                self._check_rate(backend)
+
+    def _check_rate(self, backend):
+        cache.clear()
+        seqs = [backend.join(1, rate_per_minute=60, now=0) for _ in range(5)]
+        self.assertEqual([backend.status(1, n, now=0)['position'] for n in seqs], [0, 0, 1, 2, 3])
+        self.assertTrue(backend.status(1, seqs[3], now=2)['admitted'])
+        self.assertFalse(backend.status(1, seqs[4], now=2)['admitted'])
+
+    def test_idle_queue_banks_at_most_burst(self):
+        backend = LocalQueueBackend()
+        backend.join(1, rate_per_minute=60, now=0)
+        backend.admitted_until(1, now=1000)
+        seqs = [backend.join(1, rate_per_minute=60, now=1000) for _ in range(4)]
+        self.assertEqual([backend.status(1, n, now=1000)['admitted'] for n in seqs], [True, True, False, False])
+
+    def test_reservation_waits_for_admission(self):
+        organizer = User.objects.create_user('org', is_organizer=True)
+        ticket_type = make_ticket_type(make_event(organizer, admission_rate=1), quantity=10)
+        url = reverse('event_detail', args=[ticket_type.event_id])
+        get_backend.cache_clear()
+
+        # Primii doi vizitatori intră direct (burst), al treilea așteaptă
+        for i in range(3):
+            buyer = User.objects.create_user(f'buyer{i}', is_participant=True)
+            self.client.force_login(buyer)
+            response = self.client.get(url)
+        queue = response.context['queue']
+        self.assertEqual((queue['position'], queue['admitted']), (1, False))
+
+        self.client.post(url, {'ticket_id': ticket_type.id, 'quantity': 1})
+        self.assertFalse(Reservation.objects.exists())
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('queue_status', args=[ticket_type.event_id]), {'token': queue['token']})
+        self.assertEqual(response.json(), {'position': 1, 'admitted': False})
+
+
+class EventSearchTests(TestCase):
+    def setUp(self):
+        organizer = User.objects.create_user('org', is_organizer=True)
+        self.concert = make_event(organizer, title='Concert rock', location='Cluj-Napoca',
+                                  description='Trupe locale')
+        self.festival = make_event(organizer, title='Festival de film', location='București',
+                                   description='Proiecții și un concert în aer liber')
+        self.theatre = make_event(organizer, title='Teatru', location='Iași', description='Comedie')
+
+    def _search(self, query):
+        return list(search_events(Event.objects.all(), query))
+
+    def test_prefix_match_and_relevance(self):
+        self.assertEqual(self._search('conc'), [self.concert, self.festival])
+
+    def test_matches_location_without_diacritics(self):
+        self.assertEqual(self._search('bucuresti'), [self.festival])
+
+    def test_index_follows_save_and_delete(self):
+        self.theatre.title = 'Teatru de păpuși'
+        self.theatre.save()
+        self.assertEqual(self._search('papusi'), [self.theatre])
+        self.theatre.delete()
+        self.assertEqual(self._search('papusi'), [])
+
+    def test_rebuild_restores_index(self):
+        get_search_backend().clear()
+        self.assertEqual(self._search('film'), [])
+        self.assertEqual(get_search_backend().rebuild(), 3)
+        self.assertEqual(self._search('film'), [self.festival])
+
+    def test_events_list_uses_search(self):
+        response = self.client.get(reverse('events_list'), {'q': 'rock'})
+        self.assertEqual(list(response.context['events']), [self.concert])
+
+    def test_search_is_not_capped_before_filters_and_pagination(self):
+        organizer = self.concert.organizer
+        start = timezone.now() + timedelta(days=7)
+        events = Event.objects.bulk_create(
+            Event(organizer=organizer, title=f'Rock {i}', description='', location='Sibiu',
+                  start_date=start, end_date=start + timedelta(hours=3))
+            for i in range(230)
+        )
+        get_search_backend().index_many(events)
+        # Cel mai puțin relevant rezultat, dar singurul din ziua aleasă
+        self.concert.start_date = start + timedelta(days=20)
+        self.concert.end_date = self.concert.start_date + timedelta(hours=3)
+        self.concert.save()
+        self.assertEqual(
+            list(search_events(Event.objects.filter(start_date__gte=start + timedelta(days=10)), 'rock')), [self.concert],
+        )
+
+        seen, cursor = [], None
+        while True:
+            params = {'q': 'rock', 'format': 'json', **({'cursor': cursor} if cursor else {})}
+            page = self.client.get(reverse('events_list'), params).json()
+            seen += [row['id'] for row in page['results']]
+            if not (cursor := page['next']):
+                break
+        self.assertEqual(len(seen), 231)
+        self.assertEqual(len(set(seen)), 231)
+
+    def test_rank_is_computed_once_in_a_join(self):
+        events = search_events(Event.objects.filter(start_date__gte=timezone.now()), 'concert')
+        # O subinterogare corelată ar rula MATCH din nou pentru fiecare eveniment
+        self.assertEqual(str(events.query).count('SELECT'), 1)
+        plan = events.explain()
+        self.assertNotIn('SUBQUERY', plan)
+        self.assertIn('SCAN events_event_fts VIRTUAL TABLE', plan)
+        self.assertEqual(list(events), [self.concert, self.festival])
+
+    def test_search_without_matches_keeps_other_filters_working(self):
+        city = self.concert.city_id
+        for query in ('zzzz', '!!!'):
+            response = self.client.get(reverse('events_list'), {'q': query, 'city': city, 'sort': ''})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(list(response.context['events']), [])
+            response = self.client.get(reverse('events_list'), {'q': query, 'city': city, 'format': 'json'})
+            self.assertEqual(response.json()['results'], [])
+
+
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.stripe = FakeStripe()
+        organizer = User.objects.create_user('org', is_organizer=True)
+        buyer = User.objects.create_user('buyer', is_participant=True)
+        ticket_type = make_ticket_type(make_event(organizer), quantity=10)
+        self.reservation = reserve_tickets(buyer, ticket_type, 2)
+        self.payment = Payment.objects.create(
+            reservation=self.reservation, amount=100, stripe_payment_intent='pi_123'
+        )
+
+    def deliver(self, event_type, **kwargs):
+        event = self.stripe.payment_intent_event(event_type, 'pi_123', **kwargs)
+        response = self.stripe.deliver(self.client, event)
+        self.assertEqual(response.status_code, 200)
+        return event
+
+    def test_webhook_only_records_the_event(self):
+        with self.assertNumQueries(1):
+            self.deliver('payment_intent.succeeded')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+        self.assertEqual(WebhookEvent.objects.get().event_type, 'payment_intent.succeeded')
+
+    def test_invalid_signature_is_rejected(self):
+        event = self.stripe.payment_intent_event('payment_intent.succeeded', 'pi_123')
+        response = self.stripe.deliver(self.client, event, secret='whsec_altul')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_success_confirms_reservation_once(self):
+        event = self.deliver('payment_intent.succeeded')
+        self.stripe.deliver(self.client, event)  # retrimitere Stripe
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+        self.assertEqual(process_pending(), 1)
+        self.assertEqual(process_pending(), 0)
+        self.payment.refresh_from_db()
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+        self.assertTrue(self.reservation.confirmed)
+
+    def test_failure_after_success_does_not_downgrade(self):
+        now = int(time.time())
+        self.deliver('payment_intent.payment_failed', created=now)
+        self.deliver('payment_intent.succeeded', created=now - 5)
+        self.assertEqual(process_pending(), 2)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+
+    def test_failed_payment_lets_the_hold_expire(self):
+        self.deliver('payment_intent.payment_failed')
+        process_pending()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'failed')
+        later = timezone.now() + timedelta(hours=1)
+        self.assertQuerySetEqual(expirable_reservations(later), [self.reservation])
+
+    def test_batches_exclude_only_failed_events(self):
+        for i in range(5):
+            WebhookEvent.objects.create(event_id=f'evt_{i}', event_type='payment_intent.created', payload={})
+        broken = WebhookEvent.objects.create(event_id='evt_broken', event_type='payment_intent.succeeded', payload={})
+        with CaptureQueriesContext(connection) as queries, self.assertLogs('events.webhooks', 'ERROR'):
+            self.assertEqual(process_pending(batch_size=2), 5)
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'events_webhookevent' in q['sql']]
+        # Cele reușite ies din inbox singure; în SQL apare doar id-ul eșuat
+        self.assertTrue(all(f'IN ({broken.pk})' in sql or 'IN (' not in sql for sql in selects))
+
+    def test_failing_handler_is_retried_later(self):
+        self.deliver('payment_intent.succeeded')
+        broken = mock.Mock(side_effect=RuntimeError('db'))
+        with mock.patch.dict(HANDLERS, {'payment_intent.succeeded': broken}), \
+                self.assertLogs('events.webhooks', 'ERROR'):
+            self.assertEqual(process_pending(), 0)
+        inbox = WebhookEvent.objects.get()
+        self.assertEqual(inbox.attempts, 1)
+        self.assertIn('db', inbox.last_error)
+
+        self.assertEqual(process_pending(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+
+
+@override_settings(PAYMENT_PROVIDER='events.payments.FakeProvider')
+class PaymentProviderTests(TestCase):
+    def setUp(self):
+        organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        ticket_type = make_ticket_type(make_event(organizer), quantity=10, price='19.99')
+        self.reservation = reserve_tickets(self.buyer, ticket_type, 3)
+        self.url = reverse('create_payment_intent', args=[self.reservation.pk])
+        get_provider.cache_clear()
+        self.provider = get_provider()
+        self.client.force_login(self.buyer)
+
+    def create_intent(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return self.provider.intents[Payment.objects.get().stripe_payment_intent]
+
+    def test_amounts_are_integer_minor_units(self):
+        intent = self.create_intent()
+        self.assertEqual(intent.amount, 5997)
+        self.assertEqual(Payment.objects.get().amount, Decimal('59.97'))
+        self.assertEqual(to_minor_units(Decimal('0.1') * 3, 'ron'), 30)
+        self.assertEqual(to_minor_units(Decimal('1500'), 'jpy'), 1500)
+
+    def test_open_intent_is_reused(self):
+        first = self.create_intent()
+        second = self.create_intent()
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(self.provider.calls, ['create', 'retrieve'])
+
+    def test_changed_amount_updates_the_open_intent(self):
+        first = self.create_intent()
+        Reservation.objects.filter(pk=self.reservation.pk).update(quantity=1)
+        second = self.create_intent()
+        self.assertEqual((second.id, second.amount), (first.id, 1999))
+
+    def test_canceled_intent_is_replaced(self):
+        first = self.create_intent()
+        self.provider.set_status(first.id, 'canceled')
+        self.assertNotEqual(self.create_intent().id, first.id)
+
+    def test_paid_reservation_gets_no_new_intent(self):
+        self.create_intent()
+        Payment.objects.update(status='completed')
+        self.assertEqual(self.client.get(self.url).status_code, 409)
+        self.assertEqual(self.provider.calls, ['create'])
+
+    def test_payment_completed_during_the_provider_call_is_kept(self):
+        self.create_intent()
+        real = payments.intent_for_reservation
+
+        def completed_meanwhile(payment, currency):
+            intent = real(payment, currency)
+            Payment.objects.filter(pk=payment.pk).update(status='completed')
+            return intent
+
+        with mock.patch('events.payments.intent_for_reservation', completed_meanwhile):
+            self.assertEqual(self.client.get(self.url).status_code, 409)
+        self.assertEqual(Payment.objects.get().status, 'completed')
+
+    def test_fake_provider_verifies_webhook_signatures(self):
+        stripe = FakeStripe()
+        event = stripe.payment_intent_event('payment_intent.succeeded', 'pi_fake_1')
+        self.assertEqual(stripe.deliver(self.client, event).status_code, 200)
+        self.assertEqual(stripe.deliver(self.client, event, secret='whsec_altul').status_code, 400)
+
+    @override_settings(PAYMENT_PROVIDER='events.payments.StripeProvider', PAYMENT_HTTP_TIMEOUT=3)
+    def test_stripe_provider_uses_its_own_pooled_client(self):
+        import stripe
+
+        provider = get_provider()
+        http_client = provider._client._requestor._client
+        self.assertEqual(http_client._timeout, 3)
+        self.assertIsNotNone(http_client._session)
+        self.assertIsNone(stripe.api_key)
+
+
+class TicketManagementBulkTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer)
+        self.standard = make_ticket_type(self.event, quantity=100, name='Standard')
+        self.vip = make_ticket_type(self.event, quantity=100, name='VIP')
+        self.standard_reservations = [reserve_tickets(self.buyer, self.standard, 2) for _ in range(5)]
+        self.vip_reservations = [reserve_tickets(self.buyer, self.vip, 3) for _ in range(4)]
+        self.url = reverse('ticket_management', args=[self.event.pk])
+        self.client.force_login(self.organizer)
+
+    def post(self, data, query=''):
+        return self.client.post(self.url + query, data)
+
+    def test_bulk_confirm_is_one_update(self):
+        ids = [r.pk for r in self.standard_reservations[:3]]
+        with CaptureQueriesContext(connection) as queries:
+            self.post({'action': 'confirm', 'reservation_ids': ids})
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in queries), 1)
+        self.assertEqual(Reservation.objects.filter(confirmed=True).count(), 3)
+
+        self.post({'action': 'cancel', 'reservation_ids': ids[:2]})
+        self.assertEqual(Reservation.objects.filter(confirmed=True).count(), 1)
+
+    def test_bulk_release_returns_stock_per_ticket_type(self):
+        ids = [r.pk for r in self.standard_reservations + self.vip_reservations[:2]]
+        with CaptureQueriesContext(connection) as queries:
+            self.post({'action': 'release', 'reservation_ids': ids})
+        stock_updates = [q for q in queries if q['sql'].startswith('UPDATE "events_tickettype"')]
+        self.assertEqual(len(stock_updates), 2)
+
+        self.standard.refresh_from_db()
+        self.vip.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual(self.standard.available_quantity, 100)
+        self.assertEqual(self.vip.available_quantity, 94)
+        self.assertEqual(self.event.tickets_available, 194)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_other_events_are_never_touched(self):
+        other = make_ticket_type(make_event(self.organizer, title='Altul'), quantity=10)
+        foreign = reserve_tickets(self.buyer, other, 1)
+        self.post({'action': 'release', 'reservation_ids': [foreign.pk]})
+        self.assertTrue(Reservation.objects.filter(pk=foreign.pk).exists())
+        self.assertEqual(bulk_release(Reservation.objects.none()), (0, 0))
+
+    def test_sold_reservations_are_never_released(self):
+        confirmed, paid, pending = self.standard_reservations[:3]
+        bulk_confirm(Reservation.objects.filter(pk=confirmed.pk))
+        Payment.objects.create(reservation=paid, amount=100, status='completed')
+
+        response = self.post({'action': 'release', 'all_matching': '1'}, f'?ticket_type={self.standard.pk}')
+        notices = [str(message) for message in get_messages(response.wsgi_request)]
+        self.assertIn("2 rezervări confirmate sau plătite nu au fost eliberate.", notices)
+        self.assertQuerySetEqual(
+            Reservation.objects.filter(ticket_type=self.standard).order_by('id'), [confirmed, paid],
+        )
+        self.assertTrue(Payment.objects.filter(reservation=paid, status='completed').exists())
+        self.standard.refresh_from_db()
+        self.assertEqual(self.standard.available_quantity, 96)
+        self.assertNotIn(pending, Reservation.objects.all())
+
+    def test_all_matching_uses_filters(self):
+        self.post({'action': 'confirm', 'all_matching': '1'}, f'?ticket_type={self.vip.pk}')
+        self.assertEqual(Reservation.objects.filter(confirmed=True).count(), 4)
+
+        response = self.client.get(self.url, {'status': 'pending'})
+        self.assertEqual(len(response.context['reservations']), 5)
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        response = self.client.get(self.url, {'date_from': tomorrow})
+        self.assertEqual(len(response.context['reservations']), 0)
+
+    def test_reservation_table_is_paginated(self):
+        ticket_type = make_ticket_type(self.event, quantity=100)
+        for _ in range(30):
+            reserve_tickets(self.buyer, ticket_type, 1)
+        response = self.client.get(self.url)
+        page = response.context['page']
+        self.assertEqual(len(page), 24)
+        self.assertTrue(page.has_next)
+        response = self.client.get(self.url, {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page']), 15)
+
+
+class EditEventTicketsTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer)
+        self.url = reverse('edit_event', args=[self.event.pk])
+        self.client.force_login(self.organizer)
+
+    def post(self, tickets, **extra):
+        start = self.event.start_date
+        data = {
+            'title': 'Concert nou', 'description': 'Descriere', 'location': 'Cluj',
+            'start_date': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_date': (start + timedelta(hours=3)).strftime('%Y-%m-%dT%H:%M'),
+            'ticket_id': [t[0] for t in tickets], 'ticket_name': [t[1] for t in tickets],
+            'ticket_price': [t[2] for t in tickets], 'ticket_quantity': [t[3] for t in tickets],
+            **extra,
+        }
+        return self.client.post(self.url, data)
+
+    def test_stock_is_recomputed_from_sold_tickets(self):
+        ticket_type = make_ticket_type(self.event, quantity=100)
+        reserve_tickets(self.buyer, ticket_type, 30)
+        self.post([(ticket_type.pk, 'General', '60.00', 150)])
+
+        ticket_type.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual((ticket_type.total_quantity, ticket_type.available_quantity), (150, 120))
+        self.assertEqual(ticket_type.price, Decimal('60.00'))
+        self.assertEqual(self.event.tickets_available, 120)
+        self.assertEqual(self.event.title, 'Concert nou')
+
+    def test_total_below_sold_is_rejected_and_nothing_is_saved(self):
+        ticket_type = make_ticket_type(self.event, quantity=100)
+        reserve_tickets(self.buyer, ticket_type, 30)
+        response = self.post([(ticket_type.pk, 'General', '60.00', 20)])
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+
+        ticket_type.refresh_from_db()
+        self.event.refresh_from_db()
+        self.assertEqual((ticket_type.total_quantity, ticket_type.available_quantity), (100, 70))
+        self.assertEqual(self.event.title, 'Concert')
+
+    def test_new_tiers_are_created_and_unsold_tiers_deleted(self):
+        sold = make_ticket_type(self.event, quantity=10, name='Sold')
+        unsold = make_ticket_type(self.event, quantity=10, name='Unsold')
+        reserve_tickets(self.buyer, sold, 1)
+        self.post(
+            [(sold.pk, 'Sold', '50.00', 10), (unsold.pk, 'Unsold', '50.00', 10), ('', 'VIP', '200', 5)],
+            delete_ticket=[unsold.pk],
+        )
+        self.assertEqual(
+            sorted(self.event.ticket_types.values_list('name', 'available_quantity')), [('Sold', 9), ('VIP', 5)]
+        )
+
+        response = self.post([(sold.pk, 'Sold', '50.00', 10)], delete_ticket=[sold.pk])
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertTrue(TicketType.objects.filter(pk=sold.pk).exists())
+
+    def test_striped_stock_moves_to_shared_pool(self):
+        ticket_type = set_stripe_count(make_ticket_type(self.event, quantity=40), 4)
+        reserve_tickets(self.buyer, ticket_type, 5)
+        self.post([(ticket_type.pk, 'General', '50.00', 60)])
+
+        ticket_type.refresh_from_db()
+        self.assertEqual(ticket_type.stock, 55)
+        self.assertEqual(ticket_type.available_quantity, 55)
+        reserve_tickets(self.buyer, ticket_type, 10)
+        ticket_type.refresh_from_db()
+        self.assertEqual(ticket_type.stock, 45)
+
+    def test_invalid_admission_rate_is_a_form_error(self):
+        for value in ('abc', '0', '-5', '2.5', '99999999999'):
+            response = self.post([], admission_rate=value)
+            self.assertRedirects(response, self.url, fetch_redirect_response=False)
+            self.assertIn('Ritmul de admitere', str(list(get_messages(response.wsgi_request))[0]))
+        self.event.refresh_from_db()
+        self.assertIsNone(self.event.admission_rate)
+        self.assertEqual(self.event.title, 'Concert')
+
+        self.post([], admission_rate=' 30 ')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.admission_rate, 30)
+
+    def test_sold_is_counted_after_all_locks(self):
+        plain = make_ticket_type(self.event, quantity=40, name='Plain')
+        striped = set_stripe_count(make_ticket_type(self.event, quantity=40, name='Striped'), 4)
+        reserve_tickets(self.buyer, plain, 5)
+        reserve_tickets(self.buyer, striped, 5)
+        rows = [
+            (plain.pk, {'name': 'Plain', 'price': Decimal('50.00'), 'quantity': 4}),
+            (striped.pk, {'name': 'Striped', 'price': Decimal('50.00'), 'quantity': 4}),
+        ]
+        locks = mock.patch.multiple(connection.features, has_select_for_update=True, has_select_for_update_of=True)
+        clause = mock.patch.object(connection.ops, 'for_update_sql', lambda *args, **kwargs: '/* FOR UPDATE */')
+        with locks, clause, CaptureQueriesContext(connection) as queries, transaction.atomic():
+            with self.assertRaises(TicketEditError) as raised:
+                apply_ticket_changes(self.event, rows)
+        self.assertEqual(len(raised.exception.errors), 2)
+        sql = [query['sql'] for query in queries]
+        last_lock = max(i for i, query in enumerate(sql) if 'FOR UPDATE' in query)
+        self.assertFalse(any('"events_reservation"' in query for query in sql[:last_lock + 1]))
+        # Numărătoarea e o interogare nouă, după ce rezervările care așteptau s-au încheiat
+        self.assertTrue(any('"events_reservation"' in query for query in sql[last_lock + 1:]))
+
+    def test_query_count_does_not_depend_on_ticket_count(self):
+        def edit_queries(count):
+            # Aceeași locație ca în formular: primul apel nu trebuie să plătească crearea orașului
+            event = make_event(self.organizer, location='Cluj')
+            tickets = [make_ticket_type(event, quantity=10, name=f'T{i}') for i in range(count)]
+            self.url = reverse('edit_event', args=[event.pk])
+            self.event = event
+            rows = [(t.pk, f'{t.name}!', '70.00', 20) for t in tickets] + [('', 'Nou', '10', 5)] * count
+            with CaptureQueriesContext(connection) as queries:
+                self.post(rows)
+            self.assertEqual(event.ticket_types.filter(price=Decimal('70.00'), available_quantity=20).count(), count)
+            return len(queries)
+
+        self.assertEqual(edit_queries(2), edit_queries(40))
+
+
+class ReservationExportTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', email='b@example.com', is_participant=True)
+        self.event = make_event(self.organizer)
+        self.ticket_type = make_ticket_type(self.event, quantity=1000, price=Decimal('50.00'))
+        self.url = reverse('export_reservations', args=[self.event.pk])
+
+    def add_reservations(self, count):
+        Reservation.objects.bulk_create(
+            Reservation(user=self.buyer, ticket_type=self.ticket_type, quantity=1) for _ in range(count)
+        )
+
+    def export(self, **params):
+        self.client.force_login(self.organizer)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_includes_payment_status(self):
+        paid = reserve_tickets(self.buyer, self.ticket_type, 2)
+        Payment.objects.create(reservation=paid, amount=100, status='completed', stripe_payment_intent='pi_1')
+        reserve_tickets(self.buyer, self.ticket_type, 1)
+
+        rows = list(csv.DictReader(self.export().splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['email'], 'b@example.com')
+        self.assertEqual(rows[0]['payment_status'], 'completed')
+        self.assertEqual(rows[0]['unit_price'], '50.00')
+        self.assertEqual(rows[1]['payment_status'], '')
+
+    def test_ndjson_with_filters(self):
+        reserve_tickets(self.buyer, self.ticket_type, 1)
+        Reservation.objects.update(confirmed=True)
+        reserve_tickets(self.buyer, self.ticket_type, 3)
+
+        lines = self.export(format='ndjson', status='pending').splitlines()
+        self.assertEqual([json.loads(line)['quantity'] for line in lines], [3])
+        tomorrow = (timezone.localdate() + timedelta(days=1)).isoformat()
+        self.assertEqual(self.export(format='ndjson', date_from=tomorrow), '')
+
+    def test_only_the_organizer_can_export(self):
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        other = User.objects.create_user('other', is_organizer=True)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.organizer)
+        self.assertEqual(self.client.get(self.url, {'format': 'xml'}).status_code, 400)
+
+    def peak_memory(self, rows):
+        Reservation.objects.all().delete()
+        self.add_reservations(rows)
+        queryset = Reservation.objects.filter(ticket_type__event=self.event)
+        tracemalloc.start()
+        try:
+            for _ in stream_csv(queryset, chunk_size=100):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_does_not_grow_with_rows(self):
+        small = self.peak_memory(500)
+        large = self.peak_memory(5000)
+        self.assertLess(large, small * 1.5)
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.stripe = FakeStripe()
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer)
+        self.standard = make_ticket_type(self.event, quantity=100, name='Standard', price=Decimal('50.00'))
+        self.vip = make_ticket_type(self.event, quantity=100, name='VIP', price=Decimal('200.00'))
+
+    def pay(self, reservation):
+        amount = reservation.ticket_type.price * reservation.quantity
+        Payment.objects.create(reservation=reservation, amount=amount, stripe_payment_intent=f'pi_{reservation.pk}')
+        self.stripe.deliver(self.client, self.stripe.payment_intent_event(
+            'payment_intent.succeeded', f'pi_{reservation.pk}'))
+        process_pending()
+
+    def sell(self):
+        paid = [reserve_tickets(self.buyer, self.standard, 2), reserve_tickets(self.buyer, self.vip, 1)]
+        for reservation in paid:
+            self.pay(reservation)
+        release_reservation(reserve_tickets(self.buyer, self.standard, 4))
+        expired = reserve_tickets(self.buyer, self.vip, 1)
+        Reservation.objects.filter(pk=expired.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        expire_reservations()
+        reserve_tickets(self.buyer, self.standard, 3)
+
+    def test_rollups_follow_reservations_and_payments(self):
+        self.sell()
+        totals = event_report(self.event)['totals']
+        self.assertEqual(totals['revenue'], Decimal('300.00'))
+        self.assertEqual(totals['tickets_sold'], 3)
+        self.assertEqual(totals['reservations'], 3)
+        self.assertEqual(totals['tickets_reserved'], 6)
+        self.assertEqual(totals['released_reservations'], 2)
+        self.assertEqual(totals['conversion'], 0.4)
+
+        by_type = {row['ticket_type__name']: row for row in event_report(self.event)['ticket_types']}
+        self.assertEqual(by_type['VIP']['revenue'], Decimal('200.00'))
+        self.assertEqual(by_type['Standard']['tickets_reserved'], 5)
+
+    def test_rebuild_matches_incremental_totals(self):
+        set_stripe_count(self.standard, 4)
+        self.standard.refresh_from_db()
+        self.sell()
+        incremental = event_report(self.event)
+        SalesRollup.objects.update(reservations=0, revenue=0)
+        rebuild_rollups()
+        self.assertEqual(event_report(self.event), incremental)
+
+    def test_dashboard_reads_only_rollups(self):
+        self.sell()
+        self.client.force_login(self.organizer)
+        url = reverse('sales_dashboard', args=[self.event.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'format': 'json'})
+        touched = ' '.join(q['sql'] for q in queries)
+        self.assertNotIn('events_reservation', touched)
+        self.assertNotIn('events_payment', touched)
+        self.assertEqual(response.json()['totals']['tickets_sold'], 3)
+
+        self.assertContains(self.client.get(url), '300.00 RON')
+        self.assertContains(self.client.get(reverse('my_events')), '300.00 RON')
+
+
+class EventImagePipelineTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.client.force_login(self.organizer)
+
+    def upload(self, size=(2000, 1000), color='red'):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        return SimpleUploadedFile('poza.png', buffer.getvalue(), content_type='image/png')
+
+    def create_event(self, image):
+        start = timezone.now() + timedelta(days=3)
+        self.client.post(reverse('create_event'), {
+            'title': 'Festival', 'description': 'Descriere', 'location': 'Cluj',
+            'start_date': start.isoformat(), 'end_date': (start + timedelta(hours=2)).isoformat(),
+            'image': image,
+        })
+        return Event.objects.latest('id')
+
+    def test_upload_is_processed_off_the_request(self):
+        event = self.create_event(self.upload())
+        self.assertIsNotNone(event.image_asset)
+        self.assertIsNone(event.image_asset.processed_at)
+        self.assertContains(self.client.get(reverse('events_list')), event.image.url)
+
+        self.assertEqual(process_images(workers=2), 1)
+        variants = ImageAsset.objects.get().variants
+        self.assertEqual((variants['hero']['width'], variants['hero']['height']), (1200, 600))
+        self.assertEqual(variants['thumbnail']['width'], 160)
+        with default_storage.open(variants['card']['webp']) as webp:
+            self.assertEqual(Image.open(webp).format, 'WEBP')
+
+        response = self.client.get(reverse('events_list'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f"{default_storage.url(variants['card']['jpeg'])} 480w")
+
+    def test_batches_page_by_id(self):
+        for color in ('red', 'green', 'blue'):
+            self.create_event(self.upload(size=(300, 200), color=color))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(process_images(workers=1, batch_size=1), 3)
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'events_imageasset' in q['sql']]
+        self.assertFalse(any(' IN (' in sql for sql in selects))
+
+    def test_small_images_are_not_upscaled(self):
+        self.create_event(self.upload(size=(300, 200)))
+        process_images()
+        variants = ImageAsset.objects.get().variants
+        self.assertEqual(variants['card']['width'], 300)
+        self.assertEqual(variants['hero']['width'], 300)
+
+    def test_duplicate_uploads_are_stored_once(self):
+        first = self.create_event(self.upload())
+        second = make_event(self.organizer)
+        self.client.post(reverse('customize_event', args=[second.pk]), {
+            'theme_color': '#000000', 'banner_text': '', 'promo_message': '', 'image': self.upload(),
+        })
+        second.refresh_from_db()
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(ImageAsset.objects.count(), 1)
+        self.assertEqual(len(default_storage.listdir('events')[1]), 1)
+
+    def test_backfill_processes_existing_images(self):
+        for color in ['red', 'green', 'blue']:
+            event = make_event(self.organizer)
+            event.image.save('vechi.png', self.upload(color=color))
+        call_command('backfill_event_images', workers=3, stdout=io.StringIO())
+        self.assertEqual(ImageAsset.objects.filter(processed_at__isnull=False).count(), 3)
+        self.assertFalse(Event.objects.filter(image_asset__isnull=True).exists())
+
+
+class EventImportTests(TestCase):
+    HEADER = 'event_ref,title,description,location,start_date,end_date,ticket_name,ticket_price,ticket_quantity\n'
+
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+
+    def csv_rows(self, events, tiers=2):
+        lines = [
+            f'e{i},Festival {i},Descriere,Sibiu,2030-07-01T18:00,2030-07-01T23:00,Tier {t},{50 + t}.00,{100 * t}\n'
+            for i in range(events) for t in range(tiers)
+        ]
+        return self.HEADER + ''.join(lines)
+
+    def test_csv_import_creates_events_and_ticket_types(self):
+        result = import_events(self.organizer, self.csv_rows(3))
+        self.assertTrue(result.ok)
+        self.assertEqual((result.events, result.ticket_types), (3, 6))
+
+        event = Event.objects.get(title='Festival 1')
+        self.assertEqual(event.ticket_types.count(), 2)
+        self.assertEqual(event.tickets_available, 100)
+        self.assertEqual(event.min_price, Decimal('50.00'))
+        self.assertEqual(list(search_events(Event.objects.all(), 'festival 2')), [Event.objects.get(title='Festival 2')])
+        self.assertContains(self.client.get(reverse('events_list')), 'Festival 1')
+
+    def test_whole_file_is_validated_before_writing(self):
+        text = self.csv_rows(2) + (
+            'e9,Rupt,Descriere,Sibiu,2030-07-01T18:00,2030-06-01T18:00,Normal,10,5\n'
+            'e8,Preț,Descriere,Sibiu,2030-07-01T18:00,2030-07-01T20:00,Normal,gratis,5\n'
+            'e1,Alt titlu,Descriere,Sibiu,2030-07-01T18:00,2030-07-01T23:00,VIP,10,5\n'
+        )
+        result = import_events(self.organizer, text)
+        self.assertEqual([line for line, _ in result.errors], [6, 7, 8])
+        self.assertFalse(Event.objects.exists())
+
+    def test_json_import_and_dry_run(self):
+        payload = json.dumps([{
+            'title': 'Jazz', 'description': 'Seară de jazz', 'location': 'Iași',
+            'start_date': '2030-05-01T20:00:00+03:00', 'end_date': '2030-05-01T23:00:00+03:00',
+            'tickets': [{'name': 'Standard', 'price': 80, 'quantity': 200}],
+        }])
+        result = import_events(self.organizer, payload, 'json', dry_run=True)
+        self.assertEqual((result.events, result.ticket_types, result.dry_run), (1, 1, True))
+        self.assertFalse(Event.objects.exists())
+
+        import_events(self.organizer, payload, 'json')
+        self.assertEqual(TicketType.objects.get().available_quantity, 200)
+
+    def test_large_imports_are_batched(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = import_events(self.organizer, self.csv_rows(2500), batch_size=1000)
+        self.assertEqual(result.ticket_types, 5000)
+        # Loturile sunt limitate și de numărul maxim de parametri al bazei de date (999 pe SQLite)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        self.assertLess(len(inserts), 7500 / 40)
+        self.assertEqual(Event.objects.count(), 2500)
+
+    def test_upload_view_reports_errors(self):
+        self.client.force_login(self.organizer)
+        upload = SimpleUploadedFile('evenimente.csv', (self.HEADER + 'e1,,,,,,,,\n').encode())
+        response = self.client.post(reverse('import_events'), {'file': upload})
+        self.assertContains(response, 'Câmpuri lipsă')
+
+        upload = SimpleUploadedFile('evenimente.csv', self.csv_rows(2).encode())
+        response = self.client.post(reverse('import_events'), {'file': upload})
+        self.assertRedirects(response, reverse('my_events'))
+        self.assertEqual(Event.objects.filter(organizer=self.organizer).count(), 2)
+
+    def test_management_command(self):
+        path = Path(tempfile.mkdtemp()) / 'evenimente.csv'
+        self.addCleanup(shutil.rmtree, path.parent)
+        path.write_text(self.csv_rows(4))
+        out = io.StringIO()
+        call_command('import_events', str(path), organizer='org', dry_run=True, stdout=out)
+        self.assertIn('4 evenimente', out.getvalue())
+        self.assertFalse(Event.objects.exists())
+        call_command('import_events', str(path), organizer='org', stdout=io.StringIO())
+        self.assertEqual(Event.objects.count(), 4)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        organizer = User.objects.create_user('org', is_organizer=True)
+        start = timezone.now()
+        # Două evenimente cu aceeași dată, ca să verificăm departajarea după id
+        self.events = [make_event(organizer, title=f'E{i}', start_date=start + timedelta(days=i // 2))
+                       for i in range(5)]
+
+    def test_walks_forward_and_back_without_offset(self):
+        keys = ['start_date', 'id']
+        with CaptureQueriesContext(connection) as queries:
+            first = paginate_keyset(Event.objects.all(), keys, page_size=2)
+            second = paginate_keyset(Event.objects.all(), keys, first.next_cursor, page_size=2)
+            third = paginate_keyset(Event.objects.all(), keys, second.next_cursor, page_size=2)
+            back = paginate_keyset(Event.objects.all(), keys, third.previous_cursor, page_size=2)
+
+        self.assertEqual([list(p) for p in (first, second, third)],
+                         [self.events[:2], self.events[2:4], self.events[4:]])
+        self.assertEqual(list(back), self.events[2:4])
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+        self.assertTrue(back.has_previous and back.has_next)
+        self.assertFalse(any('OFFSET' in q['sql'] for q in queries.captured_queries))
+
+    def test_events_list_json_variant(self):
+        response = self.client.get(reverse('events_list'), {'format': 'json'})
+        data = response.json()
+        self.assertEqual([e['title'] for e in data['results']], [e.title for e in self.events])
+        self.assertIsNone(data['next'])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('events_list'), {'cursor': 'nonsense'})
+        self.assertEqual(len(response.context['events']), 5)
+
+    def test_cursor_is_bound_to_its_sort_keys(self):
+        first = paginate_keyset(Event.objects.all(), ['start_date', 'id'], page_size=2)
+        with self.assertRaises(InvalidCursor):
+            paginate_keyset(Event.objects.all(), ['min_price', 'id'], first.next_cursor, page_size=2)
+
+        Event.objects.update(min_price=Decimal('10.00'))
+        response = self.client.get(reverse('events_list'), {'sort': 'price', 'cursor': first.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['events']), 5)
+
+
+class EventAvailabilityTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer)
+        self.cheap = make_ticket_type(self.event, quantity=2, price='20.00')
+        self.vip = make_ticket_type(self.event, quantity=1, price='200.00')
+        self.event.refresh_availability()
+
+    def test_aggregate_follows_reservations_and_releases(self):
+        self.assertEqual((self.event.tickets_available, self.event.min_price), (3, Decimal('20.00')))
+        reservations = [reserve_tickets(self.buyer, t, t.total_quantity) for t in (self.cheap, self.vip)]
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.tickets_available, self.event.is_sold_out), (0, True))
+
+        release_reservation(reservations[1])
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.available_tickets, self.event.is_sold_out), (1, False))
+
+    def test_reservations_apply_a_delta_on_both_paths(self):
+        striped = set_stripe_count(make_ticket_type(self.event, quantity=4, price='90.00', name='Benzi'), 2)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.tickets_available, 7)
+        with CaptureQueriesContext(connection) as queries:
+            reserve_tickets(self.buyer, self.cheap, 2)
+        event_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "events_event"')]
+        self.assertEqual(len(event_updates), 1)
+        self.assertNotIn('SELECT', event_updates[0])
+
+        reserve_tickets(self.buyer, self.vip, 1)
+        reserve_tickets(self.buyer, striped, 3)
+        last = reserve_tickets(self.buyer, striped, 1)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.tickets_available, self.event.is_sold_out), (0, True))
+        release_reservation(last)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.tickets_available, self.event.is_sold_out), (1, False))
+
+    def test_aggregate_follows_expiry(self):
+        reserve_tickets(self.buyer, self.cheap, 2)
+        Reservation.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        expire_reservations()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.tickets_available, 3)
+
+    def test_annotation_matches_stored_aggregate(self):
+        reserve_tickets(self.buyer, self.cheap, 1)
+        event = Event.objects.with_availability().get(pk=self.event.pk)
+        self.assertEqual(event.live_tickets_available, event.tickets_available)
+        self.assertEqual(event.live_min_price, event.min_price)
+
+    def test_events_list_sorts_and_filters_in_one_query(self):
+        other = make_event(self.organizer, title='Ieftin')
+        make_ticket_type(other, quantity=5, price='10.00')
+        other.refresh_availability()
+        make_event(self.organizer, title='Fără bilete')
+
+        # O interogare pentru pagină și una pentru toate numărătorile fațetelor
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('events_list'), {'sort': 'price', 'available': '1'})
+            titles = [e.title for e in response.context['events']]
+        self.assertEqual(titles, ['Ieftin', 'Concert'])
+
+    def test_price_sort_pages_past_the_first_page(self):
+        for i in range(30):
+            make_event(self.organizer, title=f'P{i:02}')
+        for i, event in enumerate(Event.objects.filter(title__startswith='P').order_by('title')):
+            Event.objects.filter(pk=event.pk).update(min_price=Decimal(f'{i // 2}.50'))
+
+        data = self.client.get(reverse('events_list'), {'sort': 'price', 'format': 'json'}).json()
+        titles = [e['title'] for e in data['results']]
+        data = self.client.get(reverse('events_list'), {'sort': 'price', 'format': 'json', 'cursor': data['next']}).json()
+        titles += [e['title'] for e in data['results']]
+        self.assertIsNone(data['next'])
+        self.assertEqual(titles[:30], [f'P{i:02}' for i in range(30)])
+        self.assertEqual(titles[30:], ['Concert'])
+
+        response = self.client.get(reverse('events_list'), {'sort': 'price'})
+        cursor = response.context['events'].next_cursor
+        response = self.client.get(reverse('events_list'), {'sort': 'price', 'cursor': cursor})
+        self.assertEqual([e.title for e in response.context['events']], ['P24', 'P25', 'P26', 'P27', 'P28', 'P29', 'Concert'])
+
+
+@skipUnless(connection.vendor == 'sqlite', "Planul de execuție e verificat pe SQLite.")
+class HotQueryIndexTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer)
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertIn('INDEX', plan)
+        for line in plan.splitlines():
+            self.assertNotRegex(line, r'SCAN events_\w+$', plan)
+            self.assertNotIn('TEMP B-TREE', line, plan)
+
+    def test_events_list_date_range(self):
+        now = timezone.now()
+        self.assertUsesIndex(Event.objects.filter(
+            start_date__gte=now, start_date__lt=now + timedelta(days=1)
+        ).order_by('start_date', 'id'))
+
+    def test_my_events(self):
+        self.assertUsesIndex(Event.objects.filter(organizer=self.organizer).order_by('-start_date'))
+
+    def test_my_tickets(self):
+        self.assertUsesIndex(Reservation.objects.filter(user=self.buyer, confirmed=True))
+
+    def test_ticket_management(self):
+        self.assertUsesIndex(Reservation.objects.filter(ticket_type__event=self.event))
+
+    def test_webhook_payment_lookup(self):
+        self.assertUsesIndex(Payment.objects.filter(stripe_payment_intent='pi_123'))
+
+    def test_expiry_sweep(self):
+        self.assertUsesIndex(expirable_reservations().order_by('created_at'))
+
+    def test_webhook_inbox(self):
+        self.assertUsesIndex(pending_events().order_by('occurred_at', 'id'))
+
+
+class EventDateFilterTests(TestCase):
+    def test_day_filter_uses_local_day_bounds(self):
+        organizer = User.objects.create_user('org', is_organizer=True)
+        day = timezone.localdate() + timedelta(days=3)
+        midnight = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        inside = make_event(organizer, title='Miezul nopții', start_date=midnight)
+        make_event(organizer, title='Cu o zi înainte', start_date=midnight - timedelta(seconds=1))
+        make_event(organizer, title='A doua zi', start_date=midnight + timedelta(days=1))
+        make_event(organizer, title='Trecut', start_date=timezone.now() - timedelta(days=1))
+
+        response = self.client.get(reverse('events_list'), {'date': day.isoformat()})
+        self.assertEqual(list(response.context['events']), [inside])
+
+        response = self.client.get(reverse('events_list'), {
+            'date_from': day.isoformat(), 'date_to': (day + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(len(response.context['events']), 2)
+
+        response = self.client.get(reverse('events_list'), {'upcoming': '1'})
+        self.assertEqual(len(response.context['events']), 3)
+
+    def test_impossible_dates_are_ignored(self):
+        organizer = User.objects.create_user('org', is_organizer=True, is_participant=True)
+        event = make_event(organizer)
+        reserve_tickets(organizer, make_ticket_type(event), 1)
+        bad = {'date': '2026-02-30', 'date_from': '2026-13-01', 'date_to': '2026-04-31'}
+
+        response = self.client.get(reverse('events_list'), bad)
+        self.assertEqual(list(response.context['events']), [event])
+        self.assertEqual(len(self.client.get(reverse('events_list'), {**bad, 'format': 'json'}).json()['results']), 1)
+
+        self.client.force_login(organizer)
+        response = self.client.get(reverse('ticket_management', args=[event.pk]), bad)
+        self.assertEqual(len(response.context['reservations']), 1)
+        response = self.client.get(reverse('export_reservations', args=[event.pk]), bad)
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryBudgetTests(TestCase):
+    """Bugetul de interogări pentru fiecare pagină; un N+1 nou face testul să eșueze."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('org', is_organizer=True)
+        cls.buyer = User.objects.create_user('buyer', is_participant=True)
+        cls.events = [make_event(cls.organizer, title=f'Concert {i}') for i in range(3)]
+        cls.ticket_types = [make_ticket_type(e, quantity=50, name=f'T{i}')
+                            for e in cls.events for i in range(3)]
+        for event in cls.events:
+            event.refresh_availability()
+        cls.reservations = [reserve_tickets(cls.buyer, t, 1) for t in cls.ticket_types[:6]]
+        Reservation.objects.filter(pk__in=[r.pk for r in cls.reservations[:3]]).update(confirmed=True)
+        for reservation in cls.reservations:
+            Payment.objects.create(reservation=reservation, amount=50)
+
+    def assertBudget(self, max_queries, method, url, data=None, user=None, **extra):
+        if user:
+            self.client.force_login(user)
+        with assert_query_budget(max_queries):
+            response = getattr(self.client, method)(url, data or {}, **extra)
+        self.assertLess(response.status_code, 400)
+
+    def test_public_pages(self):
+        event = self.events[0]
+        self.assertBudget(2, 'get', reverse('events_list'))
+        self.assertBudget(3, 'get', reverse('events_list'), {'q': 'concert'})
+        self.assertBudget(3, 'get', reverse('event_detail', args=[event.pk]))
+
+    def test_participant_pages(self):
+        event, ticket_type = self.events[0], self.ticket_types[0]
+        self.assertBudget(5, 'get', reverse('event_detail', args=[event.pk]), user=self.buyer)
+        self.assertBudget(11, 'post', reverse('event_detail', args=[event.pk]),
+                          {'ticket_id': ticket_type.pk, 'quantity': 1})
+        self.assertBudget(3, 'get', reverse('my_tickets'))
+        self.assertBudget(3, 'get', reverse('my_reservations'))
+        self.assertBudget(15, 'post', reverse('my_reservations'), {'reservation_id': self.reservations[5].pk})
+        self.assertBudget(4, 'get', reverse('payment_page', args=[self.reservations[4].pk]))
+        self.assertBudget(2, 'get', reverse('payment_success'))
+        self.assertBudget(2, 'get', reverse('payment_cancel'))
+
+    def test_organizer_pages(self):
+        event = self.events[0]
+        self.assertBudget(4, 'get', reverse('my_events'), user=self.organizer)
+        self.assertBudget(2, 'get', reverse('create_event'))
+        self.assertBudget(4, 'get', reverse('edit_event', args=[event.pk]))
+        self.assertBudget(5, 'get', reverse('ticket_management', args=[event.pk]))
+        self.assertBudget(5, 'post', reverse('ticket_management', args=[event.pk]),
+                          {'reservation_id': self.reservations[0].pk, 'action': 'confirm'})
+        self.assertBudget(3, 'get', reverse('customize_event', args=[event.pk]))
+        self.assertBudget(5, 'get', reverse('sales_dashboard', args=[event.pk]))
+        self.assertBudget(5, 'post', reverse('customize_event', args=[event.pk]),
+                          {'theme_color': '#000000', 'banner_text': 'Vara', 'promo_message': 'Reduceri'})
+
+    def test_public_api(self):
+        event = self.events[0]
+        cities.reset_index()
+        self.addCleanup(cities.reset_index)
+        # Prima cerere încarcă indexul orașelor; următoarele răspund din memorie
+        self.assertBudget(1, 'get', reverse('city_autocomplete'), {'q': 'buc'})
+        self.assertBudget(0, 'get', reverse('city_autocomplete'), {'q': 'buc'})
+        self.assertBudget(2, 'get', reverse('event_availability', args=[event.pk]))
+        self.assertBudget(1, 'get', reverse('event_availability_stream', args=[event.pk]))
+        token = make_queue_token(event.pk, 1)
+        self.assertBudget(0, 'get', reverse('queue_status', args=[event.pk]), {'token': token})
+
+    @override_settings(PAYMENT_PROVIDER='events.payments.FakeProvider')
+    def test_payment_endpoints(self):
+        get_provider.cache_clear()
+        self.addCleanup(get_provider.cache_clear)
+        reservation = self.reservations[4]
+        url = reverse('create_payment_intent', args=[reservation.pk])
+        self.assertBudget(6, 'get', url, user=self.buyer)
+        self.assertBudget(5, 'get', url)
+        stripe = FakeStripe()
+        payload = json.dumps(stripe.payment_intent_event('payment_intent.succeeded', 'pi_budget'))
+        self.assertBudget(1, 'post', reverse('stripe_webhook'), payload,
+                          content_type='application/json', headers={'Stripe-Signature': stripe.sign(payload)})
+
+    @override_settings(TICKET_CHECKIN_FLUSH_SECONDS=0, TICKET_GATE_CACHE='gates')
+    def test_organizer_tools(self):
+        event = self.events[0]
+        gate_cache = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, gate_cache)
+        settings_override = override_settings(CACHES={**settings.CACHES, 'gates': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': gate_cache,
+        }})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_gates()
+        self.addCleanup(reset_gates)
+        self.assertBudget(2, 'get', reverse('import_events'), user=self.organizer)
+        self.assertBudget(10, 'post', reverse('import_events'), {
+            'file': SimpleUploadedFile('evenimente.csv', (
+                'event_ref,title,description,location,start_date,end_date,ticket_name,ticket_price,ticket_quantity\n'
+                'e1,Nou,Descriere,Cluj,2030-05-01T20:00,2030-05-01T23:00,General,50.00,100\n'
+            ).encode()),
+        })
+        self.assertBudget(3, 'get', reverse('export_reservations', args=[event.pk]))
+        self.assertBudget(5, 'get', reverse('checkin_manifest', args=[event.pk]))
+        codes = [code for reservation in self.reservations[:3] for code in reservation.ticket_codes]
+        # Poarta se încarcă la prima scanare (2 interogări); intrările se scriu în lot, mai târziu
+        reset_gates()
+        self.client.logout()
+        with assert_query_budget(2):
+            response = self.client.post(
+                reverse('check_in', args=[event.pk]), json.dumps({'codes': codes}), content_type='application/json',
+                headers={'Authorization': f'Gate {make_gate_token(event.pk)}'},
+            )
+        self.assertEqual({row['status'] for row in response.json()['results']}, {'ok'})
+
+    def test_every_events_url_has_a_budget(self):
+        # Un view nou din events/urls.py fără buget în această clasă face testul să eșueze
+        source = inspect.getsource(QueryBudgetTests)
+        missing = [pattern.name for pattern in events_urls.urlpatterns if f"reverse('{pattern.name}'" not in source]
+        self.assertEqual(missing, [])
+
+    @modify_settings(MIDDLEWARE={'append': 'ticket_platform.query_budget.QueryBudgetMiddleware'})
+    def test_middleware_reports_queries_and_duplicates(self):
+        response = self.client.get(reverse('events_list'))
+        self.assertEqual(response['X-DB-Query-Count'], '2')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+
+        # Un N+1 deliberat: câte o interogare pentru fiecare eveniment
+        with record_queries() as recorder:
+            for event in Event.objects.all():
+                list(event.ticket_types.all())
+        self.assertEqual(list(recorder.duplicates().values()), [3])
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer)
+        self.ticket_type = make_ticket_type(self.event, quantity=10)
+        self.url = reverse('event_detail', args=[self.event.pk])
+
+    def test_event_detail_fragments_skip_ticket_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, '>10</span> bilete disponibile')
+
+    def test_ticket_changes_and_reservations_invalidate(self):
+        self.client.get(self.url)
+        self.ticket_type.price = '75.00'
+        self.ticket_type.save()
+        self.assertContains(self.client.get(self.url), '75.00 RON')
+
+        reserve_tickets(self.buyer, self.ticket_type, 3)
+        self.assertContains(self.client.get(self.url), '>7</span> bilete disponibile')
+
+    def test_theme_change_invalidates_card(self):
+        self.client.get(self.url)
+        self.client.force_login(self.organizer)
+        self.client.post(reverse('customize_event', args=[self.event.pk]), {
+            'theme_color': '#ff0000', 'banner_text': 'Banner nou', 'promo_message': '',
+        })
+        self.client.logout()
+        self.assertContains(self.client.get(self.url), 'Banner nou')
+
+    def test_reserve_form_is_not_shared_between_users(self):
+        self.assertNotContains(self.client.get(self.url), 'name="ticket_id"')
+        self.client.force_login(self.buyer)
+        response = self.client.get(self.url)
+        self.assertContains(response, f'name="quantity_{self.ticket_type.pk}"')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+        response = self.client.post(self.url, {'ticket_id': self.ticket_type.pk, f'quantity_{self.ticket_type.pk}': 2})
+        self.assertRedirects(response, reverse('my_reservations'))
+        self.assertEqual(Reservation.objects.get().quantity, 2)
+
+    def test_listing_grid_is_cached_until_events_change(self):
+        listing = reverse('events_list')
+        self.client.get(listing)
+        with self.assertNumQueries(0):
+            self.client.get(listing)
+
+        make_event(self.organizer, title='Eveniment nou')
+        self.assertContains(self.client.get(listing), 'Eveniment nou')
+
+    def test_listing_key_ignores_unknown_params(self):
+        listing = reverse('events_list')
+        for i in range(PAGE_SIZE):
+            make_event(self.organizer, title=f'Eveniment {i}')
+        self.client.get(listing, {'when': 'month', 'utm_source': 'newsletter'})
+        with self.assertNumQueries(0):
+            response = self.client.get(listing, {'fbclid': 'abc', 'when': 'month', 'q': ''})
+        # Linkurile din grila din cache nu poartă parametrii primului vizitator
+        self.assertContains(response, '?when=month&amp;cursor=')
+        self.assertNotContains(response, 'utm_source')
+        self.assertNotEqual(
+            page_cache.listing_key(QueryDict('when=month')), page_cache.listing_key(QueryDict('when=month&city=1')),
+        )
+
+
+@override_settings(LIVE_AVAILABILITY_INTERVAL=0.01, LIVE_AVAILABILITY_KEEPALIVE=0.05)
+class LiveAvailabilityTests(TestCase):
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer)
+        self.ticket_type = make_ticket_type(self.event, quantity=10)
+        self.event.refresh_availability()
+        self.stream_url = reverse('event_availability_stream', args=[self.event.pk])
+
+    async def read_event(self, chunks):
+        # Sare peste `retry:` și keepalive-uri până la primul mesaj cu date
+        while True:
+            chunk = await asyncio.wait_for(anext(chunks), 2)
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode()
+            if chunk.startswith('event: availability'):
+                return json.loads(chunk.split('data: ', 1)[1])
+
+    def test_snapshot_counts_striped_stock(self):
+        striped = make_ticket_type(self.event, quantity=8, name='VIP')
+        set_stripe_count(striped, 4)
+        response = self.client.get(reverse('event_availability', args=[self.event.pk]))
+        self.assertEqual(response.json()['ticket_types'], {
+            str(self.ticket_type.pk): 10, str(striped.pk): 8,
+        })
+        self.assertEqual(self.client.get(reverse('event_availability', args=[999])).status_code, 404)
+
+    async def test_stream_pushes_stock_changes(self):
+        response = await self.async_client.get(self.stream_url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        try:
+            first = await self.read_event(chunks)
+            self.assertEqual(first['ticket_types'][str(self.ticket_type.pk)], 10)
+
+            await sync_to_async(reserve_tickets)(self.buyer, self.ticket_type, 4)
+            second = await self.read_event(chunks)
+            self.assertEqual(second['ticket_types'][str(self.ticket_type.pk)], 6)
+            self.assertEqual(second['tickets_available'], 6)
+        finally:
+            await chunks.aclose()
+
+    async def test_one_publisher_serves_all_clients(self):
+        streams = [stream_availability(self.event.pk) for _ in range(20)]
+        try:
+            results = [await self.read_event(chunks) for chunks in streams]
+            self.assertTrue(all(result == results[0] for result in results))
+            publisher = get_publisher(self.event.pk)
+            self.assertEqual(len(publisher.subscribers), 20)
+        finally:
+            for chunks in streams:
+                await chunks.aclose()
+        self.assertEqual(len(publisher.subscribers), 0)
+
+    async def test_idle_stream_sends_keepalive(self):
+        response = await self.async_client.get(self.stream_url)
+        chunks = aiter(response.streaming_content)
+        try:
+            await self.read_event(chunks)
+            chunk = await asyncio.wait_for(anext(chunks), 2)
+            self.assertIn(b': keepalive', chunk if isinstance(chunk, bytes) else chunk.encode())
+        finally:
+            await chunks.aclose()
+
+    @override_settings(LIVE_AVAILABILITY_STREAM_SECONDS=0.2)
+    async def test_stream_closes_after_its_lifetime(self):
+        response = await self.async_client.get(self.stream_url)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertTrue(chunks[0].startswith(b'retry:'))
+        publisher = get_publisher(self.event.pk)
+        self.assertEqual(publisher.subscribers, set())
+
+    async def test_event_page_opens_the_stream_only_under_asgi(self):
+        self.assertContains(await self.async_client.get(reverse('event_detail', args=[self.event.pk])), 'EventSource')
+        response = await sync_to_async(self.client.get)(reverse('event_detail', args=[self.event.pk]))
+        self.assertNotContains(response, 'EventSource')
+
+    async def test_stopped_publisher_restarts_instead_of_doubling(self):
+        publisher = get_publisher(self.event.pk)
+        first = publisher.subscribe()
+        publisher.task.cancel()
+        await asyncio.gather(publisher.task, return_exceptions=True)
+        # Clientul rămas ține publisher-ul înregistrat; următorul client îl repornește
+        self.assertIs(get_publisher(self.event.pk), publisher)
+        second = publisher.subscribe()
+        self.assertFalse(publisher.task.done())
+        publisher.unsubscribe(first)
+        publisher.unsubscribe(second)
+        await publisher.task
+        self.assertIsNot(get_publisher(self.event.pk), publisher)
+
+    async def test_unknown_event_stream_is_404(self):
+        response = await self.async_client.get(reverse('event_availability_stream', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncReadViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer, title='Festival')
+        self.ticket_type = make_ticket_type(self.event, quantity=10)
+        self.event.refresh_availability()
+        reservation = reserve_tickets(self.buyer, self.ticket_type, 2)
+        Reservation.objects.filter(pk=reservation.pk).update(confirmed=True)
+
+    def test_read_views_are_async(self):
+        for view in [views.events_list, views.event_detail, views.my_tickets, views.my_events]:
+            self.assertTrue(iscoroutinefunction(view), view)
+
+    async def test_pages_render_under_asgi_for_logged_in_users(self):
+        # Orice acces sincron la baza de date din șabloane ar ridica SynchronousOnlyOperation
+        await self.async_client.aforce_login(self.buyer)
+        response = await self.async_client.get(reverse('events_list'))
+        self.assertContains(response, 'Festival')
+        response = await self.async_client.get(reverse('events_list'), {'q': 'festival', 'format': 'json'})
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.event.pk])
+        response = await self.async_client.get(reverse('event_detail', args=[self.event.pk]))
+        self.assertContains(response, '>8</span> bilete disponibile')
+        # A doua oară lista de bilete vine din cache
+        response = await self.async_client.get(reverse('event_detail', args=[self.event.pk]))
+        self.assertContains(response, '>8</span> bilete disponibile')
+        response = await self.async_client.get(reverse('my_tickets'))
+        self.assertContains(response, 'Festival')
+
+        await self.async_client.aforce_login(self.organizer)
+        response = await self.async_client.get(reverse('my_events'))
+        self.assertContains(response, 'Festival')
+        response = await self.async_client.get(reverse('my_tickets'))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+    async def test_reservation_goes_through_the_sync_boundary(self):
+        await self.async_client.aforce_login(self.buyer)
+        response = await self.async_client.post(
+            reverse('event_detail', args=[self.event.pk]), {'ticket_id': self.ticket_type.pk, 'quantity': 3}
+        )
+        self.assertRedirects(response, reverse('my_reservations'), fetch_redirect_response=False)
+        ticket_type = await TicketType.objects.aget(pk=self.ticket_type.pk)
+        self.assertEqual(ticket_type.available_quantity, 5)
+
+        response = await self.async_client.post(
+            reverse('event_detail', args=[self.event.pk]), {'ticket_id': self.ticket_type.pk, 'quantity': 6}
+        )
+        self.assertRedirects(response, reverse('event_detail', args=[self.event.pk]), fetch_redirect_response=False)
+        self.assertEqual(await Reservation.objects.filter(user=self.buyer).acount(), 2)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    STOCK = 50
+    ATTEMPTS = 2000
+    WORKERS = 32
+    STRIPES = 1
+
+    def setUp(self):
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.ticket_type = make_ticket_type(make_event(self.organizer), quantity=self.STOCK)
+        if self.STRIPES > 1:
+            self.ticket_type = set_stripe_count(self.ticket_type, self.STRIPES)
+
+    def _buyer(self, barrier, attempts):
+        sold = 0
+        try:
+            barrier.wait()
+            for _ in range(attempts):
+                while True:
+                    try:
+                        reserve_tickets(self.buyer, self.ticket_type, 1)
+                        sold += 1
+                        break
+                    except SoldOut:
+                        break
+                    except OperationalError:
+                        # SQLite blochează scrierile concurente; cumpărătorul reîncearcă.
+                        time.sleep(0.001)
+            return sold
+        finally:
+            connection.close()
+
+    def test_no_oversell_under_contention(self):
+        barrier = threading.Barrier(self.WORKERS)
+        per_worker = self.ATTEMPTS // self.WORKERS
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            futures = [pool.submit(self._buyer, barrier, per_worker) for _ in range(self.WORKERS)]
+            sold = sum(f.result() for f in futures)
+
+        self.ticket_type.refresh_from_db()
+        reserved = sum(r.quantity for r in Reservation.objects.filter(ticket_type=self.ticket_type))
+        self.assertEqual(sold, self.STOCK)
+        self.assertEqual(reserved, self.STOCK)
+        self.assertEqual(self.ticket_type.stock, 0)
+
+
+class ConcurrentStripedReservationTests(ConcurrentReservationTests):
+    STRIPES = 8
+
+
+class LoadTestHarnessTests(TransactionTestCase):
+    def test_small_run_keeps_stock_invariants(self):
+        config = LoadTestConfig(participants=40, workers=4, events=1, ticket_types=2, stock=15, max_quantity=2)
+        output = Path(tempfile.mkdtemp()) / 'run.json'
+        self.addCleanup(shutil.rmtree, output.parent)
+        # Blocările SQLite din worker-ul de webhook-uri sunt reîncercate; nu le afișăm
+        with mock.patch('events.webhooks.logger'):
+            call_command('load_test', *[f'--{k.replace("_", "-")}={v}' for k, v in asdict(config).items()],
+                         output=str(output), stdout=io.StringIO())
+
+        result = json.loads(output.read_text())
+        outcomes = result['outcomes']
+        self.assertTrue(result['invariants']['ok'], result['invariants']['violations'])
+        self.assertEqual(sum(outcomes.values()), 40)
+        self.assertEqual(result['webhooks_processed'], outcomes['purchased'])
+        self.assertLessEqual(result['totals']['tickets'], 30)
+        self.assertEqual(set(result['steps']['reserve']), {
+            'count', 'errors', 'throughput', 'mean_ms', 'max_ms', 'p50_ms', 'p95_ms', 'p99_ms',
+        })
+        # Datele testului se șterg după rulare
+        self.assertFalse(Event.objects.exists())
+
+    def test_invariants_detect_lost_stock(self):
+        organizer = User.objects.create_user('org', is_organizer=True)
+        ticket_type = make_ticket_type(make_event(organizer), quantity=10)
+        reserve_tickets(User.objects.create_user('buyer', is_participant=True), ticket_type, 3)
+        self.assertEqual(check_invariants([ticket_type]), [])
+
+        TicketType.objects.filter(pk=ticket_type.pk).update(available_quantity=10)
+        self.assertEqual(len(check_invariants([ticket_type])), 1)
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 99), 4)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    DATABASE_ROUTERS=['ticket_platform.db_router.PrimaryReplicaRouter'],
+)
+@modify_settings(MIDDLEWARE={'prepend': 'ticket_platform.db_router.ReadYourWritesMiddleware'})
+class ReplicaRoutingTests(TransactionTestCase):
+    """Primara e baza de test, replica un fișier SQLite actualizat doar de replicate_sqlite()."""
+
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.mkdtemp()
+        # Conexiune creată dinamic (în afara DATABASES), ca izolarea testelor să n-o blocheze
+        connections.settings['replica'] = {**connections.settings['default'], 'NAME': f'{self.tmp}/replica.sqlite3'}
+        try:
+            connections['replica'] = connections.create_connection('replica')
+        finally:
+            del connections.settings['replica']
+        replicate_sqlite()
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer, title='Festival')
+        self.ticket_type = make_ticket_type(self.event, quantity=10)
+        self.event.refresh_availability()
+        self.client.force_login(self.buyer)
+        replicate_sqlite()
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections['replica']
+        shutil.rmtree(self.tmp)
+
+    def test_reads_use_replica_outside_transactions(self):
+        event = make_event(self.organizer, title='Nou')
+        self.assertFalse(Event.objects.filter(pk=event.pk).exists())
+        with transaction.atomic():
+            self.assertTrue(Event.objects.filter(pk=event.pk).exists())
+        with use_primary():
+            self.assertTrue(Event.objects.filter(pk=event.pk).exists())
+
+        replicate_sqlite()
+        self.assertTrue(Event.objects.filter(pk=event.pk).exists())
+
+    def test_client_reads_its_own_writes(self):
+        response = self.client.post(
+            reverse('event_detail', args=[self.event.pk]), {'ticket_id': self.ticket_type.pk, 'quantity': 2},
+        )
+        self.assertRedirects(response, reverse('my_reservations'), fetch_redirect_response=False)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(TicketType.objects.using('default').get(pk=self.ticket_type.pk).available_quantity, 8)
+
+        self.assertContains(self.client.get(reverse('my_reservations')), 'Categorie bilet: General')
+
+        # Fără cookie, citirile vin din replica rămasă în urmă
+        del self.client.cookies[PIN_COOKIE]
+        response = self.client.get(reverse('my_reservations'))
+        self.assertNotContains(response, 'Categorie bilet: General')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        replicate_sqlite()
+        self.assertContains(self.client.get(reverse('my_reservations')), 'Categorie bilet: General')
+
+    def test_reservation_checks_stock_on_primary(self):
+        # Replica încă arată 10 bilete; rezervarea trebuie să vadă stocul real de pe primară
+        TicketType.objects.filter(pk=self.ticket_type.pk).update(available_quantity=1)
+        self.client.post(
+            reverse('event_detail', args=[self.event.pk]), {'ticket_id': self.ticket_type.pk, 'quantity': 2},
+        )
+        self.assertFalse(Reservation.objects.using('default').exists())
+        self.assertEqual(TicketType.objects.using('default').get(pk=self.ticket_type.pk).available_quantity, 1)
+
+
+@override_settings(TICKET_CHECKIN_FLUSH_SECONDS=0)
+class CheckInTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Un cache comun tuturor proceselor, ca în producție (fișierele sunt văzute de toate)
+        gate_cache = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, gate_cache)
+        settings_override = override_settings(
+            CACHES={**settings.CACHES, 'gates': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': gate_cache,
+            }},
+            TICKET_GATE_CACHE='gates',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_gates()
+        self.addCleanup(reset_gates)
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+        self.buyer = User.objects.create_user('buyer', is_participant=True)
+        self.event = make_event(self.organizer, title='Festival')
+        self.ticket_type = make_ticket_type(self.event, quantity=100)
+        self.reservation = Reservation.objects.create(
+            user=self.buyer, ticket_type=self.ticket_type, quantity=2, confirmed=True,
+        )
+
+    def test_codes_are_signed_per_seat(self):
+        codes = self.reservation.ticket_codes
+        self.assertEqual(len(set(codes)), 2)
+        self.assertEqual(parse_code(codes[1]), (self.event.pk, self.reservation.pk, 2))
+        self.assertEqual(parse_code(codes[1].lower()), (self.event.pk, self.reservation.pk, 2))
+        # Alt loc cu aceeași semnătură
+        event_id, reservation_id, _, signature = codes[1].split('.')
+        self.assertIsNone(parse_code(f'{event_id}.{reservation_id}.3.{signature}'))
+        self.assertIsNone(parse_code('nu-e-un-cod'))
+
+    def test_each_seat_checks_in_once(self):
+        gate = get_gate(self.event.pk)
+        first, second = self.reservation.ticket_codes
+        self.assertEqual(
+            [row['status'] for row in gate.check_many([first, first, second], gate='A')], ['ok', 'used', 'ok'],
+        )
+        self.assertEqual(gate.flush(), 2)
+        self.assertEqual(set(CheckIn.objects.values_list('seat', 'gate')), {(1, 'A'), (2, 'A')})
+
+        # Alt proces încarcă intrările din baza de date
+        caches['gates'].clear()
+        self.assertEqual(Gate(self.event.pk).check(first), 'used')
+
+    def test_other_processes_see_check_ins_through_the_cache(self):
+        code = self.reservation.ticket_codes[0]
+        self.assertEqual(Gate(self.event.pk).check(code), 'ok')
+        self.assertEqual(Gate(self.event.pk).check(code), 'used')
+
+    @override_settings(TICKET_GATE_CACHE='default')
+    def test_process_local_cache_lets_the_database_decide(self):
+        code = self.reservation.ticket_codes[0]
+        first, second = Gate(self.event.pk), Gate(self.event.pk)
+        self.assertFalse(first.shared)
+        self.assertEqual(first.check(code, gate='A'), 'ok')
+        self.assertEqual(CheckIn.objects.get().gate, 'A')
+        # Celălalt proces are propriul LocMem: nu vede cheia, dar nici nu poate salva locul
+        cache.clear()
+        self.assertEqual(second.check(code, gate='B'), 'used')
+        self.assertEqual(first.flush() + second.flush(), 0)
+        self.assertEqual(CheckIn.objects.count(), 1)
+
+    def test_rejects_unknown_seats_and_other_events(self):
+        gate = get_gate(self.event.pk)
+        pending = Reservation.objects.create(user=self.buyer, ticket_type=self.ticket_type, quantity=1)
+        other = make_ticket_type(make_event(self.organizer, title='Altul'))
+        foreign = Reservation.objects.create(user=self.buyer, ticket_type=other, quantity=1, confirmed=True)
+        self.assertEqual(gate.check(pending.ticket_codes[0]), 'invalid')
+        self.assertEqual(gate.check(foreign.ticket_codes[0]), 'wrong_event')
+        code = self.reservation.ticket_codes[0]
+        self.assertEqual(gate.check(code[:-1] + ('A' if code[-1] != 'A' else 'B')), 'invalid')
+
+    def test_confirmed_after_gate_loaded(self):
+        gate = get_gate(self.event.pk)
+        late = Reservation.objects.create(user=self.buyer, ticket_type=self.ticket_type, quantity=1, confirmed=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(gate.check(late.ticket_codes[0]), 'ok')
+        with self.assertNumQueries(0):
+            self.assertEqual(gate.check(late.ticket_codes[0]), 'used')
+        self.assertIn([late.pk, 1], gate.manifest()['used'])
+
+    @override_settings(TICKET_CHECKIN_BATCH_SIZE=500)
+    def test_scans_are_answered_from_memory_and_saved_in_one_batch(self):
+        Reservation.objects.bulk_create(
+            Reservation(user=self.buyer, ticket_type=self.ticket_type, quantity=4, confirmed=True) for _ in range(100)
+        )
+        codes = [code for reservation in Reservation.objects.select_related('ticket_type') for code in reservation.ticket_codes]
+        self.assertEqual(len(codes), 402)
+        # 2 interogări la încărcare + INSERT-ul lotului (SQLite îl împarte în bucăți de ~250 de rânduri)
+        with assert_query_budget(4):
+            gate = get_gate(self.event.pk)
+            results = gate.check_many(codes)
+            gate.flush()
+        self.assertEqual({row['status'] for row in results}, {'ok'})
+        self.assertEqual(CheckIn.objects.count(), 402)
+
+    def test_scanner_api(self):
+        self.client.force_login(self.organizer)
+        manifest = self.client.get(reverse('checkin_manifest', args=[self.event.pk])).json()
+        self.assertEqual(manifest['valid'], [[self.reservation.pk, 2]])
+        self.assertEqual(manifest['used'], [])
+
+        url = reverse('check_in', args=[self.event.pk])
+        code = self.reservation.ticket_codes[0]
+        body = json.dumps({'codes': [code, code], 'gate': 'Nord'})
+        self.client.logout()
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        other = make_event(self.organizer, title='Altul')
+        response = self.client.post(
+            reverse('check_in', args=[other.pk]), body, content_type='application/json',
+            headers={'Authorization': f"Gate {manifest['token']}"},
+        )
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post(
+            url, body, content_type='application/json', headers={'Authorization': f"Gate {manifest['token']}"},
+        )
+        self.assertEqual([row['status'] for row in response.json()['results']], ['ok', 'used'])
+        response = self.client.post(
+            url, '{"codes": "x"}', content_type='application/json',
+            headers={'Authorization': f"Gate {manifest['token']}"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_manifest_key_verifies_but_cannot_sign(self):
+        self.client.force_login(self.organizer)
+        manifest = self.client.get(reverse('checkin_manifest', args=[self.event.pk])).json()
+        self.assertEqual(manifest['algorithm'], 'Ed25519')
+        public_key = Ed25519PublicKey.from_public_bytes(base64.b64decode(manifest['key']))
+        code = self.reservation.ticket_codes[0]
+        self.assertEqual(parse_code(code, public_key), (self.event.pk, self.reservation.pk, 1))
+        # Cheia publică nu ajută la emiterea unui bilet pentru alt loc
+        self.assertIsNone(parse_code(code.replace(f'.{self.reservation.pk}.1.', f'.{self.reservation.pk}.3.')))
+        seed = signing_key(self.event.pk).private_bytes_raw()
+        self.assertNotIn(base64.b64encode(seed).decode(), json.dumps(manifest))
+
+    def test_my_tickets_shows_codes(self):
+        self.client.force_login(self.buyer)
+        response = self.client.get(reverse('my_tickets'))
+        for code in self.reservation.ticket_codes:
+            self.assertContains(response, f'data-code="{code}"')
+
+
+class EventFacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        organizer = User.objects.create_user('org', is_organizer=True)
+        now = timezone.now()
+        self.cheap = make_event(organizer, title='Ieftin', location='Cluj', start_date=now + timedelta(days=3))
+        make_ticket_type(self.cheap, price='20.00')
+        self.sold_out = make_event(organizer, title='Epuizat', location='Cluj', start_date=now + timedelta(days=45))
+        make_ticket_type(self.sold_out, quantity=0, price='80.00')
+        self.vip = make_event(organizer, title='VIP', location='București', start_date=now + timedelta(days=10))
+        make_ticket_type(self.vip, price='250.00')
+        self.past = make_event(organizer, title='Trecut', location='Iași', start_date=now - timedelta(days=2))
+        make_ticket_type(self.past, price='60.00')
+        for event in Event.objects.all():
+            event.refresh_availability()
+        self.cluj, self.bucharest, self.iasi = (str(e.city_id) for e in (self.cheap, self.vip, self.past))
+
+    def facets(self, response):
+        return {
+            group['name']: {option['value']: option['count'] for option in group['options']}
+            for group in response.context['facet_groups']
+        }
+
+    def test_counts_for_every_facet_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            result = facet_counts(Event.objects.all(), facet_selection(QueryDict()))
+        self.assertEqual(result['city'], {self.cluj: 2, self.bucharest: 1, self.iasi: 1})
+        self.assertEqual(result['city_names'][self.iasi], 'Iași')
+        self.assertEqual(result['when'], {'week': 1, 'month': 1, 'later': 1, 'past': 1})
+        self.assertEqual(result['price'], {'0-50': 1, '50-100': 2, '200-': 1})
+        self.assertEqual(result['available'], {'1': 3, '0': 1})
+
+    def test_selected_facet_keeps_its_other_options(self):
+        response = self.client.get(reverse('events_list'), {'city': self.cluj})
+        self.assertEqual({e.title for e in response.context['events']}, {'Ieftin', 'Epuizat'})
+        counts = self.facets(response)
+        # Celelalte orașe rămân vizibile, cu numărul lor; restul fațetelor se limitează la Cluj
+        self.assertEqual(counts['city'], {self.cluj: 2, self.bucharest: 1, self.iasi: 1})
+        self.assertEqual(counts['price'], {'0-50': 1, '50-100': 1, '100-200': 0, '200-': 0})
+        self.assertEqual(counts['available'], {'1': 1, '0': 1})
+
+        response = self.client.get(reverse('events_list'), {'city': [self.cluj, self.iasi], 'available': '1'})
+        self.assertEqual({e.title for e in response.context['events']}, {'Ieftin', 'Trecut'})
+        response = self.client.get(reverse('events_list'), {'when': 'week', 'price': '0-50'})
+        self.assertEqual([e.title for e in response.context['events']], ['Ieftin'])
+
+    def test_option_links_toggle_the_value(self):
+        response = self.client.get(reverse('events_list'), {'city': self.cluj, 'cursor': 'x'})
+        city = next(group for group in response.context['facet_groups'] if group['name'] == 'city')
+        self.assertEqual([option['label'] for option in city['options']], ['Cluj', 'București', 'Iași'])
+        urls = {option['value']: option['url'] for option in city['options']}
+        self.assertEqual(urls[self.cluj], '?')
+        self.assertEqual(QueryDict(urls[self.iasi][1:]).getlist('city'), [self.cluj, self.iasi])
+
+    def test_selected_city_outside_the_results_keeps_its_name(self):
+        cities.reset_index()
+        response = self.client.get(reverse('events_list'), {'max_price': '1', 'city': self.iasi})
+        city = next(group for group in response.context['facet_groups'] if group['name'] == 'city')
+        self.assertEqual([(o['label'], o['count'], o['selected']) for o in city['options']], [('Iași', 0, True)])
+
+        response = self.client.get(reverse('events_list'), {'city': '999999'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['events']), [])
+
+    def test_counts_are_cached_per_filter_combination(self):
+        self.client.get(reverse('events_list'), {'city': self.cluj})
+        # Altă sortare: grila se recalculează, numărătorile vin din cache
+        with self.assertNumQueries(1):
+            self.client.get(reverse('events_list'), {'city': self.cluj, 'sort': 'price'})
+        with self.assertNumQueries(2):
+            self.client.get(reverse('events_list'), {'city': self.bucharest})
+
+
+class CityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cities.reset_index()
+        self.organizer = User.objects.create_user('org', is_organizer=True)
+
+    def test_spellings_of_a_city_share_one_row(self):
+        self.assertEqual(cities.normalize(' Cluj-Napoca '), 'cluj napoca')
+        self.assertEqual(cities.normalize('Braşov'), cities.normalize('BRAȘOV'))
+        first = make_event(self.organizer, location='Sala Palatului, București')
+        second = make_event(self.organizer, location='bucuresti')
+        third = make_event(self.organizer, location='Arenele Romane,  BUCUREȘTI ')
+        self.assertEqual(City.objects.get().name, 'București')
+        self.assertEqual({first.city_id, second.city_id, third.city_id}, {City.objects.get().pk})
+
+        # Salvarea fără schimbarea locației nu mai caută orașul
+        first.refresh_from_db()
+        with CaptureQueriesContext(connection) as queries:
+            first.save()
+        self.assertFalse([q for q in queries if 'events_city' in q['sql']])
+        first.location = 'Iași'
+        first.save()
+        self.assertEqual(first.city.name, 'Iași')
+
+    def test_import_assigns_cities_in_bulk(self):
+        rows = ''.join(
+            f'e{i},Festival {i},Descriere,{location},2030-07-01T18:00,2030-07-01T23:00,Normal,50,10\n'
+            for i, location in enumerate(['Sibiu', '"Piața Mare, SIBIU"', 'Cluj-Napoca'])
+        )
+        import_events(self.organizer, EventImportTests.HEADER + rows)
+        self.assertEqual(
+            sorted(Event.objects.values_list('title', 'city__name')),
+            [('Festival 0', 'Sibiu'), ('Festival 1', 'Sibiu'), ('Festival 2', 'Cluj-Napoca')],
+        )
+
+    def test_backfill_prefers_the_common_spelling(self):
+        for location in ['Brasov', 'Teatrul Sică Alexandrescu, Brașov', 'BRAȘOV', 'brașov', 'Iasi', 'Iași']:
+            make_event(self.organizer, location=location)
+        Event.objects.update(city=None)
+        City.objects.all().delete()
+
+        migration = import_module('events.migrations.0014_city')
+        migration.backfill_cities(django_apps, None)
+        self.assertEqual(sorted(City.objects.values_list('name', flat=True)), ['Brașov', 'Iași'])
+        self.assertFalse(Event.objects.filter(city=None).exists())
+
+    def test_autocomplete_matches_any_word_and_ranks_by_events(self):
+        for location in ['Cluj-Napoca', 'Cluj-Napoca', 'Clejani', 'Constanța', 'Baia Mare']:
+            make_event(self.organizer, location=location)
+        url = reverse('city_autocomplete')
+
+        def names(query, **params):
+            response = self.client.get(url, {'q': query, **params})
+            return [(city['name'], city['events']) for city in response.json()['results']]
+
+        self.assertEqual(names('c'), [('Cluj-Napoca', 2), ('Clejani', 1), ('Constanța', 1)])
+        self.assertEqual(names('cl', limit=1), [('Cluj-Napoca', 2)])
+        self.assertEqual(names('NAPO'), [('Cluj-Napoca', 2)])
+        self.assertEqual(names('constanta'), [('Constanța', 1)])
+        self.assertEqual(names('mare'), [('Baia Mare', 1)])
+        self.assertEqual(names('x'), [])
+        self.assertEqual(names(''), [])
+
+        # Indexul e în memorie: cererile următoare nu ating baza de date
+        with self.assertNumQueries(0):
+            self.client.get(url, {'q': 'clu'})
+
+    def test_index_reloads_after_a_change(self):
+        make_event(self.organizer, location='Sibiu')
+        self.assertEqual(len(cities.get_index()), 1)
+        make_event(self.organizer, location='Sighișoara')
+        self.assertEqual([name for _, name, _ in cities.get_index().search('si')], ['Sibiu', 'Sighișoara'])
+        Event.objects.filter(location='Sibiu').delete()
+        self.assertEqual([events for _, _, events in cities.get_index().search('si')], [1, 0])
+
+    def test_index_version_moves_only_when_a_city_changes(self):
+        event = make_event(self.organizer, location='Sibiu')
+        version = cities.get_index().version
+
+        event.title = 'Alt titlu'
+        event.save()
+        Event.objects.get(pk=event.pk).save()
+        make_event(self.organizer, location='Piața Mare, Sibiu')
+        self.assertEqual(cache.get(cities.INDEX_VERSION_KEY), version + 1)
+
+        event.location = 'Brașov'
+        event.save()
+        self.assertEqual(cache.get(cities.INDEX_VERSION_KEY), version + 3)
+
+    def test_search_stays_under_a_millisecond(self):
+        rng = random.Random(0)
+        syllables = ['ba', 'cu', 're', 'sti', 'cluj', 'na', 'po', 'ca', 'ia', 'si', 'bra', 'sov', 'mi', 'ha', 'i']
+        rows = [
+            (pk, name, cities.normalize(name), rng.randint(0, 50))
+            for pk, name in enumerate(
+                (' '.join(''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(rng.randint(1, 2)))
+                 for _ in range(20000)),
+                start=1,
+            )
+        ]
+        index = cities.CityIndex(rows, version=1)
+        queries = [name[:length] for _, name, _, _ in rows[:500] for length in (1, 3, 5)]
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query)
+        self.assertLess((time.perf_counter() - start) / len(queries), 0.001)
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .importer import validate_ticket
+from .models import InventoryStripe, Reservation, TicketType
+
+# ✏️ Editarea tipurilor de bilete ale unui eveniment: toate rândurile se citesc
+# într-o singură interogare, se compară cu formularul și doar diferențele se scriu
+# (bulk_update / bulk_create / delete), deci numărul de interogări nu depinde de
+# numărul de bilete. Apelantul rulează totul într-o tranzacție.
+
+
+class TicketEditError(Exception):
+    """Modificările trimise nu pot fi aplicate; nimic nu a fost scris."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+@dataclass
+class TicketChanges:
+    updated: int = 0
+    created: int = 0
+    deleted: int = 0
+
+
+def with_sold(ticket_types):
+    """Adaugă `sold`: biletele ținute de rezervări (plătite sau nu), deci scoase din stoc."""
+    reserved = (
+        Reservation.objects.filter(ticket_type=OuterRef('pk'))
+        .order_by().values('ticket_type').annotate(total=Sum('quantity')).values('total')
+    )
+    return ticket_types.annotate(sold=Coalesce(Subquery(reserved), Value(0), output_field=IntegerField()))
+
+
+def parse_submission(data):
+    """Rândurile trimise din formular: (id sau None pentru un tip nou, câmpuri validate)."""
+    rows, errors = [], []
+    submitted = zip(
+        data.getlist('ticket_id'), data.getlist('ticket_name'),
+        data.getlist('ticket_price'), data.getlist('ticket_quantity'),
+    )
+    for line, (ticket_id, name, price, quantity) in enumerate(submitted, start=1):
+        if not ticket_id and not (name or price or quantity):
+            # Rând nou lăsat gol
+            continue
+        ticket = validate_ticket(line, {'name': name, 'price': price, 'quantity': quantity}, errors)
+        if ticket is not None:
+            rows.append((int(ticket_id) if ticket_id.isdigit() else None, ticket))
+    deleted = {int(value) for value in data.getlist('delete_ticket') if value.isdigit()}
+    return rows, deleted, errors
+
+
+def apply_changes(event, rows, deleted=()):
+    """Aplică diferențele față de tipurile de bilete existente ale evenimentului.
+
+    Stocul disponibil se recalculează din biletele deja vândute: total nou - vândute.
+    Un total sub numărul de bilete vândute sau ștergerea unui tip cu vânzări ridică
+    TicketEditError.
+    """
+    tickets = TicketType.objects.filter(event=event)
+    existing = {ticket.pk: ticket for ticket in tickets.select_for_update()}
+    striped = [ticket.pk for ticket in existing.values() if ticket.is_striped]
+    if striped:
+        # Rezervările pe benzi blochează doar banda, nu rândul TicketType
+        list(
+            InventoryStripe.objects.filter(ticket_type_id__in=striped)
+            .order_by('ticket_type_id', 'index').select_for_update().values_list('pk', flat=True)
+        )
+    # Vânzările se numără abia după blocări, într-o interogare nouă: rezervările care
+    # așteptau după rânduri s-au încheiat, iar PostgreSQL (READ COMMITTED) le vede.
+    for ticket_id, sold in with_sold(tickets).values_list('pk', 'sold'):
+        existing[ticket_id].sold = sold
+    errors, changed, created, resized_stripes = [], [], [], []
+
+    for ticket_id, data in rows:
+        if ticket_id is None:
+            created.append(TicketType(
+                event=event, name=data['name'], price=data['price'],
+                total_quantity=data['quantity'], available_quantity=data['quantity'],
+            ))
+            continue
+        ticket = existing.get(ticket_id)
+        if ticket is None or ticket_id in deleted:
+            continue
+        if data['quantity'] < ticket.sold:
+            errors.append(
+                f"{ticket.name}: s-au vândut deja {ticket.sold} bilete, totalul nu poate fi {data['quantity']}."
+            )
+            continue
+        if (ticket.name, ticket.price, ticket.total_quantity) == (data['name'], data['price'], data['quantity']):
+            continue
+        if ticket.total_quantity != data['quantity']:
+            # La tipurile cu benzi tot stocul rămas ajunge în rezerva comună,
+            # iar următoarea reechilibrare îl redistribuie pe benzi.
+            ticket.available_quantity = data['quantity'] - ticket.sold
+            if ticket.is_striped:
+                resized_stripes.append(ticket.pk)
+        ticket.name, ticket.price, ticket.total_quantity = data['name'], data['price'], data['quantity']
+        changed.append(ticket)
+
+    removed = [existing[ticket_id] for ticket_id in deleted if ticket_id in existing]
+    for ticket in removed:
+        if ticket.sold:
+            errors.append(f"{ticket.name} are bilete vândute și nu poate fi șters.")
+
+    if errors:
+        raise TicketEditError(errors)
+
+    if changed:
+        TicketType.objects.bulk_update(changed, ['name', 'price', 'total_quantity', 'available_quantity'])
+    if resized_stripes:
+        InventoryStripe.objects.filter(ticket_type_id__in=resized_stripes).update(available_quantity=0)
+    if created:
+        TicketType.objects.bulk_create(created)
+    if removed:
+        TicketType.objects.filter(pk__in=[ticket.pk for ticket in removed]).delete()
+
+    return TicketChanges(updated=len(changed), created=len(created), deleted=len(removed))
@@ -5,9 +5,13 @@ urlpatterns = [
 
     # 🎟️ Listă completă de evenimente
     path('list/', views.events_list, name='events_list'),
+    path('cities/', views.city_autocomplete, name='city_autocomplete'),
 
     # 📅 Detalii pentru un eveniment
     path('<int:pk>/', views.event_detail, name='event_detail'),
+    path('<int:pk>/queue/', views.queue_status, name='queue_status'),
+    path('<int:pk>/availability/', views.availability, name='event_availability'),
+    path('<int:pk>/availability/stream/', views.availability_stream, name='event_availability_stream'),
 
     # 👤 Paginile participantului
     path('my-tickets/', views.my_tickets, name='my_tickets'),
@@ -15,9 +19,14 @@ urlpatterns = [
 
     # 🧑‍💼 Paginile organizatorului
     path('create/', views.create_event, name='create_event'),
+    path('import/', views.import_events, name='import_events'),
     path('edit/<int:event_id>/', views.edit_event, name='edit_event'),
     path('<int:event_id>/tickets/', views.ticket_management, name='ticket_management'),
+    path('<int:event_id>/tickets/export/', views.export_reservations, name='export_reservations'),
     path('<int:event_id>/customize/', views.customize_event, name='customize_event'),
+    path('<int:event_id>/sales/', views.sales_dashboard, name='sales_dashboard'),
+    path('<int:event_id>/checkin/', views.check_in, name='check_in'),
+    path('<int:event_id>/checkin/manifest/', views.checkin_manifest, name='checkin_manifest'),
 path('my-events/', views.my_events, name='my_events'),
 path('payment/<int:reservation_id>/', views.payment_page, name='payment_page'),
 path('payment/create-intent/<int:reservation_id>/', views.create_payment_intent, name='create_payment_intent'),
@@ -1,89 +1,332 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.core.cache.utils import make_template_fragment_key
+from django.core.handlers.asgi import ASGIRequest
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
-from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
 from .models import Event, TicketType, Reservation, Payment
+from .pagination import InvalidCursor, apaginate_keyset, paginate_keyset
+from .reservations import (
+    SoldOut, bulk_cancel, bulk_confirm, bulk_release, reserve_tickets, release_reservation,
+)
+from .search import search_events
+from . import (
+    analytics, checkin, cities, exports, facets, images, importer, live, page_cache, payments, ticket_editor, waiting_room, webhooks,
+)
+
+# 📄 Pagina curentă pentru parametrul ?cursor= (un cursor invalid duce la prima pagină)
+def _keyset_page(request, queryset, keys):
+    try:
+        return paginate_keyset(queryset, keys, request.GET.get('cursor'))
+    except InvalidCursor:
+        return paginate_keyset(queryset, keys)
+
+
+async def _akeyset_page(request, queryset, keys):
+    try:
+        return await apaginate_keyset(queryset, keys, request.GET.get('cursor'))
+    except InvalidCursor:
+        return await apaginate_keyset(queryset, keys)
 
-# 🎟️ Listă completă de evenimente
-def events_list(request):
-    query = request.GET.get('q', '')
-    date = request.GET.get('date', '')
 
-    events = Event.objects.all()
+# ⚡ Vederile asincrone încarcă utilizatorul (și, odată cu el, sesiunea) înainte de
+# randare, ca procesoarele de context din șabloane să nu mai interogheze baza de date.
+async def _aload_user(request):
+    request.user = await request.auser()
+    return request.user
 
-    # Căutare text
-    if query:
-        events = events.filter(Q(title__icontains=query) | Q(location__icontains=query))
+
+# 🗓️ Începutul zilei în fusul orar curent; filtrele pe dată folosesc intervale [început, sfârșit)
+# direct pe coloana start_date, ca indexul să poată fi folosit.
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# Data din URL; una greșită sau imposibilă (ex. 2026-02-30) înseamnă fără filtru
+def _parse_day(value):
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
+# 🎟️ Evenimentele pentru filtrele din URL, fără fațete: baza comună pentru listă și
+# pentru numărătorile fațetelor. Doar construiește interogarea (căutarea full-text e un
+# JOIN cu indexul), deci poate fi apelată și din vederile asincrone.
+def _filtered_events(filters):
+    events = Event.objects.select_related('image_asset')
 
     # Filtrare după dată (dacă a fost selectată)
-    if date:
-        events = events.filter(start_date__date=date)
+    day = _parse_day(filters['date'])
+    if day:
+        events = events.filter(start_date__gte=_day_start(day),
+                               start_date__lt=_day_start(day + timedelta(days=1)))
+
+    # Interval de date și doar evenimente viitoare
+    first_day = _parse_day(filters['date_from'])
+    last_day = _parse_day(filters['date_to'])
+    if first_day:
+        events = events.filter(start_date__gte=_day_start(first_day))
+    if last_day:
+        events = events.filter(start_date__lt=_day_start(last_day + timedelta(days=1)))
+    if filters['upcoming']:
+        events = events.filter(start_date__gte=timezone.now())
+
+    # Preț maxim (câmp denormalizat pe Event)
+    if filters['max_price']:
+        events = events.filter(min_price__lte=Decimal(filters['max_price']))
+
+    # Căutare text (index full-text, rezultate ordonate după relevanță)
+    if filters['query']:
+        events = search_events(events, filters['query'])
+    return events
+
+
+# 🎟️ Fațetele alese și sortarea; întoarce și cheile după care se paginează
+def _events_queryset(events, filters):
+    events = facets.apply(events, filters['facets'])
+    sort = filters['sort']
+    if sort == 'price':
+        keys = ['min_price', 'id']
+        events = events.filter(min_price__isnull=False)
+    elif sort == 'availability':
+        keys = ['-tickets_available', 'id']
+    elif filters['query']:
+        keys = ['search_rank', 'id']
+    else:
+        keys = ['start_date', 'id']
+    return events, keys
+
+
+async def _aevents_page(request, events, filters):
+    events, keys = _events_queryset(events, filters)
+    return await _akeyset_page(request, events, keys)
+
 
-    events = events.order_by('start_date')
+# 🎟️ Listă completă de evenimente
+async def events_list(request):
+    filters = {
+        'query': request.GET.get('q', ''),
+        'date': request.GET.get('date', ''),
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+        'upcoming': request.GET.get('upcoming') == '1',
+        'sort': request.GET.get('sort', ''),
+        'max_price': request.GET.get('max_price', ''),
+        'facets': facets.selection(request.GET),
+    }
+    try:
+        Decimal(filters['max_price'] or 0)
+    except InvalidOperation:
+        filters['max_price'] = ''
+
+    # Varianta JSON pentru încărcarea continuă (infinite scroll)
+    if request.GET.get('format') == 'json':
+        page = await _aevents_page(request, _filtered_events(filters), filters)
+        return JsonResponse({
+            'results': [{
+                'id': event.id,
+                'title': event.title,
+                'location': event.location,
+                'start_date': event.start_date.isoformat(),
+                'image': event.image.url if event.image else None,
+                'min_price': str(event.min_price) if event.min_price is not None else None,
+                'tickets_available': event.tickets_available,
+                'sold_out': event.is_sold_out,
+                'url': reverse('event_detail', args=[event.id]),
+            } for event in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+    # Grila de evenimente și numărătorile fațetelor sunt la fel pentru toți vizitatorii
+    # cu aceleași filtre: le luăm din cache și interogăm baza de date doar pentru ce lipsește.
+    await _aload_user(request)
+    cache = page_cache.get_cache()
+    grid_key, facets_key = await page_cache.alisting_key(request.GET), await page_cache.afacets_key(request.GET)
+    cached = await cache.aget_many([grid_key, facets_key])
+    grid, facet_counts = cached.get(grid_key), cached.get(facets_key)
+    if grid is None or facet_counts is None:
+        events = _filtered_events(filters)
+        if grid is None:
+            page = await _aevents_page(request, events, filters)
+            # Grila e comună: linkurile de paginare păstrează doar parametrii din cheie
+            grid = render_to_string('events/events_grid.html', {
+                'events': page, 'page': page, 'page_query': page_cache.listing_params(request.GET),
+            }, request)
+            await cache.aset(grid_key, grid, page_cache.cache_timeout())
+        if facet_counts is None:
+            facet_counts = await facets.acounts(events, filters['facets'])
+            await cache.aset(facets_key, facet_counts, page_cache.facets_timeout())
 
     return render(request, 'events/events_list.html', {
-        'events': events,
-        'query': query,
-        'date': date
+        'grid': mark_safe(grid),
+        'facet_groups': facets.groups(facet_counts, filters['facets'], request.GET),
+        **filters,
+    })
+
+
+# 🏙️ Autocompletare pentru oraș, din indexul în memorie (fără interogări cât timp e la zi)
+def city_autocomplete(request):
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    results = cities.get_index().search(request.GET.get('q', ''), limit=limit)
+    return JsonResponse({
+        'results': [{'id': pk, 'name': name, 'events': events} for pk, name, events in results],
     })
 
 
+# 🚦 Locul participantului în coada virtuală (None dacă evenimentul nu are coadă)
+def _waiting_room_status(request, event):
+    if not event.admission_rate or not getattr(request.user, "is_participant", False):
+        return None
+
+    backend = waiting_room.get_backend()
+    session_key = f"waiting_room_{event.pk}"
+    token = request.session.get(session_key, "")
+    seq = waiting_room.read_token(token, event.pk)
+    if seq is None:
+        seq = backend.join(event.pk, event.admission_rate)
+        token = waiting_room.make_token(event.pk, seq)
+        request.session[session_key] = token
+
+    status = backend.status(event.pk, seq)
+    status["token"] = token
+    return status
+
+
 # 📅 Detalii pentru un eveniment
-def event_detail(request, pk):
+async def event_detail(request, pk):
+    # 🔹 Rezervarea scrie în baza de date: rulează sincron, în tranzacția din reserve_tickets
+    if request.method == "POST":
+        return await sync_to_async(_reserve)(request, pk)
+
+    user = await _aload_user(request)
+    event = await aget_object_or_404(Event.objects.select_related('image_asset'), pk=pk)
+    queue = await sync_to_async(_waiting_room_status)(request, event) if event.admission_rate else None
+    in_queue = bool(queue and not queue["admitted"])
+    can_reserve = getattr(user, "is_participant", False) and not in_queue
+    version = await page_cache.aevent_version(event.pk)
+
+    # 🔹 Cardul evenimentului și lista de bilete vin din cache; tipurile de bilete
+    # se încarcă doar dacă fragmentul lor lipsește
+    cache = page_cache.get_cache()
+    tickets_fragment = await cache.aget(
+        make_template_fragment_key('event_tickets', [event.pk, version, can_reserve, in_queue])
+    )
+    tickets = []
+    if tickets_fragment is None:
+        tickets = [ticket async for ticket in event.ticket_types.prefetch_related("stripes")]
+
+    return render(request, "events/event_detail.html", {
+        "event": event,
+        "tickets": tickets,
+        "tickets_fragment": mark_safe(tickets_fragment) if tickets_fragment is not None else None,
+        "queue": queue,
+        "in_queue": in_queue,
+        "can_reserve": can_reserve,
+        "version": version,
+        # Fluxul în timp real ține o conexiune deschisă: doar sub ASGI, unde nu ocupă un fir
+        "live_updates": isinstance(request, ASGIRequest),
+        "cache_alias": page_cache.cache_alias(),
+        "cache_timeout": page_cache.cache_timeout(),
+    })
+
+
+def _reserve(request, pk):
     event = get_object_or_404(Event, pk=pk)
+    queue = _waiting_room_status(request, event)
+    in_queue = bool(queue and not queue["admitted"])
+
+    if not request.user.is_authenticated:
+        messages.error(request, "Trebuie să fii autentificat pentru a rezerva bilete.")
+        return redirect("login")
+
+    if not getattr(request.user, "is_participant", False):
+        messages.error(request, "Doar participanții pot rezerva bilete.")
+        return redirect("events_list")
+
+    if in_queue:
+        messages.error(request, "Ești încă în coada de așteptare. Te rugăm să mai aștepți.")
+        return redirect("event_detail", pk=event.pk)
+
+    ticket_id = request.POST.get("ticket_id")
+    try:
+        quantity = int(request.POST.get(f"quantity_{ticket_id}", request.POST.get("quantity", 1)))
+    except ValueError:
+        quantity = 0
+
+    if quantity < 1:
+        messages.error(request, "Cantitate invalidă.")
+        return redirect("event_detail", pk=event.pk)
+
+    ticket_type = get_object_or_404(TicketType, id=ticket_id, event=event)
+
+    # 🔹 Rezervare atomică (verificarea stocului și scăderea într-un singur UPDATE)
+    try:
+        reserve_tickets(request.user, ticket_type, quantity)
+    except SoldOut:
+        messages.error(request, "Nu sunt suficiente bilete disponibile.")
+        return redirect("event_detail", pk=event.pk)
+
+    messages.success(request, f"Ai rezervat {quantity} bilet(e) la {event.title}!")
+    return redirect("my_reservations")
 
-    # 🔹 Când utilizatorul trimite formularul de rezervare
-    if request.method == "POST":
-        if not request.user.is_authenticated:
-            messages.error(request, "Trebuie să fii autentificat pentru a rezerva bilete.")
-            return redirect("login")
-
-        if not getattr(request.user, "is_participant", False):
-            messages.error(request, "Doar participanții pot rezerva bilete.")
-            return redirect("events_list")
-
-        ticket_id = request.POST.get("ticket_id")
-        quantity = int(request.POST.get("quantity", 1))
-
-        ticket_type = get_object_or_404(TicketType, id=ticket_id, event=event)
-
-        # 🔹 Verificare stoc disponibil
-        if quantity > ticket_type.available_quantity:
-            messages.error(request, "Nu sunt suficiente bilete disponibile.")
-            return redirect("event_detail", pk=event.pk)
-
-        # 🔹 Creăm rezervarea
-        Reservation.objects.create(
-            user=request.user,
-            ticket_type=ticket_type,
-            quantity=quantity,
-            confirmed=False
-        )
 
-        # 🔹 Scădem biletele rezervate
-        ticket_type.available_quantity -= quantity
-        ticket_type.save()
+# 🚦 Poziția în coadă (fără interogări în baza de date)
+def queue_status(request, pk):
+    seq = waiting_room.read_token(request.GET.get("token", ""), pk)
+    if seq is None:
+        return JsonResponse({"error": "Token invalid."}, status=400)
+    return JsonResponse(waiting_room.get_backend().status(pk, seq))
 
-        messages.success(request, f"Ai rezervat {quantity} bilet(e) la {event.title}!")
-        return redirect("my_reservations")
 
-    # 🔹 Returnăm pagina normal
-    return render(request, "events/event_detail.html", {"event": event})
+# 📡 Stocul curent al unui eveniment, ca JSON
+def availability(request, pk):
+    snapshot = live.availability_snapshot(pk)
+    if snapshot is None:
+        raise Http404
+    return JsonResponse(snapshot)
 
 
+# 📡 Stocul în timp real (server-sent events); are nevoie de serverul ASGI
+async def availability_stream(request, pk):
+    if not await Event.objects.filter(pk=pk).aexists():
+        raise Http404
+    response = StreamingHttpResponse(live.stream_availability(pk), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
 
 # 👤 Biletele utilizatorului (participant)
 @login_required
-def my_tickets(request):
-    if not getattr(request.user, 'is_participant', False):
+async def my_tickets(request):
+    user = await _aload_user(request)
+    if not getattr(user, 'is_participant', False):
         messages.error(request, "Doar participanții pot accesa biletele.")
         return redirect('home')
 
-    tickets = Reservation.objects.filter(user=request.user, confirmed=True).select_related('ticket_type__event')
-    return render(request, 'events/my_tickets.html', {'tickets': tickets})
+    tickets = Reservation.objects.filter(user=user, confirmed=True).select_related('ticket_type__event__image_asset')
+    page = await _akeyset_page(request, tickets, ['-created_at', '-id'])
+    return render(request, 'events/my_tickets.html', {'tickets': page, 'page': page})
 
 
 # 📦 Rezervările utilizatorului (participant)
@@ -93,25 +336,21 @@ def my_reservations(request):
         messages.error(request, "Doar participanții pot accesa această pagină.")
         return redirect('home')
 
-    reservations = Reservation.objects.filter(user=request.user).select_related('ticket_type__event')
+    reservations = Reservation.objects.filter(user=request.user).select_related('ticket_type__event__image_asset')
 
     if request.method == 'POST':
         reservation_id = request.POST.get('reservation_id')
         reservation = Reservation.objects.filter(id=reservation_id, user=request.user).first()
 
-        if reservation:
-            # Eliberăm biletele
-            ticket_type = reservation.ticket_type
-            ticket_type.available_quantity += reservation.quantity
-            ticket_type.save()
-            reservation.delete()
+        if reservation and release_reservation(reservation):
             messages.success(request, "Rezervarea a fost anulată cu succes!")
         else:
             messages.error(request, "Rezervarea nu a fost găsită.")
 
         return redirect('my_reservations')
 
-    return render(request, 'events/my_reservations.html', {'reservations': reservations})
+    page = _keyset_page(request, reservations, ['-created_at', '-id'])
+    return render(request, 'events/my_reservations.html', {'reservations': page, 'page': page})
 
 
 # 🧑‍💼 Creare eveniment (organizator)
@@ -130,8 +369,6 @@ def create_event(request):
         start_date = parse_datetime(request.POST.get('start_date'))
         end_date = parse_datetime(request.POST.get('end_date'))
 
-        image = request.FILES.get('image')
-
         if not all([title, description, location, start_date, end_date]):
             messages.error(request, "Completează toate câmpurile.")
             return redirect('create_event')
@@ -143,8 +380,10 @@ def create_event(request):
             location=location,
             start_date=start_date,
             end_date=end_date,
-            image=image,
         )
+        if request.FILES.get('image'):
+            images.set_event_image(event, request.FILES['image'])
+            event.save()
 
         # Adaugă tipurile de bilete
         ticket_names = request.POST.getlist('ticket_name')
@@ -160,6 +399,7 @@ def create_event(request):
                     total_quantity=int(qty),
                     available_quantity=int(qty)
                 )
+        event.refresh_availability()
 
         messages.success(request, "Evenimentul a fost creat cu succes!")
         return redirect('events_list')
@@ -167,6 +407,49 @@ def create_event(request):
     return render(request, 'events/create_event.html')
 
 
+# 📥 Import în masă de evenimente din CSV / JSON (organizator)
+@login_required
+def import_events(request):
+    if not getattr(request.user, "is_organizer", False):
+        messages.error(request, "Doar organizatorii pot importa evenimente.")
+        return redirect('home')
+
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, "Alege un fișier CSV sau JSON.")
+            return redirect('import_events')
+
+        file_format = 'json' if upload.name.lower().endswith('.json') else 'csv'
+        result = importer.import_events(request.user, upload, file_format, dry_run=bool(request.POST.get('dry_run')))
+        if result.ok and not result.dry_run:
+            messages.success(
+                request, f"Au fost importate {result.events} evenimente și {result.ticket_types} tipuri de bilete."
+            )
+            return redirect('my_events')
+
+    return render(request, 'events/import_events.html', {
+        'result': result,
+        'errors': result.errors[:200] if result else [],
+        'columns': ','.join(importer.CSV_COLUMNS),
+    })
+
+
+# 🚦 Ritmul cozii virtuale din formular: None pentru câmp gol, ValueError dacă nu e valid
+MAX_ADMISSION_RATE = 1_000_000
+
+
+def _parse_admission_rate(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    rate = int(value)
+    if not 1 <= rate <= MAX_ADMISSION_RATE:
+        raise ValueError(value)
+    return rate
+
+
 # ✏️ Editare eveniment (organizator)
 @login_required
 def edit_event(request, event_id):
@@ -177,35 +460,42 @@ def edit_event(request, event_id):
         return redirect('home')
 
     if request.method == 'POST':
+        rows, deleted, errors = ticket_editor.parse_submission(request.POST)
+        if errors:
+            for line, message in errors:
+                messages.error(request, f"Biletul {line}: {message}")
+            return redirect('edit_event', event_id=event.id)
+
         event.title = request.POST.get('title')
         event.description = request.POST.get('description')
         event.location = request.POST.get('location')
         event.start_date = parse_datetime(request.POST.get('start_date'))
         event.end_date = parse_datetime(request.POST.get('end_date'))
-
-        if request.FILES.get('image'):
-            event.image = request.FILES.get('image')
-
-        event.save()
-
-        # actualizare bilete existente
-        ticket_ids = request.POST.getlist('ticket_id')
-        ticket_names = request.POST.getlist('ticket_name')
-        ticket_prices = request.POST.getlist('ticket_price')
-        ticket_quantities = request.POST.getlist('ticket_quantity')
-
-        for ticket_id, name, price, qty in zip(ticket_ids, ticket_names, ticket_prices, ticket_quantities):
-            ticket = TicketType.objects.get(id=ticket_id, event=event)
-            ticket.name = name
-            ticket.price = price
-            ticket.available_quantity = int(qty)
-            ticket.total_quantity = int(qty)
-            ticket.save()
+        try:
+            event.admission_rate = _parse_admission_rate(request.POST.get('admission_rate'))
+        except ValueError:
+            messages.error(
+                request, f"Ritmul de admitere trebuie să fie un număr întreg între 1 și {MAX_ADMISSION_RATE}.",
+            )
+            return redirect('edit_event', event_id=event.id)
+
+        try:
+            # Evenimentul și biletele se salvează împreună sau deloc
+            with transaction.atomic():
+                if request.FILES.get('image'):
+                    images.set_event_image(event, request.FILES['image'])
+                event.save()
+                ticket_editor.apply_changes(event, rows, deleted)
+                event.refresh_availability()
+        except ticket_editor.TicketEditError as exc:
+            for message in exc.errors:
+                messages.error(request, message)
+            return redirect('edit_event', event_id=event.id)
 
         messages.success(request, "Evenimentul a fost actualizat cu succes!")
         return redirect('event_detail', pk=event.id)
 
-    tickets = event.ticket_types.all()
+    tickets = ticket_editor.with_sold(event.ticket_types.order_by('id'))
     return render(request, 'events/edit_event.html', {'event': event, 'tickets': tickets})
 
 
@@ -217,35 +507,98 @@ def ticket_management(request, event_id):
         return redirect('home')
 
     event = get_object_or_404(Event, id=event_id, organizer=request.user)
-    reservations = Reservation.objects.filter(ticket_type__event=event).select_related('user', 'ticket_type')
+    filters = {
+        'status': request.GET.get('status', ''),
+        'ticket_type': request.GET.get('ticket_type', ''),
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+    }
+    reservations = _filtered_reservations(event, filters)
 
     if request.method == 'POST':
-        reservation_id = request.POST.get('reservation_id')
         action = request.POST.get('action')
-
-        reservation = Reservation.objects.filter(id=reservation_id, ticket_type__event=event).first()
-        if reservation:
-            if action == 'confirm':
-                reservation.confirmed = True
-                reservation.save()
-                messages.success(request, "Rezervarea a fost confirmată.")
-            elif action == 'delete':
-                ticket_type = reservation.ticket_type
-                ticket_type.available_quantity += reservation.quantity
-                ticket_type.save()
-                reservation.delete()
-                messages.success(request, "Rezervarea a fost ștearsă.")
+        bulk_action = BULK_ACTIONS.get(action)
+        if request.POST.get('all_matching'):
+            selected = reservations
         else:
-            messages.error(request, "Rezervarea nu a fost găsită.")
-
-        return redirect('ticket_management', event_id=event_id)
+            ids = request.POST.getlist('reservation_ids') or request.POST.getlist('reservation_id')
+            selected = Reservation.objects.filter(
+                ticket_type__event=event, id__in=[pk for pk in ids if pk.isdigit()]
+            )
 
+        if bulk_action is None:
+            messages.error(request, "Acțiune necunoscută.")
+        else:
+            function, message = bulk_action
+            count, skipped = function(selected), 0
+            if isinstance(count, tuple):
+                count, skipped = count
+            if count:
+                messages.success(request, message.format(count=count))
+            else:
+                messages.error(request, "Nicio rezervare nu a fost modificată.")
+            if skipped:
+                messages.warning(request, f"{skipped} rezervări confirmate sau plătite nu au fost eliberate.")
+
+        return redirect(f"{reverse('ticket_management', args=[event_id])}?{request.GET.urlencode()}")
+
+    page = _keyset_page(request, reservations.select_related('user', 'ticket_type'), ['-created_at', '-id'])
     return render(request, 'events/ticket_management.html', {
         'event': event,
-        'reservations': reservations
+        'reservations': page,
+        'page': page,
+        'ticket_types': event.ticket_types.all(),
+        **filters,
     })
 
 
+# 📤 Export CSV / NDJSON al rezervărilor (aceleași filtre ca tabelul din ticket_management)
+@login_required
+def export_reservations(request, event_id):
+    if not request.user.is_organizer:
+        messages.error(request, "Doar organizatorii pot accesa această pagină.")
+        return redirect('home')
+
+    event = get_object_or_404(Event, id=event_id, organizer=request.user)
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in exports.FORMATS:
+        return HttpResponse("Format necunoscut.", status=400)
+
+    filters = {name: request.GET.get(name, '') for name in ('status', 'ticket_type', 'date_from', 'date_to')}
+    stream, content_type = exports.FORMATS[export_format]
+    response = StreamingHttpResponse(stream(_filtered_reservations(event, filters)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="rezervari-eveniment-{event.pk}.{export_format}"'
+    return response
+
+
+# 📦 Acțiunile din ticket_management: funcția set-based și mesajul afișat
+BULK_ACTIONS = {
+    'confirm': (bulk_confirm, "{count} rezervări au fost confirmate."),
+    'cancel': (bulk_cancel, "{count} rezervări au fost anulate."),
+    'release': (bulk_release, "{count} rezervări au fost șterse, iar biletele au revenit în stoc."),
+    'delete': (bulk_release, "{count} rezervări au fost șterse, iar biletele au revenit în stoc."),
+}
+
+
+# 🔍 Rezervările unui eveniment, după filtrele din ticket_management
+def _filtered_reservations(event, filters):
+    reservations = Reservation.objects.filter(ticket_type__event=event)
+    if filters['status'] == 'confirmed':
+        reservations = reservations.filter(confirmed=True)
+    elif filters['status'] == 'pending':
+        reservations = reservations.filter(confirmed=False)
+    if filters['ticket_type'].isdigit():
+        reservations = reservations.filter(ticket_type_id=filters['ticket_type'])
+
+    first_day = _parse_day(filters['date_from'])
+    last_day = _parse_day(filters['date_to'])
+    if first_day:
+        reservations = reservations.filter(created_at__gte=_day_start(first_day))
+    if last_day:
+        reservations = reservations.filter(created_at__lt=_day_start(last_day + timedelta(days=1)))
+    return reservations
+
+
 # 🎨 Personalizare eveniment (organizator)
 @login_required
 def customize_event(request, event_id):
@@ -261,7 +614,7 @@ def customize_event(request, event_id):
         event.promo_message = request.POST.get('promo_message')
 
         if request.FILES.get('image'):
-            event.image = request.FILES.get('image')
+            images.set_event_image(event, request.FILES['image'])
 
         event.save()
         messages.success(request, "Personalizarea evenimentului a fost salvată!")
@@ -270,26 +623,75 @@ def customize_event(request, event_id):
     return render(request, 'events/customize_event.html', {'event': event})
 
 @login_required
-def my_events(request):
+async def my_events(request):
+    user = await _aload_user(request)
+    if not getattr(user, "is_organizer", False):
+        messages.error(request, "Doar organizatorii pot accesa această pagină.")
+        return redirect('events_list')
+
+    events = Event.objects.filter(organizer=user).select_related('image_asset')
+    page = await _akeyset_page(request, events, ['-start_date', '-id'])
+    # Vânzările fiecărui eveniment din pagină, citite din rollup-uri într-o singură interogare
+    sales = await analytics.atotals_by_event([event.pk for event in page])
+    for event in page:
+        event.sales = sales.get(event.pk)
+    return render(request, 'events/my_events.html', {'events': page, 'page': page})
+
+
+# 🚪 Manifestul porții pentru scanere: cheia evenimentului, locurile valide și cele
+# folosite (pentru validare offline) și tokenul pentru API-ul de intrare
+@login_required
+def checkin_manifest(request, event_id):
     if not getattr(request.user, "is_organizer", False):
         messages.error(request, "Doar organizatorii pot accesa această pagină.")
         return redirect('events_list')
 
-    events = Event.objects.filter(organizer=request.user).order_by('-start_date')
-    return render(request, 'events/my_events.html', {'events': events})
+    event = get_object_or_404(Event, id=event_id, organizer=request.user)
+    manifest = checkin.get_gate(event.pk).manifest()
+    return JsonResponse({**manifest, 'token': checkin.make_gate_token(event.pk)})
+
 
-import stripe, json
-from django.conf import settings
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.csrf import csrf_exempt
+# 🚪 Validarea biletelor la intrare; scanerele se autentifică cu `Authorization: Gate <token>`
+@csrf_exempt
+@require_POST
+def check_in(request, event_id):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme != 'Gate' or not checkin.read_gate_token(token, event_id):
+        return JsonResponse({'error': "Token invalid."}, status=403)
 
-from .models import Payment
+    try:
+        data = json.loads(request.body)
+        codes = data['codes']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Corpul trebuie să fie {\"codes\": [...]}."}, status=400)
+    if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+        return JsonResponse({'error': "Corpul trebuie să fie {\"codes\": [...]}."}, status=400)
+    if len(codes) > checkin.MAX_CODES_PER_REQUEST:
+        return JsonResponse({'error': f"Cel mult {checkin.MAX_CODES_PER_REQUEST} coduri pe cerere."}, status=400)
+
+    gate = checkin.get_gate(event_id)
+    return JsonResponse({'results': gate.check_many(codes, gate=str(data.get('gate', ''))[:50])})
 
 
+# 📊 Vânzări pe eveniment, tip de bilet și zi (doar din rollup-uri; ?format=json pentru API)
+@login_required
+def sales_dashboard(request, event_id):
+    if not getattr(request.user, "is_organizer", False):
+        messages.error(request, "Doar organizatorii pot accesa această pagină.")
+        return redirect('events_list')
+
+    event = get_object_or_404(Event, id=event_id, organizer=request.user)
+    report = analytics.event_report(event)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'event': event.pk, **report})
+    return render(request, 'events/sales_dashboard.html', {'event': event, **report})
+
 @login_required
 def payment_page(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id, user=request.user)
-    amount = float(reservation.ticket_type.price) * reservation.quantity
+    reservation = get_object_or_404(
+        Reservation.objects.select_related('ticket_type__event'), id=reservation_id, user=request.user
+    )
+    amount = reservation.ticket_type.price * reservation.quantity
 
     payment, _ = Payment.objects.get_or_create(
         reservation=reservation,
@@ -307,30 +709,31 @@ def payment_page(request, reservation_id):
 
 @login_required
 def create_payment_intent(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id, user=request.user)
-    amount = float(reservation.ticket_type.price) * reservation.quantity
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-
-    intent = stripe.PaymentIntent.create(
-        amount=int(amount * 100),
-        currency=settings.STRIPE_CURRENCY,
-        metadata={'reservation_id': reservation.id, 'user_id': request.user.id}
+    reservation = get_object_or_404(
+        Reservation.objects.select_related('ticket_type'), id=reservation_id, user=request.user
     )
-
-    payment, created = Payment.objects.get_or_create(
+    payment, _ = Payment.objects.get_or_create(
         reservation=reservation,
-        defaults={
-            'amount': amount,
-            'stripe_payment_intent': intent.id,
-            'stripe_client_secret': intent.client_secret
-        }
+        defaults={'amount': reservation.ticket_type.price * reservation.quantity}
     )
-    if not created:
-        payment.stripe_payment_intent = intent.id
-        payment.stripe_client_secret = intent.client_secret
-        payment.amount = amount
-        payment.save()
+    if payment.status == 'completed':
+        return JsonResponse({'error': "Rezervarea este deja plătită."}, status=409)
 
+    # Dacă există deja un intent deschis pentru rezervare, clientul îl primește pe acela
+    payment.amount = reservation.ticket_type.price * reservation.quantity
+    try:
+        intent = payments.intent_for_reservation(payment, settings.STRIPE_CURRENCY.lower())
+    except payments.PaymentError:
+        return JsonResponse({'error': "Plata nu a putut fi inițiată. Încearcă din nou."}, status=502)
+
+    # Webhook-ul poate marca plata finalizată cât timp așteptăm procesatorul: scriem doar
+    # dacă plata e tot deschisă, altfel am readuce o plată încheiată la 'pending'
+    updated = Payment.objects.filter(pk=payment.pk, status__in=['pending', 'failed']).update(
+        amount=payment.amount, stripe_payment_intent=intent.id,
+        stripe_client_secret=intent.client_secret, status='pending',
+    )
+    if not updated:
+        return JsonResponse({'error': "Rezervarea este deja plătită."}, status=409)
     return JsonResponse({'clientSecret': intent.client_secret})
 
 
@@ -348,26 +751,13 @@ def payment_cancel(request):
 
 @csrf_exempt
 def stripe_webhook(request):
-    payload = request.body
-    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE', '')
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-
     try:
-        event = stripe.Webhook.construct_event(
-            payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
+        event = payments.get_provider().verify_webhook(
+            request.body, request.META.get('HTTP_STRIPE_SIGNATURE', '')
         )
-    except (ValueError, stripe.error.SignatureVerificationError):
+    except payments.InvalidWebhook:
         return HttpResponse(status=400)
 
-    if event['type'] == 'payment_intent.succeeded':
-        intent = event['data']['object']
-        pi_id = intent.get('id')
-        payment = Payment.objects.filter(stripe_payment_intent=pi_id).first()
-        if payment:
-            payment.status = 'completed'
-            payment.save()
-            reservation = payment.reservation
-            reservation.confirmed = True
-            reservation.save()
-
+    # 📬 Doar salvăm evenimentul; efectele le aplică worker-ul (`manage.py process_webhooks`)
+    webhooks.record_event(event)
     return HttpResponse(status=200)
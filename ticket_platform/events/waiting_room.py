@@ -0,0 +1,126 @@
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+TOKEN_SALT = 'events.waiting_room'
+
+
+# 🚦 Coada virtuală: fiecare vizitator primește un număr de ordine, iar un
+# "token bucket" per eveniment admite vizitatori cu o rată fixă.
+class QueueBackend:
+    def join(self, event_id, rate_per_minute, now=None):
+        """Adaugă un vizitator în coadă și întoarce numărul lui de ordine."""
+        raise NotImplementedError
+
+    def admitted_until(self, event_id, now=None):
+        """Ultimul număr de ordine admis până acum (0 dacă nu există coadă)."""
+        raise NotImplementedError
+
+    def status(self, event_id, seq, now=None):
+        position = max(0, seq - self.admitted_until(event_id, now))
+        return {'position': position, 'admitted': position == 0}
+
+    @staticmethod
+    def _new_state(rate_per_minute, now):
+        burst = getattr(settings, 'WAITING_ROOM_BURST', 10)
+        return {'limit': float(burst), 'last': now, 'rate': rate_per_minute / 60, 'burst': burst}
+
+    @staticmethod
+    def _refill(state, tail, now):
+        # Tokenurile se acumulează cu rata evenimentului, dar cel mult `burst`
+        # peste ultimul vizitator sosit, ca o pauză să nu admită o avalanșă.
+        limit = state['limit'] + state['rate'] * max(0.0, now - state['last'])
+        state['limit'] = max(state['limit'], min(limit, tail + state['burst']))
+        state['last'] = now
+        return state
+
+
+class LocalQueueBackend(QueueBackend):
+    """Stare în memoria procesului; potrivit pentru teste și un singur server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}
+
+    def join(self, event_id, rate_per_minute, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            queue = self._queues.setdefault(
+                event_id, {'tail': 0, 'state': self._new_state(rate_per_minute, now)}
+            )
+            queue['state']['rate'] = rate_per_minute / 60
+            queue['tail'] += 1
+            return queue['tail']
+
+    def admitted_until(self, event_id, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            queue = self._queues.get(event_id)
+            if queue is None:
+                return 0
+            return int(self._refill(queue['state'], queue['tail'], now)['limit'])
+
+
+class CacheQueueBackend(QueueBackend):
+    """Stare într-un cache partajat (Redis, Memcached), pentru mai multe servere."""
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, 'WAITING_ROOM_CACHE', 'default')]
+
+    def _keys(self, event_id):
+        return f'waiting_room:{event_id}:tail', f'waiting_room:{event_id}:state'
+
+    def join(self, event_id, rate_per_minute, now=None):
+        now = now if now is not None else time.time()
+        tail_key, state_key = self._keys(event_id)
+        state = self.cache.get(state_key)
+        if state is None:
+            self.cache.add(state_key, self._new_state(rate_per_minute, now), timeout=None)
+        elif state['rate'] != rate_per_minute / 60:
+            state['rate'] = rate_per_minute / 60
+            self.cache.set(state_key, state, timeout=None)
+        self.cache.add(tail_key, 0, timeout=None)
+        return self.cache.incr(tail_key)
+
+    def admitted_until(self, event_id, now=None):
+        now = now if now is not None else time.time()
+        tail_key, state_key = self._keys(event_id)
+        values = self.cache.get_many([tail_key, state_key])
+        if state_key not in values:
+            return 0
+        # Scrieri concurente pornesc din aceeași stare, deci pot doar întârzia
+        # admiterea, niciodată nu admit mai mulți vizitatori decât rata permite.
+        state = self._refill(values[state_key], values.get(tail_key, 0), now)
+        self.cache.set(state_key, state, timeout=None)
+        return int(state['limit'])
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    path = getattr(settings, 'WAITING_ROOM_BACKEND', 'events.waiting_room.LocalQueueBackend')
+    return import_string(path)()
+
+
+@receiver(setting_changed)
+def _reset_backend(setting, **kwargs):
+    if setting.startswith('WAITING_ROOM_'):
+        get_backend.cache_clear()
+
+
+def make_token(event_id, seq):
+    return signing.dumps({'e': event_id, 'n': seq}, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token, event_id):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    return data['n'] if data.get('e') == event_id else None
@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics
+from .models import Payment, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+# Câte evenimente eșuate exclude o rulare înainte să se oprească (lista intră în SQL)
+MAX_FAILURES_PER_RUN = 500
+
+
+def max_attempts():
+    return getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', 5)
+
+
+# 📬 Primirea: evenimentul verificat se salvează și atât, ca răspunsul către
+# Stripe să plece imediat. Un eveniment retrimis are același id și e ignorat.
+def record_event(event, provider='stripe'):
+    """Salvează evenimentul în inbox (un singur INSERT; duplicatele sunt ignorate)."""
+    created = event.get('created')
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(
+            provider=provider,
+            event_id=event['id'],
+            event_type=event['type'],
+            payload=event,
+            occurred_at=datetime.fromtimestamp(created, dt_timezone.utc) if created else None,
+        )
+    ], ignore_conflicts=True)
+
+
+# 💳 Handler-ele primesc obiectul din `data.object`. Starea plății doar avansează:
+# un eșec livrat după succes (ordine inversată sau retrimitere) nu mai schimbă nimic.
+def _payment_for(intent):
+    payment = (
+        Payment.objects.select_for_update()
+        .select_related('reservation__ticket_type')
+        .filter(stripe_payment_intent=intent['id'])
+        .first()
+    )
+    if payment is None:
+        logger.warning("Webhook pentru un PaymentIntent necunoscut: %s", intent['id'])
+    return payment
+
+
+def payment_succeeded(intent):
+    payment = _payment_for(intent)
+    if payment is None or payment.status == 'completed':
+        return
+    payment.status = 'completed'
+    payment.save(update_fields=['status'])
+    reservation = payment.reservation
+    reservation.confirmed = True
+    reservation.save(update_fields=['confirmed'])
+    analytics.record_payment(payment)
+
+
+def payment_failed(intent):
+    payment = _payment_for(intent)
+    if payment is None or payment.status != 'pending':
+        return
+    # O plată eșuată nu mai protejează rezervarea: după expirare, biletele se eliberează
+    payment.status = 'failed'
+    payment.save(update_fields=['status'])
+
+
+HANDLERS = {
+    'payment_intent.succeeded': payment_succeeded,
+    'payment_intent.payment_failed': payment_failed,
+    'payment_intent.canceled': payment_failed,
+}
+
+
+def pending_events():
+    return WebhookEvent.objects.filter(processed_at__isnull=True, attempts__lt=max_attempts())
+
+
+def process_event(webhook_event):
+    handler = HANDLERS.get(webhook_event.event_type)
+    if handler is not None:
+        handler(webhook_event.payload['data']['object'])
+
+
+def process_pending(batch_size=100):
+    """Procesează inbox-ul în loturi și întoarce câte evenimente au fost încheiate.
+
+    Efectul unui eveniment și marcarea lui ca procesat se fac în aceeași
+    tranzacție, deci fiecare id de eveniment are efect o singură dată.
+    """
+    processed = 0
+    failed = []
+    while True:
+        with transaction.atomic():
+            # Un eveniment care a eșuat se reîncearcă abia la rularea următoare. Cele reușite
+            # ies singure din pending_events(), deci excludem doar id-urile eșuate
+            batch = list(
+                pending_events().exclude(id__in=failed).select_for_update(skip_locked=True)
+                .order_by('occurred_at', 'id')[:batch_size]
+            )
+            if not batch:
+                return processed
+
+            for webhook_event in batch:
+                webhook_event.attempts += 1
+                try:
+                    with transaction.atomic():
+                        process_event(webhook_event)
+                except Exception as exc:
+                    logger.exception("Webhook %s a eșuat", webhook_event.event_id)
+                    webhook_event.last_error = repr(exc)
+                    failed.append(webhook_event.id)
+                else:
+                    webhook_event.processed_at = timezone.now()
+                    webhook_event.last_error = ''
+                    processed += 1
+
+            WebhookEvent.objects.bulk_update(batch, ['attempts', 'processed_at', 'last_error'])
+        if len(failed) >= MAX_FAILURES_PER_RUN:
+            # Lista excluderilor rămâne mică (limita de parametri SQLite); restul, la rularea următoare
+            logger.warning("Oprit după %s webhook-uri eșuate.", len(failed))
+            return processed
@@ -1,3 +1,27 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from ticket_platform.query_budget import assert_query_budget
+
+from .models import SupportMessage
+
+
+class QueryBudgetTests(TestCase):
+    def assertBudget(self, max_queries, method, url, data=None):
+        with assert_query_budget(max_queries):
+            response = getattr(self.client, method)(url, data or {})
+        self.assertLess(response.status_code, 400)
+
+    def test_static_pages(self):
+        for name in ('home', 'about', 'terms', 'privacy', 'partners'):
+            with self.subTest(page=name):
+                self.assertBudget(0, 'get', reverse(name))
+
+    def test_contact(self):
+        SupportMessage.objects.bulk_create(
+            SupportMessage(name=f'Vizitator {i}', email='v@example.com', message='Salut') for i in range(5)
+        )
+        self.assertBudget(1, 'get', reverse('contact'))
+        self.assertBudget(1, 'post', reverse('contact'), {
+            'name': 'Ana', 'email': 'ana@example.com', 'message': 'Întrebare',
+        })
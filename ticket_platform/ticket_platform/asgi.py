@@ -3,6 +3,12 @@ ASGI config for ticket_platform project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Stream-ul de disponibilitate (``events/<id>/availability/stream/``) este o
+vedere asincronă: rulat sub un server ASGI (ex. ``uvicorn ticket_platform.asgi:application``),
+fiecare conexiune deschisă este doar o corutină în așteptare. La fel lista de
+evenimente, pagina evenimentului, "Biletele mele" și "Evenimentele mele";
+``manage.py benchmark_asgi`` compară cele două moduri la aceeași încărcare.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,181 @@
+"""
+Rutarea interogărilor între baza primară și replici, cu "read-your-writes".
+
+Configurare::
+
+    DATABASES = {
+        'default': {...},                                 # primara: toate scrierile
+        'replica': {..., 'TEST': {'MIRROR': 'default'}},  # replici doar pentru citire
+    }
+    DATABASE_REPLICAS = ['replica']
+    DATABASE_ROUTERS = ['ticket_platform.db_router.PrimaryReplicaRouter']
+    MIDDLEWARE = ['ticket_platform.db_router.ReadYourWritesMiddleware', ...]  # primul: și sesiunile contează ca scrieri
+
+Citirile merg pe o replică, cu excepția:
+
+* interogărilor din interiorul unei tranzacții pe primară (ex. verificarea
+  stocului la rezervare), care văd întotdeauna datele curente;
+* cererilor care nu sunt GET/HEAD/OPTIONS;
+* cererilor unui client care a scris ceva în ultimele ``DATABASE_PIN_SECONDS``
+  secunde (cookie-ul ``db_primary``), ca să-și vadă propriile modificări;
+* relațiilor și ``refresh_from_db()`` pentru obiecte venite de pe primară;
+* codului din ``with use_primary():``.
+
+Fragmentele din cache (``page_cache``) pot fi reconstruite dintr-o replică
+rămasă în urmă; stocul afișat poate întârzia cel mult cât replicarea, dar
+rezervarea verifică stocul pe primară.
+
+Local, replicarea se simulează cu două fișiere SQLite și
+``manage.py simulate_replication --loop --interval <întârziere>``.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def pin_seconds():
+    return getattr(settings, 'DATABASE_PIN_SECONDS', 5)
+
+
+@dataclass
+class _RoutingState:
+    pinned: bool = False
+    wrote: bool = False
+    replica: str | None = None
+
+
+# Starea cererii curente; obiectul e modificat pe loc, deci schimbările se văd și
+# din firele în care sync_to_async rulează interogările view-urilor asincrone.
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def use_primary():
+    """Toate citirile din bloc merg pe primară (ex. citire urmată de scriere în afara unei tranzacții)."""
+    state = _state.get()
+    if state is None:
+        token = _state.set(_RoutingState(pinned=True))
+        try:
+            yield
+        finally:
+            _state.reset(token)
+        return
+    # În cadrul unei cereri, scrierile din bloc trebuie să ajungă tot la cookie
+    previous, state.pinned = state.pinned, True
+    try:
+        yield
+    finally:
+        state.pinned = previous or state.wrote
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        state = _state.get()
+        if not aliases or (state and state.pinned) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        # Obiectele citite de pe primară sau abia salvate (refresh_from_db, relații) rămân acolo
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == DEFAULT_DB_ALIAS:
+            return DEFAULT_DB_ALIAS
+        if state is None:
+            return random.choice(aliases)
+        # O singură replică pe cerere, ca paginile să nu amestece întârzieri diferite
+        if state.replica is None:
+            state.replica = random.choice(aliases)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Schema ajunge pe replici prin replicare
+        if db in replicas():
+            return False
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Ține pe primară cererile care scriu și, pentru scurt timp, pe cele care urmează."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = self._state_for(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(response, state)
+
+    async def __acall__(self, request):
+        state = self._state_for(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(response, state)
+
+    @staticmethod
+    def _state_for(request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        return _RoutingState(pinned=request.method not in SAFE_METHODS or pinned_until > time.time())
+
+    @staticmethod
+    def _pin(response, state):
+        if state.wrote:
+            seconds = pin_seconds()
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + seconds)), max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def replicate_sqlite(primary=DEFAULT_DB_ALIAS, aliases=None):
+    """Copiază baza SQLite primară peste replici (API-ul de backup SQLite).
+
+    Simulează replicarea asincronă: între două apeluri replicile rămân în urmă.
+    """
+    source = connections[primary]
+    source.ensure_connection()
+    for alias in replicas() if aliases is None else aliases:
+        target = connections[alias]
+        target.ensure_connection()
+        source.connection.backup(target.connection)
@@ -0,0 +1,106 @@
+"""
+Instrumentarea interogărilor SQL, pentru cereri și pentru teste.
+
+Cu ``'ticket_platform.query_budget.QueryBudgetMiddleware'`` în ``MIDDLEWARE``,
+fiecare răspuns primește antetele ``X-DB-*`` (număr de interogări, timp total,
+interogări repetate) și o linie în logger-ul ``ticket_platform.queries``.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('ticket_platform.queries')
+
+# `IN (%s, %s, %s)` și `VALUES (...), (...)` diferă doar prin lungime: au aceeași formă
+_PLACEHOLDER_LIST_RE = re.compile(r'(%s)(\s*,\s*%s)+')
+_VALUES_LIST_RE = re.compile(r'(\([^()]*\))(\s*,\s*\([^()]*\))+')
+
+
+def query_shape(sql):
+    sql = _PLACEHOLDER_LIST_RE.sub(r'\1', sql)
+    return _VALUES_LIST_RE.sub(r'\1', sql)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self, threshold=None):
+        """Formele de interogare rulate de cel puțin `threshold` ori (semnul tipic al unui N+1)."""
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_BUDGET_DUPLICATE_THRESHOLD', 3)
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+
+@contextmanager
+def record_queries(using=None):
+    recorder = QueryRecorder()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        duplicates = recorder.duplicates()
+        response['X-DB-Query-Count'] = str(recorder.count)
+        response['X-DB-Time-Ms'] = f'{recorder.total_time * 1000:.1f}'
+        response['X-DB-Duplicate-Queries'] = str(sum(duplicates.values()))
+
+        log = logger.warning if duplicates else logger.info
+        log(
+            '%s %s queries=%d db_ms=%.1f duplicates=%d',
+            request.method, request.path, recorder.count, recorder.total_time * 1000,
+            len(duplicates),
+        )
+        for shape, count in duplicates.items():
+            logger.warning('Posibil N+1 pe %s: %dx %s', request.path, count, shape)
+        return response
+
+
+@contextmanager
+def assert_query_budget(max_queries, allow_duplicates=False, using=None):
+    """Eșuează dacă blocul depășește `max_queries` interogări sau repetă o formă de interogare."""
+    with record_queries(using) as recorder:
+        yield recorder
+
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f'{recorder.count} interogări, bugetul este {max_queries}')
+    if not allow_duplicates:
+        problems.extend(
+            f'{count}x {shape}' for shape, count in recorder.duplicates().items()
+        )
+    if problems:
+        executed = '\n'.join(f'  {sql}' for sql, _ in recorder.queries)
+        raise AssertionError('\n'.join(problems) + '\nInterogări:\n' + executed)
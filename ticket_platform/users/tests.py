@@ -1,3 +1,27 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from ticket_platform.query_budget import assert_query_budget
+
+User = get_user_model()
+
+
+class QueryBudgetTests(TestCase):
+    def assertBudget(self, max_queries, method, url, data=None):
+        with assert_query_budget(max_queries):
+            response = getattr(self.client, method)(url, data or {})
+        self.assertLess(response.status_code, 400)
+
+    def test_register(self):
+        self.assertBudget(0, 'get', reverse('register'))
+        self.assertBudget(4, 'post', reverse('register'), {
+            'username': 'ana', 'email': 'ana@example.com', 'password': 'parola-sigura', 'role': 'participant',
+        })
+
+    def test_login_profile_logout(self):
+        User.objects.create_user('ana', password='parola-sigura', is_participant=True)
+        self.assertBudget(0, 'get', reverse('login'))
+        self.assertBudget(9, 'post', reverse('login'), {'username': 'ana', 'password': 'parola-sigura'})
+        self.assertBudget(2, 'get', reverse('profile'))
+        self.assertBudget(4, 'get', reverse('logout'))